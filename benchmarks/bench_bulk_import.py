@@ -0,0 +1,47 @@
+"""Benchmark of the bulk import of time slots
+
+Usage: PYTHONPATH=./src python3 benchmarks/bench_bulk_import.py [number of slots]
+"""
+
+import io
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from app.bulk import import_time_slots
+from app.database import Database
+from app.occupancy import OccupancyIndex
+
+
+def generate_csv(count: int) -> io.StringIO:
+    """Generate a CSV of non-overlapping 30 minute slots, 48 per day"""
+    first_day = date(2025, 1, 1)
+    lines = ["date,time,duration"]
+    for index in range(count):
+        day, slot = divmod(index, 48)
+        lines.append(f"{first_day + timedelta(days=day)},{slot // 2:02d}:{slot % 2 * 30:02d},30")
+    return io.StringIO("\n".join(lines) + "\n")
+
+
+def main():
+    """Run the benchmark and print the results"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    source = generate_csv(count)
+    with tempfile.TemporaryDirectory() as directory:
+        with patch("app.services.db", Database(os.path.join(directory, "bench.sqlite"))), \
+                patch("app.services.occupancy", OccupancyIndex()):
+            start = time.perf_counter()
+            result, error, _ = import_time_slots(source, "csv")
+            elapsed = time.perf_counter() - start
+
+    if result is None:
+        print(error["error-msg"])
+        return
+    print(f"imported {result['imported']} slots in {elapsed:.1f} s ({result['imported'] / elapsed:,.0f} slots/s)")
+
+
+if __name__ == '__main__':
+    main()
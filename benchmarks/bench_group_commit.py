@@ -0,0 +1,55 @@
+"""Benchmark of concurrent slot creation with and without group commit
+
+Usage: PYTHONPATH=./src python3 benchmarks/bench_group_commit.py [number of slots] [number of threads]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from app.database import Database
+from app.occupancy import OccupancyIndex
+from app.services import create_time_slot
+
+
+def run(count: int, threads: int, group_commit: bool) -> float:
+    """Create count slots from the given number of threads and return the elapsed seconds"""
+    first_day = date(2025, 1, 1)
+    with tempfile.TemporaryDirectory() as directory:
+        database = Database(os.path.join(directory, "bench.sqlite"))
+        database.check_db_integrity()
+        if group_commit:
+            database.start_group_commit()
+
+        def create(index):
+            day, slot = divmod(index, 48)
+            return create_time_slot(str(first_day + timedelta(days=day)), f"{slot // 2:02d}:{slot % 2 * 30:02d}", 30)
+
+        with patch("app.services.db", database), patch("app.services.occupancy", OccupancyIndex()):
+            start = time.perf_counter()
+            with ThreadPoolExecutor(threads) as executor:
+                statuses = list(executor.map(lambda index: create(index)[2], range(count)))
+            elapsed = time.perf_counter() - start
+        database.stop_group_commit()
+
+    if statuses.count(200) != count:
+        raise RuntimeError(f"only {statuses.count(200)} of {count} slots were created")
+    return elapsed
+
+
+def main():
+    """Run the benchmark and print the results"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    threads = int(sys.argv[2]) if len(sys.argv) > 2 else 32
+    for group_commit in (False, True):
+        elapsed = run(count, threads, group_commit)
+        mode = "group commit" if group_commit else "one commit per write"
+        print(f"{mode}: {count} slots from {threads} threads in {elapsed:.2f} s ({count / elapsed:,.0f} slots/s)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,43 @@
+"""Benchmark of the cold start: importing the application and serving its first request
+
+Usage: PYTHONPATH=./src python3 benchmarks/bench_import.py [number of runs]
+"""
+
+import os
+import statistics
+import subprocess
+import sys
+
+# Prints the seconds spent importing the app, creating it and serving the first listing
+COLD_START = """
+import time
+start = time.perf_counter()
+import app
+imported = time.perf_counter()
+client = app.create_app().test_client()
+created = time.perf_counter()
+client.get('/bookings?date=2025-02-14')
+print(imported - start, created - imported, time.perf_counter() - created)
+"""
+
+
+def cold_start(docs_enabled: bool) -> tuple[float, float, float]:
+    """Run a cold start in a fresh interpreter and return its import, creation and first request seconds"""
+    env = dict(os.environ, BOOKING_API_DOCS_ENABLED="1" if docs_enabled else "0")
+    output = subprocess.run([sys.executable, "-c", COLD_START], env=env, check=True, capture_output=True,
+                            text=True).stdout
+    return tuple(float(value) for value in output.split()[-3:])
+
+
+def main():
+    """Run the benchmark and print the median timings"""
+    runs = int(sys.argv[1]) if len(sys.argv) > 1 else 10
+    for docs_enabled in (True, False):
+        timings = [cold_start(docs_enabled) for _ in range(runs)]
+        steps = ", ".join(f"{step} {statistics.median(timing[index] for timing in timings) * 1000:.1f} ms"
+                          for index, step in enumerate(("import", "create_app", "first request")))
+        print(f"docs {'enabled' if docs_enabled else 'disabled'}: {steps}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,47 @@
+"""Micro-benchmark of the date/time parsing compared to strptime
+
+Usage: PYTHONPATH=./src python3 benchmarks/bench_parsing.py
+"""
+
+import timeit
+from datetime import datetime
+
+from app.parsing import _parse_date, _parse_time, parse_date, parse_time
+
+NUMBER = 100000
+
+
+def strptime_validate_and_parse():
+    """Validate and re-parse the inputs the way the services used to"""
+    datetime.strptime("2025-02-14", "%Y-%m-%d")
+    datetime.strptime("14:30", "%H:%M")
+    datetime.strptime("2025-02-14 14:30", "%Y-%m-%d %H:%M")
+
+
+def fast_validate_and_parse():
+    """Validate and parse the inputs once, memoized"""
+    parse_date("2025-02-14")
+    parse_time("14:30")
+    parse_time("14:30")
+
+
+def fast_uncached_parse():
+    """Parse the inputs bypassing the memoization"""
+    _parse_date.__wrapped__("2025-02-14")
+    _parse_time.__wrapped__("14:30")
+
+
+def main():
+    """Run the benchmark and print the results"""
+    cases = [("strptime", strptime_validate_and_parse),
+             ("parsing (cached)", fast_validate_and_parse),
+             ("parsing (uncached)", fast_uncached_parse)]
+    baseline = None
+    for name, func in cases:
+        elapsed = min(timeit.repeat(func, number=NUMBER, repeat=5))
+        baseline = baseline or elapsed
+        print(f"{name:20s} {elapsed / NUMBER * 1e6:8.3f} us/op  x{baseline / elapsed:.1f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,61 @@
+"""Benchmark of listing the time slots of a day from the database and from the snapshot file
+
+Usage: PYTHONPATH=./src python3 benchmarks/bench_snapshot.py [number of listings]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from app import services
+from app.database import Database
+from app.occupancy import OccupancyIndex
+from app.services import get_time_slots
+from app.snapshot import write_snapshot
+
+DAYS = 30
+SLOTS_PER_DAY = 48
+
+
+def run(count: int) -> dict[str, float]:
+    """List count days without and with the snapshot and return the listings per second
+
+    The days are upcoming ones, like those the listings ask for, so the templates are
+    looked up for them as well.
+    """
+    first_day = date.today() + timedelta(days=1)
+    dates = [str(first_day + timedelta(days=day)) for day in range(DAYS)]
+    rates = {}
+    with tempfile.TemporaryDirectory() as directory:
+        database = Database(os.path.join(directory, "bench.sqlite"))
+        database.check_db_integrity()
+        rows = [(booking_date, f"{slot // 2:02d}:{slot % 2 * 30:02d}")
+                for booking_date in dates for slot in range(SLOTS_PER_DAY)]
+        database.execute_transaction(
+            lambda cursor: cursor.executemany("INSERT INTO bookings (date, time, duration) VALUES (?, ?, 30)", rows))
+        path = os.path.join(directory, "slots.snapshot")
+        write_snapshot(database, path, DAYS, dates[0])
+        with patch("app.services.db", database), patch("app.services.occupancy", OccupancyIndex()):
+            for name, snapshot_path in (("sqlite", ""), ("snapshot", path)):
+                services.select_snapshot(snapshot_path)
+                start = time.perf_counter()
+                for index in range(count):
+                    if get_time_slots(dates[index % DAYS])[0]["count"] != SLOTS_PER_DAY:
+                        raise RuntimeError(f"{name} listed a wrong number of slots")
+                rates[name] = count / (time.perf_counter() - start)
+            services.select_snapshot("")
+    return rates
+
+
+def main():
+    """Run the benchmark and print the results"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    for name, rate in run(count).items():
+        print(f"{name}: {count} listings of {SLOTS_PER_DAY} slots; {rate:,.0f}/s")
+
+
+if __name__ == '__main__':
+    main()
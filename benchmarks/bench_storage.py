@@ -0,0 +1,60 @@
+"""Benchmark of creating, listing and booking time slots with the SQLite and the in-memory engines
+
+Usage: PYTHONPATH=./src python3 benchmarks/bench_storage.py [number of slots]
+"""
+
+import os
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from unittest.mock import patch
+
+from app import services
+from app.database import Database
+from app.occupancy import OccupancyIndex
+from app.services import book_time_slot, create_time_slot, get_time_slots
+
+
+def run(count: int, engine: str) -> dict[str, float]:
+    """Create, list and book count slots with the engine and return the elapsed seconds per step"""
+    first_day = date(2025, 1, 1)
+    dates = [str(first_day + timedelta(days=day)) for day in range((count + 47) // 48)]
+    elapsed = {}
+    with tempfile.TemporaryDirectory() as directory:
+        database = Database(os.path.join(directory, "bench.sqlite"))
+        database.check_db_integrity()
+        with patch("app.services.db", database), patch("app.services.occupancy", OccupancyIndex()):
+            services.select_storage(engine)
+            start = time.perf_counter()
+            for index in range(count):
+                day, slot = divmod(index, 48)
+                create_time_slot(dates[day], f"{slot // 2:02d}:{slot % 2 * 30:02d}", 30)
+            elapsed["create"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            listed = sum(get_time_slots(booking_date)[0]["count"] for booking_date in dates)
+            elapsed["list"] = time.perf_counter() - start
+
+            start = time.perf_counter()
+            for time_slot_id in range(1, count + 1):
+                book_time_slot(time_slot_id, 0)
+            elapsed["book"] = time.perf_counter() - start
+            services.select_storage("sqlite")
+
+    if listed != count:
+        raise RuntimeError(f"only {listed} of {count} slots were listed")
+    return elapsed
+
+
+def main():
+    """Run the benchmark and print the results"""
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    for engine in ("sqlite", "memory"):
+        elapsed = run(count, engine)
+        steps = ", ".join(f"{step} {count / seconds:,.0f}/s" for step, seconds in elapsed.items())
+        print(f"{engine}: {count} slots; {steps}")
+
+
+if __name__ == '__main__':
+    main()
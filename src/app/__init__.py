@@ -1,11 +1,80 @@
 """__init__"""
 
+from functools import partial
+
 from flask import Flask
+from .admission import AdmissionControl
+from .archive import Archiver
+from .cli import COMMANDS
+from .compression import compress_response
+from .config import Config
+from .holds import HoldSweeper
+from .idempotency import KeyPurger
 from .routes import bp
+from .recurrence import TemplateMaterializer
+from .services import (archive_past_slots, db, materialize_templates_ahead, select_archive, select_snapshot,
+                       select_storage, sqlite_storage)
+from .snapshot import SnapshotWriter
+from .warmup import CacheWarmer, warm_up
 
 
-def create_app():
+def create_app(config=None):
     """Create the Flask app"""
     app = Flask(__name__)
+    app.config.from_object(Config)
+    if config:
+        app.config.update(config)
+    select_storage(app.config["STORAGE_ENGINE"])
+    select_archive(app.config["ARCHIVE_PATH"])
+    select_snapshot(app.config["SNAPSHOT_PATH"])
     app.register_blueprint(bp)
+    for command in COMMANDS:
+        app.cli.add_command(command)
+
+    if app.config["COMPRESSION_ENABLED"]:
+        app.after_request(compress_response)
+
+    admission = AdmissionControl.from_config(app.config)
+    if admission is not None:
+        app.extensions["admission"] = admission
+
+    if app.config["GROUP_COMMIT_ENABLED"]:
+        app.extensions["group_commit_writer"] = db.start_group_commit(
+            app.config["GROUP_COMMIT_MAX_BATCH"], app.config["GROUP_COMMIT_MAX_DELAY"])
+
+    if app.config["HOLD_SWEEP_INTERVAL"] > 0:
+        sweeper = HoldSweeper(app.config["HOLD_SWEEP_INTERVAL"], app.config["HOLD_SWEEP_BATCH_SIZE"])
+        sweeper.start()
+        app.extensions["hold_sweeper"] = sweeper
+
+    if app.config["IDEMPOTENCY_PURGE_INTERVAL"] > 0:
+        purger = KeyPurger(db, app.config["IDEMPOTENCY_PURGE_INTERVAL"], app.config["IDEMPOTENCY_PURGE_BATCH_SIZE"])
+        purger.start()
+        app.extensions["idempotency_key_purger"] = purger
+
+    if app.config["ARCHIVE_INTERVAL"] > 0:
+        job = partial(archive_past_slots, app.config["ARCHIVE_AFTER_DAYS"], app.config["ARCHIVE_BATCH_SIZE"],
+                      app.config["VACUUM_MAX_PAGES"])
+        archiver = Archiver(job, app.config["ARCHIVE_INTERVAL"])
+        archiver.start()
+        app.extensions["slot_archiver"] = archiver
+
+    if app.config["TEMPLATE_INTERVAL"] > 0 and sqlite_storage():
+        materializer = TemplateMaterializer(partial(materialize_templates_ahead, app.config["TEMPLATE_AHEAD_DAYS"]),
+                                            app.config["TEMPLATE_INTERVAL"])
+        materializer.start()
+        app.extensions["template_materializer"] = materializer
+
+    if app.config["WARMUP_DAYS"] > 0 and sqlite_storage():
+        warm_up(app.config["WARMUP_DAYS"])
+        if app.config["WARMUP_INTERVAL"] > 0:
+            warmer = CacheWarmer(app.config["WARMUP_DAYS"], app.config["WARMUP_INTERVAL"])
+            warmer.start()
+            app.extensions["cache_warmer"] = warmer
+
+    if app.config["SNAPSHOT_PATH"] and app.config["SNAPSHOT_INTERVAL"] > 0 and sqlite_storage():
+        writer = SnapshotWriter(db, app.config["SNAPSHOT_PATH"], app.config["SNAPSHOT_DAYS"],
+                                app.config["SNAPSHOT_INTERVAL"])
+        writer.start()
+        app.extensions["snapshot_writer"] = writer
     return app
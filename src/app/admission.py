@@ -0,0 +1,208 @@
+"""Per-client rate limiting and load shedding of the write endpoints"""
+
+import math
+import os
+import sqlite3
+import threading
+import time as clock
+from collections import OrderedDict
+from functools import wraps
+
+from flask import current_app, request
+
+from .auth import is_admin_request
+
+WRITE_METHODS = frozenset(("POST", "PUT", "PATCH", "DELETE"))
+
+
+def _refill(tokens: float, updated: float, now: float, rate: float, burst: float) -> tuple[float, float]:
+    """Refill a bucket and take a token; return the new level and the wait, 0 when granted"""
+    tokens = min(burst, tokens + max(0.0, now - updated) * rate)
+    if tokens >= 1:
+        return tokens - 1, 0.0
+
+    return tokens, (1 - tokens) / rate
+
+
+class TokenBuckets:
+    """Token buckets kept in the memory of the process, the least recently used evicted first
+
+    An evicted bucket starts full again, which only ever errs on the lenient side.
+    """
+
+    def __init__(self, rate: float, burst: float, max_clients: int = 10000):
+        self.rate = rate
+        self.burst = burst
+        self._max_clients = max_clients
+        self._lock = threading.Lock()
+        self._buckets: OrderedDict[str, tuple[float, float]] = OrderedDict()
+
+    def take(self, key: str, now: float) -> float:
+        """Take a token from the bucket of key; return 0 when granted, else the seconds until one is"""
+        with self._lock:
+            tokens, updated = self._buckets.pop(key, (self.burst, now))
+            tokens, wait = _refill(tokens, updated, now, self.rate, self.burst)
+            self._buckets[key] = (tokens, now)
+            if len(self._buckets) > self._max_clients:
+                self._buckets.popitem(last=False)
+
+        return wait
+
+
+class SharedTokenBuckets:
+    """Token buckets in a SQLite file shared by the worker processes of the host
+
+    Each process keeps a single connection to the file, opened again in a forked child.
+    Every prune_every takes, the buckets which have refilled since their last take are
+    deleted; they start full again like the evicted buckets of TokenBuckets.
+    """
+
+    def __init__(self, path: str, rate: float, burst: float, prune_every: int = 1000):
+        self.path = path
+        self.rate = rate
+        self.burst = burst
+        self.prune_every = prune_every
+        self._lock = threading.Lock()
+        self._connection = None
+        self._pid = None
+        self._takes = 0
+        with self._lock:
+            self._connect().execute("CREATE TABLE IF NOT EXISTS buckets ("
+                                    "key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated REAL NOT NULL) WITHOUT ROWID")
+
+    def _connect(self) -> sqlite3.Connection:
+        """Return the connection of the process, opening it on first use; called with the lock held"""
+        if self._connection is None or self._pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=1.0, isolation_level=None, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode = WAL")
+            self._connection, self._pid = connection, os.getpid()
+
+        return self._connection
+
+    def take(self, key: str, now: float) -> float:
+        """Take a token from the bucket of key; return 0 when granted, else the seconds until one is"""
+        with self._lock:
+            try:
+                connection = self._connect()
+                connection.execute("BEGIN IMMEDIATE")
+                try:
+                    row = connection.execute("SELECT tokens, updated FROM buckets WHERE key = ?", (key,)).fetchone()
+                    tokens, wait = _refill(*(row or (self.burst, now)), now, self.rate, self.burst)
+                    connection.execute("INSERT OR REPLACE INTO buckets (key, tokens, updated) VALUES (?, ?, ?)",
+                                       (key, tokens, now))
+                    self._takes += 1
+                    if self._takes % self.prune_every == 0:
+                        connection.execute("DELETE FROM buckets WHERE tokens + (? - updated) * ? >= ?",
+                                           (now, self.rate, self.burst))
+                    connection.execute("COMMIT")
+                except sqlite3.Error:
+                    connection.rollback()
+                    raise
+            except sqlite3.Error:
+                # The limiter must not take the service down with it, also when the file is locked or busy
+                return 0.0
+
+        return wait
+
+
+class WriteGate:
+    """Bound on the writes in progress, shrunk to a single probing write while writes are slow
+
+    The latency is a moving average of the write durations; the probe keeps it up to date,
+    so the gate opens again once writes are fast.
+    """
+
+    def __init__(self, max_pending: int = 0, latency_threshold: float = 0.0, smoothing: float = 0.2):
+        self.max_pending = max_pending
+        self.latency_threshold = latency_threshold
+        self.smoothing = smoothing
+        self.latency = 0.0
+        self._pending = 0
+        self._lock = threading.Lock()
+
+    def enter(self) -> bool:
+        """Admit a write unless the queue is full"""
+        with self._lock:
+            limit = self.max_pending or math.inf
+            if self.latency_threshold and self.latency > self.latency_threshold:
+                limit = 1
+            if self._pending >= limit:
+                return False
+            self._pending += 1
+            return True
+
+    def leave(self, duration: float):
+        """Record the end of an admitted write"""
+        with self._lock:
+            self._pending -= 1
+            self.latency += self.smoothing * (duration - self.latency)
+
+
+class AdmissionControl:
+    """Rate limiter and write gate of the app"""
+
+    def __init__(self, buckets, gate: WriteGate, retry_after: int = 1):
+        self.buckets = buckets
+        self.gate = gate
+        self.retry_after = retry_after
+
+    @classmethod
+    def from_config(cls, config) -> "AdmissionControl":
+        """Build the admission control from the app config, None when every part is disabled"""
+        buckets = None
+        if config["RATE_LIMIT_RATE"] > 0:
+            if config["RATE_LIMIT_STORAGE"]:
+                buckets = SharedTokenBuckets(config["RATE_LIMIT_STORAGE"], config["RATE_LIMIT_RATE"],
+                                             config["RATE_LIMIT_BURST"])
+            else:
+                buckets = TokenBuckets(config["RATE_LIMIT_RATE"], config["RATE_LIMIT_BURST"])
+
+        gate = None
+        if config["WRITE_QUEUE_SIZE"] > 0 or config["WRITE_LATENCY_THRESHOLD"] > 0:
+            gate = WriteGate(config["WRITE_QUEUE_SIZE"], config["WRITE_LATENCY_THRESHOLD"])
+
+        if buckets is None and gate is None:
+            return None
+
+        return cls(buckets, gate, config["LOAD_SHED_RETRY_AFTER"])
+
+
+def client_key() -> str:
+    """Identify the client of the current request by its address, the admin by its verified token
+
+    Unauthenticated headers are not trusted, or a client could change them on every request
+    to get a new bucket.
+    """
+    if is_admin_request():
+        return "admin"
+
+    return request.remote_addr or ""
+
+
+def admission_controlled(view):
+    """Decorator rate limiting and shedding the write requests of a view"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        control = current_app.extensions.get("admission")
+        if control is None or request.method not in WRITE_METHODS:
+            return view(*args, **kwargs)
+
+        if control.buckets is not None:
+            wait = control.buckets.take(f"{client_key()}:{request.method}", clock.time())
+            if wait:
+                return {"error-msg": "Rate limit exceeded"}, 429, {"Retry-After": str(math.ceil(wait))}
+
+        if control.gate is None:
+            return view(*args, **kwargs)
+
+        if not control.gate.enter():
+            return {"error-msg": "Too many writes in progress"}, 503, {"Retry-After": str(control.retry_after)}
+
+        start = clock.perf_counter()
+        try:
+            return view(*args, **kwargs)
+        finally:
+            control.gate.leave(clock.perf_counter() - start)
+
+    return wrapper
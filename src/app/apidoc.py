@@ -0,0 +1,70 @@
+"""Deferred Swagger documentation of the API resources"""
+
+import threading
+
+from flask_restx import Api
+
+
+class LazyDocApi(Api):
+    """Api applying the documentation decorators of the resources on the first request of the specification
+
+    flask_restx merges every documentation decorator into a deep copy of the documentation
+    gathered so far, models included, which made up half of the import time of the routes.
+    The decorators are recorded and replayed in the same order when the specification is
+    built. Each application decides from its API_DOCS_ENABLED setting whether the Swagger
+    UI and the specification are served; when they are not, the documentation is never
+    built. Payloads are validated by the ModelValidators of the routes, so the resources
+    do not need their documentation to serve requests.
+    """
+
+    def __init__(self, *args, **kwargs):
+        self._pending_docs = []
+        self._pending_docs_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def _init_app(self, app):
+        """Register the API on the application, answering 404 for the documentation when it is disabled"""
+        super()._init_app(app)
+        if not app.config.get("API_DOCS_ENABLED", True):
+            for endpoint in ("doc", "specs"):
+                app.view_functions[f"{self.blueprint.name}.{endpoint}"] = self.render_root
+
+    def _recorded(self, name: str, args: tuple, kwargs: dict):
+        """Return a decorator recording a documentation decorator for later"""
+        def record(documented):
+            self._pending_docs.append((documented, name, args, kwargs))
+            return documented
+
+        return record
+
+    def doc(self, *args, **kwargs):
+        """Record documentation of the decorated object"""
+        return self._recorded("doc", args, kwargs)
+
+    def expect(self, *args, **kwargs):
+        """Record the expected input of the decorated method"""
+        return self._recorded("expect", args, kwargs)
+
+    def header(self, *args, **kwargs):
+        """Record a header of the decorated method"""
+        return self._recorded("header", args, kwargs)
+
+    def param(self, *args, **kwargs):
+        """Record a parameter of the decorated method"""
+        return self._recorded("param", args, kwargs)
+
+    def response(self, *args, **kwargs):
+        """Record a response of the decorated method"""
+        return self._recorded("response", args, kwargs)
+
+    def apply_docs(self):
+        """Apply the recorded documentation decorators"""
+        with self._pending_docs_lock:
+            for documented, name, args, kwargs in self._pending_docs:
+                getattr(self.default_namespace, name)(*args, **kwargs)(documented)
+            self._pending_docs.clear()
+
+    @property
+    def __schema__(self):
+        self.apply_docs()
+        return super().__schema__
@@ -0,0 +1,160 @@
+"""Archival of past time slots out of the bookings table and compaction of the database"""
+
+import sqlite3
+import threading
+from contextlib import closing
+from typing import Callable
+
+from .database import Database
+from .occupancy import OccupancyIndex, slot_masks
+from .parsing import parse_time
+from .statuscodes import DATABASE_ERROR, DATABASE_SUCCESS, SUCCESS
+from .summary import refresh_summaries
+
+ARCHIVE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS bookings_archive (
+        id INTEGER PRIMARY KEY,
+        date TEXT NOT NULL,
+        time TEXT NOT NULL,
+        duration INTEGER NOT NULL,
+        available INTEGER,
+        capacity INTEGER NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_bookings_archive_date_time ON bookings_archive (date, time);
+    CREATE TABLE IF NOT EXISTS reservations_archive (
+        id INTEGER PRIMARY KEY,
+        slot_id INTEGER NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_reservations_archive_slot_id ON reservations_archive (slot_id);
+"""
+
+ARCHIVED_SLOT_COLUMNS = "id, date, time, duration, available, capacity"
+
+# Condition on the slot_id of a hold or reservation row whose slot was deleted
+_SLOT_DELETED = "NOT EXISTS (SELECT 1 FROM bookings WHERE bookings.id = slot_id)"
+
+
+class ArchiveDatabase(Database):
+    """Database holding the archived slots and their reservations
+
+    The archive tables live either in a file of their own or next to the bookings table in
+    the main database file; only they are created in the archive.
+    """
+
+    def check_db_integrity(self) -> tuple[int, str]:
+        """Ensures the archive tables exist"""
+        try:
+            with closing(self.connect()) as connection:
+                connection.executescript(ARCHIVE_SCHEMA)
+        except (sqlite3.Error, ValueError) as e:
+            return DATABASE_ERROR, f"Could not create archive tables; {str(e)}"
+
+        return DATABASE_SUCCESS, ""
+
+
+def archive_slots(database: Database, archive: ArchiveDatabase, occupancy: OccupancyIndex, before_date: str,
+                  batch_size: int = 500) -> tuple[int, str, int]:
+    """Move the slots dated before a date into the archive in batches and return their count
+
+    Every batch is copied into the archive first and deleted in a short transaction of its
+    own afterwards, so that the write lock is never held for long and a failure leaves at
+    most a copy behind, overwritten by the next run. Slots changed in between are kept for
+    the next batch.
+    """
+    archived = 0
+    while True:
+        ret, err, slots = database.execute_query(
+            f"SELECT {ARCHIVED_SLOT_COLUMNS} FROM bookings WHERE date < ? ORDER BY date, time LIMIT ?",
+            (before_date, batch_size))
+        if ret == DATABASE_ERROR:
+            return ret, err, archived
+        if not slots:
+            return SUCCESS, "", archived
+
+        ids = [slot[0] for slot in slots]
+        placeholders = ", ".join("?" * len(ids))
+        ret, err, reservations = database.execute_query(
+            f"SELECT id, slot_id, created_at FROM reservations WHERE slot_id IN ({placeholders})", ids)
+        if ret == DATABASE_ERROR:
+            return ret, err, archived
+
+        ret, err, _ = archive.execute_transaction(_copy(slots, reservations))
+        if ret == DATABASE_ERROR:
+            return ret, err, archived
+
+        ret, err, count = database.execute_transaction(_delete(slots, reservations, occupancy))
+        if ret == DATABASE_ERROR:
+            return ret, err, archived
+        archived += count
+        if count == 0 or len(slots) < batch_size:
+            return SUCCESS, "", archived
+
+
+def _copy(slots: list[tuple], reservations: list[tuple]) -> Callable[[sqlite3.Cursor], None]:
+    """Return the transaction copying a batch into the archive"""
+    def copy(cursor):
+        cursor.executemany(f"INSERT OR REPLACE INTO bookings_archive ({ARCHIVED_SLOT_COLUMNS}) "
+                           "VALUES (?, ?, ?, ?, ?, ?)", slots)
+        cursor.executemany("INSERT OR REPLACE INTO reservations_archive (id, slot_id, created_at) VALUES (?, ?, ?)",
+                           reservations)
+
+    return copy
+
+
+def _delete(slots: list[tuple], reservations: list[tuple],
+            occupancy: OccupancyIndex) -> Callable[[sqlite3.Cursor], int]:
+    """Return the transaction deleting the unchanged slots of a copied batch and counting them"""
+    def delete(cursor):
+        deleted = 0
+        for slot_id, _, _, _, available, capacity in slots:
+            cursor.execute("DELETE FROM bookings WHERE id = ? AND available IS ? AND capacity = ?",
+                           (slot_id, available, capacity))
+            deleted += cursor.rowcount
+        # Only the holds and reservations of the deleted slots go
+        cursor.executemany(f"DELETE FROM holds WHERE slot_id = ? AND {_SLOT_DELETED}", [(slot[0],) for slot in slots])
+        cursor.executemany(f"DELETE FROM reservations WHERE id = ? AND {_SLOT_DELETED}",
+                           [(reservation[0],) for reservation in reservations])
+        dates = sorted({slot[1] for slot in slots})
+        # The bitmaps of the later dates lose the slots running past midnight too
+        spanned = {spanned_date for _, date, time, duration, _, _ in slots if parse_time(time) is not None
+                   for spanned_date in slot_masks(date, parse_time(time), int(duration))}
+        occupancy.discard(cursor, sorted(spanned.union(dates)))
+        refresh_summaries(cursor, dates)
+        return deleted
+
+    return delete
+
+
+def compact(database: Database, max_pages: int = 1000) -> tuple[int, str, int]:
+    """Give up to max_pages free pages back to the file system and refresh the query planner statistics
+
+    Free pages are only released by databases in incremental auto-vacuum mode, which new
+    databases are created in; older ones keep reusing them for new rows.
+    """
+    def run(cursor):
+        pages = cursor.execute("PRAGMA freelist_count").fetchone()[0]
+        # incremental_vacuum frees a page per step, fetching runs it to completion
+        cursor.execute(f"PRAGMA incremental_vacuum({int(max_pages)})").fetchall()
+        cursor.execute("ANALYZE")
+        return pages - cursor.execute("PRAGMA freelist_count").fetchone()[0]
+
+    return database.execute_transaction(run)
+
+
+class Archiver(threading.Thread):
+    """Background thread archiving the past slots and compacting the database periodically"""
+
+    def __init__(self, job: Callable[[], object], interval):
+        super().__init__(name="slot-archiver", daemon=True)
+        self.job = job
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            self.job()
+
+    def stop(self):
+        """Stop the archiver after its current run"""
+        self._stopped.set()
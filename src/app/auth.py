@@ -0,0 +1,17 @@
+"""Helpers for authorizing privileged requests"""
+
+import hmac
+
+from flask import current_app, request
+
+ADMIN_TOKEN_HEADER = "X-Admin-Token"
+
+
+def is_admin_request() -> bool:
+    """Check whether the current request carries the configured admin token"""
+    token = current_app.config.get("ADMIN_TOKEN")
+    supplied = request.headers.get(ADMIN_TOKEN_HEADER)
+    if not token or not supplied:
+        return False
+
+    return hmac.compare_digest(token.encode(), supplied.encode())
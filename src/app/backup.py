@@ -0,0 +1,147 @@
+"""Online backups of the database and restores validated before they replace it"""
+
+import os
+import sqlite3
+import time as clock
+from contextlib import closing
+from pathlib import Path
+from urllib.parse import quote
+
+from .database import Database
+from .services import NOT_SUPPORTED, db, forget_templates, materialized_templates, sqlite_storage
+from .statuscodes import DATABASE_ERROR, DATABASE_SUCCESS, VALIDATION_ERROR
+
+BACKUP_SUFFIX = ".sqlite"
+# Columns a snapshot needs to be restored; the newer tables and columns are added after the restore
+RESTORE_REQUIRED_COLUMNS = {"id", "date", "time", "duration", "available"}
+
+
+def backup_database(database: Database, target: str, step_pages: int = 256,
+                    step_delay: float = 0.01) -> tuple[int, str, int]:
+    """Copy a consistent snapshot of the database to target and return its page count
+
+    The online backup API copies step_pages pages per step and only locks the database
+    during a step; sleeping step_delay seconds between the steps leaves room for the
+    writers. Writes of other connections restart the copy. The snapshot is checked and
+    then renamed to target, which never holds a partial copy.
+    """
+    ret, err = database.check_db_integrity()
+    if ret != DATABASE_SUCCESS:
+        return DATABASE_ERROR, f"Database integrity check failed; {str(err)}", 0
+
+    partial = target + ".part"
+    try:
+        with closing(database.connect()) as source, closing(sqlite3.connect(partial)) as snapshot:
+            source.backup(snapshot, pages=step_pages,
+                          progress=lambda status, remaining, total: clock.sleep(step_delay) if remaining else None)
+            check = snapshot.execute("PRAGMA quick_check").fetchone()[0]
+            pages = snapshot.execute("PRAGMA page_count").fetchone()[0]
+        if check != "ok":
+            raise sqlite3.DatabaseError(f"Snapshot check failed: {check}")
+        os.replace(partial, target)
+    except (sqlite3.Error, ValueError, OSError) as e:
+        Path(partial).unlink(missing_ok=True)
+        return DATABASE_ERROR, str(e), 0
+
+    return DATABASE_SUCCESS, "", pages
+
+
+def _open_snapshot(path: str) -> sqlite3.Connection:
+    """Open a snapshot read-only"""
+    return sqlite3.connect(f"file:{quote(os.path.abspath(path))}?mode=ro", uri=True)
+
+
+def validate_snapshot(path: str) -> tuple[int, str]:
+    """Check that a file is an intact database with a bookings table; VALIDATION_ERROR if it is not"""
+    if not os.path.isfile(path):
+        return VALIDATION_ERROR, "Snapshot not found"
+
+    try:
+        with closing(_open_snapshot(path)) as snapshot:
+            check = snapshot.execute("PRAGMA quick_check").fetchone()[0]
+            columns = {row[1] for row in snapshot.execute("PRAGMA table_info(bookings)")}
+    except sqlite3.Error as e:
+        return VALIDATION_ERROR, f"Invalid snapshot; {str(e)}"
+
+    if check != "ok":
+        return VALIDATION_ERROR, f"Invalid snapshot; check failed: {check}"
+    if not RESTORE_REQUIRED_COLUMNS <= columns:
+        return VALIDATION_ERROR, "Invalid snapshot; the bookings table is missing or incomplete"
+
+    return DATABASE_SUCCESS, ""
+
+
+def restore_database(database: Database, source: str) -> tuple[int, str]:
+    """Replace the content of the database with a validated snapshot
+
+    The snapshot is copied in a single backup step, which holds the write lock of the
+    database for the whole copy: the connections of the application see either the old or
+    the restored content. The tables added since the snapshot are created afterwards and
+    the templates are materialized again from the restored template dates. An invalid
+    snapshot is refused with VALIDATION_ERROR.
+    """
+    ret, err = validate_snapshot(source)
+    if ret != DATABASE_SUCCESS:
+        return ret, err
+
+    try:
+        with closing(_open_snapshot(source)) as snapshot, closing(database.connect()) as live:
+            snapshot.backup(live)
+        database.last_commit = clock.time()
+    except (sqlite3.Error, ValueError) as e:
+        return DATABASE_ERROR, str(e)
+    finally:
+        materialized_templates.clear()
+        forget_templates()
+
+    return database.check_db_integrity()
+
+
+def create_backup(directory: str, step_pages: int = 256, step_delay: float = 0.01) -> tuple[dict, dict, int]:
+    """Back the database up into a new timestamped file of the backup directory"""
+    if not sqlite_storage():
+        return NOT_SUPPORTED
+    if not directory:
+        return None, {"error-msg": "Backups are disabled; no backup directory is configured"}, 400
+
+    now = clock.time()
+    timestamp = clock.strftime("%Y%m%d-%H%M%S", clock.gmtime(now))
+    name = f"bookings-{timestamp}-{int(now * 1000) % 1000:03d}{BACKUP_SUFFIX}"
+    try:
+        os.makedirs(directory, exist_ok=True)
+    except OSError as e:
+        return None, {"error-msg": f"Could not create the backup directory; error: {e}"}, 500
+
+    ret, err, pages = backup_database(db, os.path.join(directory, name), step_pages, step_delay)
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error during the backup; error: {err}"}, 500
+
+    return {"name": name, "pages": pages}, None, 200
+
+
+def list_backups(directory: str) -> tuple[dict, dict, int]:
+    """Return the backups of the backup directory, newest first"""
+    if not directory:
+        return None, {"error-msg": "Backups are disabled; no backup directory is configured"}, 400
+
+    paths = sorted(Path(directory).glob(f"*{BACKUP_SUFFIX}"), reverse=True) if os.path.isdir(directory) else []
+    backups = [{"name": path.name, "size": path.stat().st_size} for path in paths]
+    return {"count": len(backups), "backups": backups}, None, 200
+
+
+def restore_backup(directory: str, name) -> tuple[dict, dict, int]:
+    """Restore a backup of the backup directory"""
+    if not sqlite_storage():
+        return NOT_SUPPORTED
+    if not directory:
+        return None, {"error-msg": "Backups are disabled; no backup directory is configured"}, 400
+    if not isinstance(name, str) or os.path.basename(name) != name or not name.endswith(BACKUP_SUFFIX):
+        return None, {"error-msg": "Invalid backup name"}, 400
+
+    ret, err = restore_database(db, os.path.join(directory, name))
+    if ret == VALIDATION_ERROR:
+        return None, {"error-msg": f"Could not restore the backup; error: {err}"}, 400
+    if ret != DATABASE_SUCCESS:
+        return None, {"error-msg": f"Error while restoring the backup; error: {err}"}, 500
+
+    return {"error-msg": ""}, None, 200
@@ -0,0 +1,145 @@
+"""All-or-nothing batches of time slot operations"""
+
+import time as clock
+
+from .occupancy import slot_masks, spanned_dates
+from .parsing import format_time, normalize_date, parse_time
+from .services import (NOT_SUPPORTED, db, occupancy, sqlite_storage, validate_book_time_slot_input,
+                       validate_create_time_slot_input, validate_delete_time_slot_input)
+from .statuscodes import DATABASE_ERROR, SLOT_SEATS_EXCEEDED, SUCCESS, VALIDATION_ERROR, VALIDATION_SUCCESS
+from .storage import SqliteSlotStore
+from .summary import refresh_summaries
+
+BATCH_OPERATIONS = ("create", "delete", "book")
+MAX_BATCH_OPERATIONS = 1000
+
+
+class BatchAborted(Exception):
+    """Raised inside the batch transaction to roll it back"""
+
+    def __init__(self, results):
+        super().__init__("Batch aborted")
+        self.results = results
+
+
+def run_batch(operations) -> tuple[dict, dict, int]:
+    """Run create, delete and book operations in a single transaction, all or nothing"""
+    if not sqlite_storage():
+        return NOT_SUPPORTED
+
+    ret, err, errors = validate_batch_input(operations)
+    if ret != VALIDATION_SUCCESS:
+        return None, {"error-msg": err, "errors": errors}, 400
+
+    dates = {date for operation in operations if operation["op"] == "create"
+             for date in slot_masks(operation["date"], parse_time(operation["time"]), int(operation["duration"]))}
+    try:
+        ret, err, results = db.execute_transaction(lambda cursor: apply_operations(cursor, operations, dates))
+    except BatchAborted as e:
+        failed = e.results[-1]
+        error = {"operation": len(e.results), "error-msg": failed["error-msg"]}
+        return None, {"error-msg": f"Batch rolled back; operation {len(e.results)} failed",
+                      "errors": [error]}, failed["status"]
+
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
+
+    return {"results": results}, None, 200
+
+
+def apply_operations(cursor, operations: list[dict], dates: set[str]) -> list[dict]:
+    """Apply the operations in order and return their results; runs inside a transaction
+
+    The bitmaps of the dates spanned by the created slots are loaded once, checked and
+    updated in memory, and stored once at the end. A failing operation raises BatchAborted
+    with the results so far.
+    """
+    bitmaps = occupancy.load(cursor, sorted(dates))
+    now = clock.time()
+    results = []
+    for operation in operations:
+        result = _apply(cursor, operation, bitmaps, now)
+        results.append(result)
+        if result["status"] != 200:
+            raise BatchAborted(results)
+
+    occupancy.store(cursor, {date: bitmaps[date] for date in dates})
+    refresh_summaries(cursor, dates | _deleted_dates(results))
+    return results
+
+
+def _apply(cursor, operation: dict, bitmaps: dict[str, int], now: float) -> dict:
+    """Apply a single operation of a batch"""
+    if operation["op"] == "create":
+        date, start = normalize_date(operation["date"]), parse_time(operation["time"])
+        duration = int(operation["duration"])
+        masks = slot_masks(date, start, duration)
+        if any(bitmaps[spanned] & mask for spanned, mask in masks.items()):
+            return {"status": 400, "error-msg": "Overlapping booking found"}
+        capacity = int(operation.get("capacity") or 1)
+        cursor.execute("INSERT INTO bookings (date, time, duration, available, capacity) VALUES (?, ?, ?, ?, ?)",
+                       (date, format_time(start), duration, capacity, capacity))
+        for spanned, mask in masks.items():
+            bitmaps[spanned] |= mask
+        return {"status": 200, "id": cursor.lastrowid}
+
+    time_slot_id = int(operation["id"])
+    cursor.execute("SELECT date, start_at, end_at FROM bookings WHERE id = ?", (time_slot_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return {"status": 400, "error-msg": "Time slot not found"}
+
+    if operation["op"] == "delete":
+        cursor.execute("DELETE FROM bookings WHERE id = ?", (time_slot_id,))
+        cursor.execute("DELETE FROM holds WHERE slot_id = ?", (time_slot_id,))
+        cursor.execute("DELETE FROM reservations WHERE slot_id = ?", (time_slot_id,))
+        # Rebuilt from the bookings, which include the slots created earlier in the batch
+        bitmaps.update(occupancy.rebuild(cursor, spanned_dates(*row)))
+        return {"status": 200, "date": row[0]}
+
+    store = SqliteSlotStore(db, occupancy)
+    ret, err = store.set_availability(cursor, time_slot_id, int(operation["available"]),
+                                      operation.get("hold_token"), now)
+    if ret != SUCCESS:
+        return {"status": 400 if ret == SLOT_SEATS_EXCEEDED else 409, "error-msg": err}
+    return {"status": 200}
+
+
+def _deleted_dates(results: list[dict]) -> set[str]:
+    """Return the dates of the slots deleted by a batch"""
+    return {result["date"] for result in results if "date" in result}
+
+
+def validate_batch_input(operations) -> tuple[int, str, list[dict]]:
+    """Validate every operation of a batch, returning the errors with their 1-based operation number"""
+    if not isinstance(operations, list) or not operations:
+        return VALIDATION_ERROR, "Missing list of operations", []
+
+    if len(operations) > MAX_BATCH_OPERATIONS:
+        return VALIDATION_ERROR, f"Too many operations; at most {MAX_BATCH_OPERATIONS} are allowed", []
+
+    errors = []
+    for number, operation in enumerate(operations, start=1):
+        ret, err = validate_operation(operation)
+        if ret != VALIDATION_SUCCESS:
+            errors.append({"operation": number, "error-msg": err})
+
+    if errors:
+        return VALIDATION_ERROR, "Invalid operations; nothing was applied", errors
+
+    return VALIDATION_SUCCESS, "", errors
+
+
+def validate_operation(operation) -> tuple[int, str]:
+    """Validate a single operation of a batch"""
+    if not isinstance(operation, dict) or operation.get("op") not in BATCH_OPERATIONS:
+        return VALIDATION_ERROR, f"Invalid operation; valid operations are {', '.join(BATCH_OPERATIONS)}"
+
+    if operation["op"] == "create":
+        return validate_create_time_slot_input(operation.get("date"), operation.get("time"),
+                                               operation.get("duration"), operation.get("capacity"))
+
+    if operation["op"] == "delete":
+        return validate_delete_time_slot_input(operation.get("id"))
+
+    return validate_book_time_slot_input(operation.get("id"), operation.get("available"))
@@ -0,0 +1,136 @@
+"""Bulk import and export of time slots in CSV and NDJSON formats"""
+
+import csv
+import io
+import json
+from itertools import islice
+from typing import IO, Iterator
+
+from .models import TimeSlot
+from .parsing import format_time, normalize_date, parse_time
+from .serializer import encode_slot
+from .services import slot_store, validate_create_time_slot_input, validate_get_timeslot_input
+from .statuscodes import DATABASE_ERROR, VALIDATION_SUCCESS
+from .utils import Validator
+
+BULK_FORMATS = ("csv", "ndjson")
+IMPORT_CHUNK_SIZE = 10000
+MAX_REPORTED_ERRORS = 100
+
+
+def read_records(stream: IO[str], file_format: str) -> Iterator[tuple[int, dict]]:
+    """Yield the line number and the fields of every record in the stream"""
+    if file_format == "csv":
+        reader = csv.DictReader(stream)
+        for record in reader:
+            yield reader.line_num, record
+        return
+
+    for line_number, line in enumerate(stream, start=1):
+        if not line.strip():
+            continue
+        try:
+            record = json.loads(line)
+        except ValueError:
+            record = None
+        yield line_number, record if isinstance(record, dict) else {}
+
+
+def parse_record(record: dict) -> tuple[str, tuple]:
+    """Validate a record and return it as a (date, start, duration, time, available) tuple"""
+    date, time, duration = record.get("date"), record.get("time"), record.get("duration")
+    available = record.get("available")
+    if available in (None, ""):
+        available = 1
+
+    ret, err = validate_create_time_slot_input(date, time, duration)
+    if ret != VALIDATION_SUCCESS:
+        return err, None
+    if Validator.validate_integer(available) != VALIDATION_SUCCESS:
+        return "Invalid availability", None
+
+    start = parse_time(time)
+    return "", (normalize_date(date), start, int(duration), format_time(start), int(available))
+
+
+def import_time_slots(stream: IO[str], file_format: str,
+                      chunk_size: int = IMPORT_CHUNK_SIZE) -> tuple[dict, dict, int]:
+    """Import time slots from a CSV or NDJSON stream, skipping invalid and overlapping ones
+
+    Every chunk of records is checked for overlaps and inserted in a single transaction
+    of the storage engine.
+    """
+    if file_format not in BULK_FORMATS:
+        return None, {"error-msg": f"Invalid format; valid formats are {', '.join(BULK_FORMATS)}"}, 400
+
+    store = slot_store()
+    imported, rejected, errors = 0, 0, []
+
+    def report(line_number, message):
+        nonlocal rejected
+        rejected += 1
+        if len(errors) < MAX_REPORTED_ERRORS:
+            errors.append({"line": line_number, "error-msg": message})
+
+    records = read_records(stream, file_format)
+    try:
+        while chunk := list(islice(records, chunk_size)):
+            candidates = []
+            for line_number, record in chunk:
+                err, candidate = parse_record(record)
+                if candidate is None:
+                    report(line_number, err)
+                    continue
+                candidates.append(candidate + (line_number,))
+
+            ret, err, overlapping = store.atomic(
+                lambda transaction, candidates=candidates: store.insert_slots(transaction, candidates))
+            if ret == DATABASE_ERROR:
+                return None, {"error-msg": f"Error inserting data to the database; error: {err}"}, 500
+
+            for candidate in overlapping:
+                report(candidate[-1], "Overlapping booking found")
+            imported += len(candidates) - len(overlapping)
+    except (csv.Error, UnicodeDecodeError) as e:
+        return None, {"error-msg": f"Could not read the import data; error: {e}"}, 400
+
+    return {"imported": imported, "rejected": rejected, "errors": errors}, None, 200
+
+
+def export_time_slots(file_format: str, booking_date=None, end_date=None,
+                      batch_size: int = 500) -> tuple[Iterator[bytes], dict, int]:
+    """Stream the stored time slots (optionally of a date range) as CSV or NDJSON"""
+    if file_format not in BULK_FORMATS:
+        return None, {"error-msg": f"Invalid format; valid formats are {', '.join(BULK_FORMATS)}"}, 400
+
+    if booking_date is not None or end_date is not None:
+        ret, err = validate_get_timeslot_input(booking_date, end_date or booking_date)
+        if ret != VALIDATION_SUCCESS:
+            return None, {"error-msg": err}, 400
+        booking_date, end_date = normalize_date(booking_date), normalize_date(end_date or booking_date)
+
+    ret, err, batches = slot_store().stream_slots(booking_date, end_date, batch_size)
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
+
+    encode = _encode_csv_batches if file_format == "csv" else _encode_ndjson_batches
+    return encode(batches), None, 200
+
+
+def _encode_csv_batches(batches) -> Iterator[bytes]:
+    """Encode batches of rows as CSV with a header line"""
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+    writer.writerow(TimeSlot._fields)
+    for batch in batches:
+        writer.writerows(batch)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    yield buffer.getvalue().encode()
+
+
+def _encode_ndjson_batches(batches) -> Iterator[bytes]:
+    """Encode batches of rows as newline delimited JSON objects"""
+    for batch in batches:
+        yield "".join([encode_slot(row) + "\n" for row in batch]).encode()
@@ -0,0 +1,121 @@
+"""Command line interface of the booking backend"""
+
+import click
+from flask import current_app
+
+from .backup import backup_database, restore_database
+from .bulk import BULK_FORMATS, export_time_slots, import_time_slots
+from .services import archive_past_slots, db, materialize_templates_ahead, rebuild_day_summaries
+from .snapshot import write_snapshot
+from .statuscodes import DATABASE_ERROR, DATABASE_SUCCESS
+
+
+@click.command("import-slots")
+@click.argument("source", type=click.File("r", encoding="utf-8"))
+@click.option("--format", "file_format", type=click.Choice(BULK_FORMATS), default=None,
+              help="Format of the source; guessed from the file extension by default.")
+def import_slots_command(source, file_format):
+    """Import time slots from a CSV or NDJSON file ('-' for stdin)"""
+    file_format = file_format or ("ndjson" if source.name.endswith((".ndjson", ".jsonl")) else "csv")
+    result, error, _ = import_time_slots(source, file_format)
+    if result is None:
+        raise click.ClickException(error["error-msg"])
+
+    click.echo(f"Imported {result['imported']} time slots, rejected {result['rejected']}")
+    for entry in result["errors"]:
+        click.echo(f"line {entry['line']}: {entry['error-msg']}", err=True)
+
+
+@click.command("export-slots")
+@click.argument("target", type=click.File("wb"), default="-")
+@click.option("--format", "file_format", type=click.Choice(BULK_FORMATS), default="csv")
+@click.option("--date", "booking_date", default=None, help="First date to export.")
+@click.option("--end-date", default=None, help="Last date to export.")
+def export_slots_command(target, file_format, booking_date, end_date):
+    """Export time slots as CSV or NDJSON ('-' for stdout)"""
+    chunks, error, _ = export_time_slots(file_format, booking_date, end_date)
+    if chunks is None:
+        raise click.ClickException(error["error-msg"])
+
+    for chunk in chunks:
+        target.write(chunk)
+    target.flush()
+
+
+@click.command("rebuild-summaries")
+def rebuild_summaries_command():
+    """Recompute the per-day summaries of every date, e.g. after editing the database by hand"""
+    result, error, _ = rebuild_day_summaries()
+    if result is None:
+        raise click.ClickException(error["error-msg"])
+
+    click.echo(f"Rebuilt the summaries of {result['days']} dates")
+
+
+@click.command("archive-slots")
+@click.option("--after-days", type=int, default=None,
+              help="Archive the slots dated more than this many days ago; BOOKING_ARCHIVE_AFTER_DAYS by default.")
+def archive_slots_command(after_days):
+    """Move the past time slots into the archive and compact the database"""
+    config = current_app.config
+    after_days = config["ARCHIVE_AFTER_DAYS"] if after_days is None else after_days
+    result, error, _ = archive_past_slots(after_days, config["ARCHIVE_BATCH_SIZE"], config["VACUUM_MAX_PAGES"])
+    if result is None:
+        raise click.ClickException(error["error-msg"])
+
+    click.echo(f"Archived {result['archived']} time slots dated before {result['before']}, "
+               f"freed {result['freed-pages']} pages")
+
+
+@click.command("materialize-templates")
+@click.option("--days", type=int, default=None,
+              help="Number of days ahead to create the template slots for; BOOKING_TEMPLATE_AHEAD_DAYS by default.")
+def materialize_templates_command(days):
+    """Create the slots of the recurring templates for the upcoming days"""
+    days = current_app.config["TEMPLATE_AHEAD_DAYS"] if days is None else days
+    result, error, _ = materialize_templates_ahead(days)
+    if result is None:
+        raise click.ClickException(error["error-msg"])
+
+    click.echo(f"Materialized the templates from {result['date']} to {result['end_date']}")
+
+
+@click.command("backup-db")
+@click.argument("target", type=click.Path(dir_okay=False, writable=True))
+def backup_db_command(target):
+    """Write a consistent snapshot of the database to a file without blocking the writers"""
+    config = current_app.config
+    ret, err, pages = backup_database(db, target, config["BACKUP_STEP_PAGES"], config["BACKUP_STEP_DELAY"])
+    if ret == DATABASE_ERROR:
+        raise click.ClickException(f"Backup failed; {err}")
+
+    click.echo(f"Backed up {pages} pages to {target}")
+
+
+@click.command("restore-db")
+@click.argument("source", type=click.Path(exists=True, dir_okay=False))
+def restore_db_command(source):
+    """Replace the database with a snapshot after validating it"""
+    ret, err = restore_database(db, source)
+    if ret != DATABASE_SUCCESS:
+        raise click.ClickException(f"Restore failed; {err}")
+
+    click.echo(f"Restored the database from {source}")
+
+
+@click.command("write-snapshot")
+def write_snapshot_command():
+    """Write the snapshot file of the upcoming time slots once, e.g. from a scheduler"""
+    config = current_app.config
+    if not config["SNAPSHOT_PATH"]:
+        raise click.ClickException("No snapshot file is configured; set BOOKING_SNAPSHOT_PATH")
+
+    ret, err, version = write_snapshot(db, config["SNAPSHOT_PATH"], config["SNAPSHOT_DAYS"])
+    if ret == DATABASE_ERROR:
+        raise click.ClickException(f"Snapshot failed; {err}")
+
+    click.echo(f"Wrote version {version} of {config['SNAPSHOT_PATH']}")
+
+
+COMMANDS = [import_slots_command, export_slots_command, rebuild_summaries_command, archive_slots_command,
+            materialize_templates_command, backup_db_command, restore_db_command, write_snapshot_command]
@@ -0,0 +1,98 @@
+"""Negotiated gzip and brotli compression of the responses"""
+
+import gzip
+import zlib
+from typing import Iterable, Iterator
+
+from flask import Response, current_app, request
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+# Types worth compressing; other payloads are sent as they are
+COMPRESSIBLE_MIMETYPES = {"application/json", "application/x-ndjson", "text/csv", "text/plain", "text/html"}
+
+
+def available_encodings() -> tuple[str, ...]:
+    """Return the supported content codings, preferred first"""
+    return ("br", "gzip") if brotli is not None else ("gzip",)
+
+
+def negotiate(accept_encoding: str) -> str | None:
+    """Return the preferred supported coding accepted by an Accept-Encoding header, None for identity"""
+    weights = {}
+    for part in accept_encoding.split(","):
+        coding, _, parameters = part.strip().partition(";")
+        weight = 1.0
+        name, _, value = parameters.strip().partition("=")
+        if name.strip() == "q":
+            try:
+                weight = float(value)
+            except ValueError:
+                weight = 0.0
+        if coding:
+            weights[coding.strip().lower()] = weight
+
+    accepted = [coding for coding in available_encodings() if weights.get(coding, weights.get("*", 0)) > 0]
+    if not accepted:
+        return None
+
+    return max(accepted, key=lambda coding: weights.get(coding, weights.get("*", 0)))
+
+
+def compress(data: bytes, coding: str, level: int) -> bytes:
+    """Compress a payload with a content coding; the level is the gzip level, scaled for brotli"""
+    if coding == "br":
+        return brotli.compress(data, quality=min(11, level + 1))
+
+    return gzip.compress(data, compresslevel=level, mtime=0)
+
+
+def compress_stream(chunks: Iterable[bytes], coding: str, level: int) -> Iterator[bytes]:
+    """Compress the chunks of a streamed payload, flushing after every chunk to keep it incremental"""
+    if coding == "br":
+        compressor = brotli.Compressor(quality=min(11, level + 1))
+        for chunk in chunks:
+            yield compressor.process(chunk) + compressor.flush()
+        yield compressor.finish()
+        return
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        yield compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+    yield compressor.flush()
+
+
+def compress_response(response: Response) -> Response:
+    """Compress a response with the coding the client prefers, when it is large enough to be worth it
+
+    Streamed responses are always compressed, as their size is not known in advance. The
+    ETag of a compressed response becomes weak, which keeps the conditional requests of
+    both representations working.
+    """
+    response.vary.add("Accept-Encoding")
+    if response.status_code != 200 or "Content-Encoding" in response.headers or \
+            response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    coding = negotiate(request.headers.get("Accept-Encoding", ""))
+    if coding is None:
+        return response
+
+    level = current_app.config["COMPRESSION_LEVEL"]
+    if response.is_streamed:
+        response.response = compress_stream(response.response, coding, level)
+        response.headers.pop("Content-Length", None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config["COMPRESSION_MIN_SIZE"]:
+            return response
+        response.set_data(compress(data, coding, level))
+
+    response.headers["Content-Encoding"] = coding
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+    return response
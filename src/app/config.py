@@ -0,0 +1,91 @@
+"""Default configuration of the booking backend"""
+
+import os
+
+
+class Config:
+    """Default configuration values, overridable from the environment"""
+
+    # Token expected in the admin header; admin features are disabled when unset
+    ADMIN_TOKEN = os.environ.get("BOOKING_ADMIN_TOKEN")
+
+    # Swagger UI at /docs and the specification at /swagger.json, built on their first request
+    API_DOCS_ENABLED = os.environ.get("BOOKING_API_DOCS_ENABLED", "1") == "1"
+
+    # Profiling of the bookings endpoints
+    PROFILING_ENABLED = os.environ.get("BOOKING_PROFILING_ENABLED", "0") == "1"
+    PROFILING_SAMPLE_RATE = float(os.environ.get("BOOKING_PROFILING_SAMPLE_RATE", "1.0"))
+
+    # Storage engine of the time slots: "sqlite", or "memory" for ephemeral deployments without
+    # holds, seat reservations and batches
+    STORAGE_ENGINE = os.environ.get("BOOKING_STORAGE_ENGINE", "sqlite")
+
+    # Archival of the slots dated more than the given number of days ago, every interval in seconds,
+    # into the archive file (the main database file when unset), followed by an incremental vacuum
+    # of at most the given number of pages; disabled with an interval of 0
+    ARCHIVE_AFTER_DAYS = int(os.environ.get("BOOKING_ARCHIVE_AFTER_DAYS", "90"))
+    ARCHIVE_INTERVAL = float(os.environ.get("BOOKING_ARCHIVE_INTERVAL", "0"))
+    ARCHIVE_BATCH_SIZE = int(os.environ.get("BOOKING_ARCHIVE_BATCH_SIZE", "500"))
+    ARCHIVE_PATH = os.environ.get("BOOKING_ARCHIVE_PATH", "")
+    VACUUM_MAX_PAGES = int(os.environ.get("BOOKING_VACUUM_MAX_PAGES", "1000"))
+
+    # Directory of the backups made through the admin endpoints, which are disabled when unset; a backup
+    # copies the given number of pages per step and sleeps the delay in seconds between the steps
+    BACKUP_DIR = os.environ.get("BOOKING_BACKUP_DIR", "")
+    BACKUP_STEP_PAGES = int(os.environ.get("BOOKING_BACKUP_STEP_PAGES", "256"))
+    BACKUP_STEP_DELAY = float(os.environ.get("BOOKING_BACKUP_STEP_DELAY", "0.01"))
+
+    # Warm-up of the caches with the given number of upcoming days in create_app(), repeated every
+    # interval in seconds; disabled with 0 days, and startup only with an interval of 0
+    WARMUP_DAYS = int(os.environ.get("BOOKING_WARMUP_DAYS", "0"))
+    WARMUP_INTERVAL = float(os.environ.get("BOOKING_WARMUP_INTERVAL", "0"))
+
+    # Snapshot file of the slots of the given number of upcoming days, answering the listings it covers;
+    # disabled when unset. It is rewritten when the database changed, checked every interval in seconds;
+    # with an interval of 0 the process only reads the snapshot written by another one
+    SNAPSHOT_PATH = os.environ.get("BOOKING_SNAPSHOT_PATH", "")
+    SNAPSHOT_DAYS = int(os.environ.get("BOOKING_SNAPSHOT_DAYS", "30"))
+    SNAPSHOT_INTERVAL = float(os.environ.get("BOOKING_SNAPSHOT_INTERVAL", "1"))
+
+    # Materialization of the slots of the recurring templates for the given number of days ahead, every
+    # interval in seconds; disabled with an interval of 0, when the slots are only created on the first query
+    TEMPLATE_AHEAD_DAYS = int(os.environ.get("BOOKING_TEMPLATE_AHEAD_DAYS", "28"))
+    TEMPLATE_INTERVAL = float(os.environ.get("BOOKING_TEMPLATE_INTERVAL", "0"))
+
+    # Negotiated gzip (and brotli, when installed) compression of the responses of at least the given
+    # size in bytes and of the streamed ones, at the given gzip level
+    COMPRESSION_ENABLED = os.environ.get("BOOKING_COMPRESSION_ENABLED", "0") == "1"
+    COMPRESSION_MIN_SIZE = int(os.environ.get("BOOKING_COMPRESSION_MIN_SIZE", "1024"))
+    COMPRESSION_LEVEL = int(os.environ.get("BOOKING_COMPRESSION_LEVEL", "6"))
+
+    # Number of rows fetched from the database per chunk of a streamed listing
+    STREAM_BATCH_SIZE = int(os.environ.get("BOOKING_STREAM_BATCH_SIZE", "500"))
+
+    # Temporary holds; the sweeper deleting the expired holds is disabled with an interval of 0
+    HOLD_DEFAULT_TTL = int(os.environ.get("BOOKING_HOLD_DEFAULT_TTL", "300"))
+    HOLD_MAX_TTL = int(os.environ.get("BOOKING_HOLD_MAX_TTL", "1800"))
+    HOLD_SWEEP_INTERVAL = float(os.environ.get("BOOKING_HOLD_SWEEP_INTERVAL", "0"))
+    HOLD_SWEEP_BATCH_SIZE = int(os.environ.get("BOOKING_HOLD_SWEEP_BATCH_SIZE", "500"))
+
+    # Idempotency keys of writes are kept for the ttl; the purger is disabled with an interval of 0
+    IDEMPOTENCY_TTL = int(os.environ.get("BOOKING_IDEMPOTENCY_TTL", "86400"))
+    IDEMPOTENCY_PURGE_INTERVAL = float(os.environ.get("BOOKING_IDEMPOTENCY_PURGE_INTERVAL", "0"))
+    IDEMPOTENCY_PURGE_BATCH_SIZE = int(os.environ.get("BOOKING_IDEMPOTENCY_PURGE_BATCH_SIZE", "500"))
+
+    # Token bucket rate limit of the write requests per client and method, disabled with a rate of 0;
+    # the buckets are shared by the workers of the host when a SQLite file path is given
+    RATE_LIMIT_RATE = float(os.environ.get("BOOKING_RATE_LIMIT_RATE", "0"))
+    RATE_LIMIT_BURST = float(os.environ.get("BOOKING_RATE_LIMIT_BURST", "20"))
+    RATE_LIMIT_STORAGE = os.environ.get("BOOKING_RATE_LIMIT_STORAGE", "")
+
+    # Load shedding of the write requests: maximum writes in progress per process and the write
+    # latency in seconds above which a single write at a time is admitted; 0 disables either
+    WRITE_QUEUE_SIZE = int(os.environ.get("BOOKING_WRITE_QUEUE_SIZE", "0"))
+    WRITE_LATENCY_THRESHOLD = float(os.environ.get("BOOKING_WRITE_LATENCY_THRESHOLD", "0"))
+    LOAD_SHED_RETRY_AFTER = int(os.environ.get("BOOKING_LOAD_SHED_RETRY_AFTER", "1"))
+
+    # Group commit: a writer thread commits the concurrent write transactions together, in groups
+    # of at most the batch size collected for at most the delay in seconds
+    GROUP_COMMIT_ENABLED = os.environ.get("BOOKING_GROUP_COMMIT_ENABLED", "0") == "1"
+    GROUP_COMMIT_MAX_BATCH = int(os.environ.get("BOOKING_GROUP_COMMIT_MAX_BATCH", "64"))
+    GROUP_COMMIT_MAX_DELAY = float(os.environ.get("BOOKING_GROUP_COMMIT_MAX_DELAY", "0.002"))
@@ -1,17 +1,106 @@
 """Database class to handle database connections and queries"""
 import sqlite3
 from contextlib import closing
-from typing import Any
+from typing import Any, Iterator
 import os.path
+import sys
+import threading
+import time as clock
 
+from .groupcommit import GroupCommitWriter
+from .parsing import normalize_date, normalize_time, parse_date, parse_time
 from .statuscodes import DATABASE_ERROR, DATABASE_SUCCESS
 
+# Aggregates the day_summary rows from the bookings, completed with a WHERE and a GROUP BY date clause
+DAY_SUMMARY_SELECT = """
+    SELECT date, COUNT(*), SUM(available > 0), SUM(CASE WHEN available > 0 THEN duration ELSE 0 END)
+    FROM bookings
+"""
+
+# Tables and indexes which have to exist besides the bookings table; the summaries of older
+# databases are backfilled when their table is created
+SCHEMA = f"""
+    CREATE INDEX IF NOT EXISTS idx_bookings_date_time ON bookings (date, time);
+    CREATE INDEX IF NOT EXISTS idx_bookings_start_at ON bookings (start_at, end_at);
+    CREATE TABLE IF NOT EXISTS occupancy (
+        date TEXT PRIMARY KEY,
+        bitmap BLOB NOT NULL
+    ) WITHOUT ROWID;
+    CREATE TABLE IF NOT EXISTS holds (
+        slot_id INTEGER PRIMARY KEY,
+        token TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_holds_expires_at ON holds (expires_at);
+    CREATE TABLE IF NOT EXISTS reservations (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        slot_id INTEGER NOT NULL,
+        created_at REAL NOT NULL
+    );
+    CREATE INDEX IF NOT EXISTS idx_reservations_slot_id ON reservations (slot_id);
+    CREATE TABLE IF NOT EXISTS idempotency_keys (
+        key BLOB PRIMARY KEY,
+        fingerprint BLOB NOT NULL,
+        status INTEGER NOT NULL,
+        response TEXT NOT NULL,
+        expires_at REAL NOT NULL
+    ) WITHOUT ROWID;
+    CREATE INDEX IF NOT EXISTS idx_idempotency_keys_expires_at ON idempotency_keys (expires_at);
+    CREATE TABLE IF NOT EXISTS day_summary (
+        date TEXT PRIMARY KEY,
+        total INTEGER NOT NULL,
+        available INTEGER NOT NULL,
+        minutes_free INTEGER NOT NULL
+    ) WITHOUT ROWID;
+    INSERT OR IGNORE INTO day_summary {DAY_SUMMARY_SELECT} GROUP BY date;
+    CREATE TABLE IF NOT EXISTS slot_templates (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        weekdays INTEGER NOT NULL,
+        start_time TEXT NOT NULL,
+        end_time TEXT NOT NULL,
+        duration INTEGER NOT NULL,
+        valid_from TEXT NOT NULL,
+        valid_until TEXT
+    );
+    CREATE TABLE IF NOT EXISTS template_dates (
+        date TEXT NOT NULL,
+        template_id INTEGER NOT NULL,
+        PRIMARY KEY (date, template_id)
+    ) WITHOUT ROWID;
+"""
+REQUIRED_OBJECTS = ["bookings", "idx_bookings_date_time", "idx_bookings_start_at", "occupancy", "holds",
+                    "idx_holds_expires_at", "reservations", "idx_reservations_slot_id", "idempotency_keys",
+                    "idx_idempotency_keys_expires_at", "day_summary", "slot_templates", "template_dates"]
+
+# Absolute start of a slot in minutes, date ordinal * 1440 + minute of the day; NULL for unparsable dates and times
+SLOT_START_AT = """
+    CAST(julianday(date) - 1721424.5 AS INTEGER) * 1440
+    + CAST(substr(time, 1, nullif(instr(time, ':'), 0) - 1) AS INTEGER) * 60
+    + CAST(substr(time, instr(time, ':') + 1) AS INTEGER)
+"""
+
+# Columns added to the bookings table after its creation, applied to older databases; the
+# absolute instants of the slots are computed from their date, time and duration. The
+# occupancy bitmaps stored before them leave out the slots running past midnight, so the
+# table is dropped with them and created again by the SCHEMA, for the bitmaps to be rebuilt.
+MIGRATIONS = [
+    "ALTER TABLE bookings ADD COLUMN capacity INTEGER NOT NULL DEFAULT 1",
+    f"ALTER TABLE bookings ADD COLUMN start_at INTEGER GENERATED ALWAYS AS ({SLOT_START_AT}) VIRTUAL",
+    """
+        ALTER TABLE bookings ADD COLUMN end_at INTEGER GENERATED ALWAYS AS (start_at + duration) VIRTUAL;
+        DROP TABLE IF EXISTS occupancy;
+    """,
+]
+
 
 class Database:
     """Database class to handle database connections and queries"""
 
     def __init__(self, db_path):
         self.db_path = db_path
+        self.writer = None
+        # Time of the last write transaction of this process, for the readers of older copies of the data
+        self.last_commit = 0.0
 
     def connect(self) -> sqlite3.Connection:
         """Connect to the database"""
@@ -35,14 +124,13 @@ class Database:
         except sqlite3.Error as e:
             return DATABASE_ERROR, str(e)
 
-        required_tables_exists = True
-
-        required_tables = ["bookings"]
-        for table in required_tables:
-            cursor.execute(f"PRAGMA table_info({table})")
-            if not cursor.fetchall():
-                required_tables_exists = False
+        placeholders = ", ".join("?" * len(REQUIRED_OBJECTS))
+        cursor.execute(f"SELECT name FROM sqlite_master WHERE name IN ({placeholders})", REQUIRED_OBJECTS)
+        required_tables_exists = len(cursor.fetchall()) == len(REQUIRED_OBJECTS)
 
+        if not db_exists:
+            # Lets the archival give the pages of the archived slots back to the file system
+            cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
         if not db_exists or not required_tables_exists:
             return self.create_tables(cursor)
 
@@ -58,14 +146,50 @@ class Database:
                     date TEXT NOT NULL,
                     time TEXT NOT NULL,
                     duration INTEGER NOT NULL,
-                    available INTEGER DEFAULT 1
+                    available INTEGER DEFAULT 1,
+                    capacity INTEGER NOT NULL DEFAULT 1
                 )
             """)
+            for migration in MIGRATIONS:
+                try:
+                    cursor.executescript(migration)
+                except sqlite3.OperationalError as e:
+                    if "duplicate column name" not in str(e):
+                        raise
+            cursor.executescript(SCHEMA)
+            Database.normalize_slots(cursor)
         except sqlite3.Error as e:
             return DATABASE_ERROR, f"Could not create database tables; {str(e)}"
 
         return DATABASE_SUCCESS, ""
 
+    @staticmethod
+    def normalize_slots(cursor):
+        """Zero-pad the dates and times of the slots stored without it by older versions
+
+        Such slots have no absolute instants and fall outside of the date ranges; the day
+        summaries are rebuilt once they are rewritten. The slots whose date or time cannot be
+        read at all are left as they are and reported with their ids, to be fixed or deleted.
+        """
+        cursor.execute("SELECT id, date, time FROM bookings WHERE date NOT GLOB "
+                       "'[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9]' OR time NOT GLOB '[0-9][0-9]:[0-9][0-9]'")
+        rows, unreadable = [], []
+        for time_slot_id, date, time in cursor.fetchall():
+            if parse_date(date) is None or parse_time(time) is None:
+                unreadable.append(time_slot_id)
+            else:
+                rows.append((normalize_date(date), normalize_time(time), time_slot_id))
+        if unreadable:
+            print(f"Slots with an unreadable date or time, left as they are: {', '.join(map(str, unreadable))}",
+                  file=sys.stderr)
+        if not rows:
+            return
+
+        cursor.executemany("UPDATE bookings SET date = ?, time = ? WHERE id = ?", rows)
+        cursor.execute("DELETE FROM day_summary")
+        cursor.execute(f"INSERT INTO day_summary {DAY_SUMMARY_SELECT} GROUP BY date")
+        cursor.connection.commit()
+
     def _execute(self, query, params=None, fetch=True) -> tuple[int, str, list[Any]]:
         """Execute a query and return the result"""
         print("Checking database integrity...")
@@ -95,3 +219,86 @@ class Database:
     def execute_update(self, query, params=None) -> tuple[int, str]:
         """Execute an update query"""
         return self._execute(query, params, fetch=False)
+
+    def execute_transaction(self, callback) -> tuple[int, str, Any]:
+        """Run callback(cursor) inside a single immediate write transaction and return its result"""
+        writer = self.writer
+        if writer is not None and writer is not threading.current_thread():
+            result = writer.submit(callback)
+            if result is not None:
+                self.last_commit = clock.time()
+                return result
+            # The writer was stopped in the meantime; the transaction runs here instead
+
+        ret, err = self.check_db_integrity()
+        if ret != DATABASE_SUCCESS:
+            return DATABASE_ERROR, f"Database integrity check failed; {str(err)}", None
+
+        try:
+            connection = self.connect()
+        except ValueError as e:
+            return DATABASE_ERROR, str(e), None
+
+        with closing(connection):
+            # Transactions are handled explicitly to take the write lock before reading
+            connection.isolation_level = None
+            with closing(connection.cursor()) as cursor:
+                try:
+                    cursor.execute("BEGIN IMMEDIATE")
+                    result = callback(cursor)
+                    cursor.execute("COMMIT")
+                    self.last_commit = clock.time()
+                    return DATABASE_SUCCESS, "", result
+                except sqlite3.Error as e:
+                    if connection.in_transaction:
+                        connection.rollback()
+                    return DATABASE_ERROR, str(e), None
+                except BaseException:
+                    if connection.in_transaction:
+                        connection.rollback()
+                    raise
+
+    def start_group_commit(self, max_batch=64, max_delay=0.002) -> GroupCommitWriter:
+        """Route the transactions through a writer thread committing them in groups"""
+        if self.writer is None:
+            self.writer = GroupCommitWriter(self, max_batch, max_delay)
+            self.writer.start()
+
+        return self.writer
+
+    def stop_group_commit(self):
+        """Commit the queued transactions and run the next ones in their calling thread again"""
+        writer, self.writer = self.writer, None
+        if writer is not None:
+            writer.stop()
+            writer.join()
+
+    def stream_query(self, query, params=None, batch_size=500) -> tuple[int, str, Iterator[list[Any]]]:
+        """Execute a query and return an iterator over its rows fetched in batches"""
+        ret, err = self.check_db_integrity()
+        if ret != DATABASE_SUCCESS:
+            return DATABASE_ERROR, f"Database integrity check failed; {str(err)}", iter(())
+
+        connection = None
+        try:
+            connection = self.connect()
+            cursor = connection.execute(query, params or ())
+        except (sqlite3.Error, ValueError) as e:
+            if connection is not None:
+                connection.close()
+            return DATABASE_ERROR, str(e), iter(())
+
+        return DATABASE_SUCCESS, "", self._iterate_batches(connection, cursor, batch_size)
+
+    @staticmethod
+    def _iterate_batches(connection, cursor, batch_size) -> Iterator[list[Any]]:
+        """Yield the rows of an executed cursor in batches, closing the connection at the end"""
+        try:
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    return
+                yield rows
+        finally:
+            cursor.close()
+            connection.close()
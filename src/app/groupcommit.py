@@ -0,0 +1,126 @@
+"""Group commit of the write transactions by a single writer thread"""
+
+import queue
+import sqlite3
+import threading
+import time as clock
+from contextlib import closing
+from typing import Any, Callable
+
+from .statuscodes import DATABASE_ERROR, DATABASE_SUCCESS
+
+
+class _Write:
+    """A transaction callback waiting for its group to be committed"""
+
+    __slots__ = ("callback", "done", "result", "exception")
+
+    def __init__(self, callback):
+        self.callback = callback
+        self.done = threading.Event()
+        self.result = None
+        self.exception = None
+
+
+class GroupCommitWriter(threading.Thread):
+    """Writer thread running the queued transaction callbacks in groups sharing one commit
+
+    A group is taken from the queue until it has max_batch callbacks or max_delay seconds
+    passed since its first one. Every callback runs in its own savepoint, so a failing
+    callback is rolled back alone; the others are only answered once the group committed.
+    """
+
+    def __init__(self, database, max_batch: int = 64, max_delay: float = 0.002):
+        super().__init__(name="group-commit-writer", daemon=True)
+        self.database = database
+        self.max_batch = max_batch
+        self.max_delay = max_delay
+        self.groups = 0
+        self._queue: queue.Queue = queue.Queue()
+        # Keeps callbacks from being queued behind the stop marker, where they would never run
+        self._lock = threading.Lock()
+        self._stopped = False
+
+    def submit(self, callback: Callable) -> tuple[int, str, Any] | None:
+        """Queue callback(cursor) and wait for the commit of its group; None once the writer is stopped"""
+        write = _Write(callback)
+        with self._lock:
+            if self._stopped:
+                return None
+            self._queue.put(write)
+        write.done.wait()
+        if write.exception is not None:
+            raise write.exception
+
+        return write.result
+
+    def run(self):
+        while (write := self._queue.get()) is not None:
+            group = [write]
+            deadline = clock.monotonic() + self.max_delay
+            while len(group) < self.max_batch:
+                try:
+                    write = self._queue.get(timeout=max(0.0, deadline - clock.monotonic()))
+                except queue.Empty:
+                    break
+                if write is None:
+                    # Stop after this group
+                    self._queue.put(None)
+                    break
+                group.append(write)
+
+            self._commit(group)
+
+    def stop(self):
+        """Stop the writer once the queued callbacks are committed"""
+        with self._lock:
+            self._stopped = True
+            self._queue.put(None)
+
+    def _commit(self, group: list[_Write]):
+        """Run a group of callbacks in a single transaction and answer them"""
+        try:
+            ret, err = self.database.check_db_integrity()
+            if ret != DATABASE_SUCCESS:
+                self._fail(group, f"Database integrity check failed; {str(err)}")
+                return
+
+            with closing(self.database.connect()) as connection:
+                connection.isolation_level = None
+                with closing(connection.cursor()) as cursor:
+                    cursor.execute("BEGIN IMMEDIATE")
+                    for write in group:
+                        self._run(cursor, write)
+                    cursor.execute("COMMIT")
+        except Exception as e:
+            # The writer has to keep answering, whatever went wrong with this group
+            self._fail(group, str(e))
+            return
+        finally:
+            self.groups += 1
+
+        for write in group:
+            write.done.set()
+
+    @staticmethod
+    def _run(cursor, write: _Write):
+        """Run a callback in its own savepoint"""
+        cursor.execute("SAVEPOINT write")
+        try:
+            write.result = DATABASE_SUCCESS, "", write.callback(cursor)
+        except sqlite3.Error as e:
+            cursor.execute("ROLLBACK TO write")
+            write.result = DATABASE_ERROR, str(e), None
+        except Exception as e:
+            # Raised again in the thread which submitted the callback
+            cursor.execute("ROLLBACK TO write")
+            write.exception = e
+        cursor.execute("RELEASE write")
+
+    @staticmethod
+    def _fail(group: list[_Write], err: str):
+        """Answer every callback of a group that could not be committed"""
+        for write in group:
+            if write.exception is None:
+                write.result = DATABASE_ERROR, err, None
+            write.done.set()
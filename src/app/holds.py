@@ -0,0 +1,113 @@
+"""Temporary holds on time slots and the sweeper releasing the expired ones"""
+
+import secrets
+import threading
+import time as clock
+
+from .services import NOT_SUPPORTED, db, sqlite_storage
+from .statuscodes import DATABASE_ERROR, VALIDATION_ERROR, VALIDATION_SUCCESS
+from .utils import Validator
+
+# Takes the hold unless an unexpired hold exists; the slot has to exist and be available
+ACQUIRE_HOLD_QUERY = """
+    INSERT INTO holds (slot_id, token, expires_at)
+    SELECT id, ?, ? FROM bookings WHERE id = ? AND available > 0
+    ON CONFLICT (slot_id) DO UPDATE SET token = excluded.token, expires_at = excluded.expires_at
+    WHERE holds.expires_at <= ?
+"""
+
+
+def hold_time_slot(time_slot_id, ttl, max_ttl) -> tuple[dict, dict, int]:
+    """Hold an available time slot for ttl seconds and return the hold token"""
+    if not sqlite_storage():
+        return NOT_SUPPORTED
+
+    ret, err = validate_hold_time_slot_input(time_slot_id, ttl, max_ttl)
+    if ret != VALIDATION_SUCCESS:
+        return None, {"error-msg": err}, 400
+
+    token = secrets.token_urlsafe(16)
+    now = clock.time()
+    expires_at = now + int(ttl)
+    ret, err, acquired = db.execute_transaction(
+        lambda cursor: cursor.execute(ACQUIRE_HOLD_QUERY, (token, expires_at, time_slot_id, now)).rowcount == 1)
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
+
+    if not acquired:
+        return None, {"error-msg": "Time slot not found, not available or already held"}, 409
+
+    return {"hold-token": token, "expires-at": expires_at}, None, 200
+
+
+def validate_hold_time_slot_input(time_slot_id, ttl, max_ttl) -> tuple[int, str]:
+    """Validate the input for holding a time slot"""
+    if time_slot_id is None or ttl is None:
+        return VALIDATION_ERROR, "Missing time slot id and/or ttl"
+
+    if Validator.validate_integer(time_slot_id) != VALIDATION_SUCCESS or \
+            Validator.validate_integer(ttl) != VALIDATION_SUCCESS or not 0 < int(ttl) <= max_ttl:
+        return VALIDATION_ERROR, f"Invalid time slot id and/or ttl; the ttl must be between 1 and {max_ttl} seconds"
+
+    return VALIDATION_SUCCESS, ""
+
+
+def release_hold(time_slot_id, token) -> tuple[dict, dict, int]:
+    """Release a hold before it expires"""
+    if not sqlite_storage():
+        return NOT_SUPPORTED
+
+    if time_slot_id is None or token is None:
+        return None, {"error-msg": "Missing time slot id and/or hold token"}, 400
+
+    if Validator.validate_integer(time_slot_id) != VALIDATION_SUCCESS:
+        return None, {"error-msg": "Invalid time slot id"}, 400
+
+    ret, err, released = db.execute_transaction(
+        lambda cursor: cursor.execute("DELETE FROM holds WHERE slot_id = ? AND token = ?",
+                                      (time_slot_id, token)).rowcount == 1)
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
+
+    if not released:
+        return None, {"error-msg": "Hold not found"}, 400
+
+    return {"error-msg": ""}, None, 200
+
+
+def release_expired_holds(batch_size=500) -> tuple[int, str, int]:
+    """Delete the expired holds in batches through the expiry index and return their count"""
+    released = 0
+    now = clock.time()
+    while True:
+        ret, err, count = db.execute_transaction(
+            lambda cursor: cursor.execute(
+                "DELETE FROM holds WHERE slot_id IN "
+                "(SELECT slot_id FROM holds WHERE expires_at <= ? ORDER BY expires_at LIMIT ?)",
+                (now, batch_size)).rowcount)
+        if ret == DATABASE_ERROR:
+            return ret, err, released
+        released += count
+        if count < batch_size:
+            return ret, "", released
+
+
+class HoldSweeper(threading.Thread):
+    """Background thread releasing the expired holds periodically
+
+    Expired holds are already ignored by every query, the sweeper only keeps the table small.
+    """
+
+    def __init__(self, interval, batch_size=500):
+        super().__init__(name="hold-sweeper", daemon=True)
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            release_expired_holds(self.batch_size)
+
+    def stop(self):
+        """Stop the sweeper after its current batch"""
+        self._stopped.set()
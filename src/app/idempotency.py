@@ -0,0 +1,101 @@
+"""Idempotency keys letting clients retry writes without repeating them"""
+
+import hashlib
+import json
+import threading
+import time as clock
+from typing import Callable, NamedTuple
+
+from .statuscodes import DATABASE_ERROR
+
+IDEMPOTENCY_KEY_HEADER = "Idempotency-Key"
+MAX_KEY_LENGTH = 255
+
+KEY_REUSED = (None, {"error-msg": "Idempotency key already used for a different request"}, 422)
+
+
+class Idempotency(NamedTuple):
+    """Hashed idempotency key and request fingerprint of a write"""
+    key: bytes
+    fingerprint: bytes
+    ttl: int
+
+
+def make_idempotency(key, method: str, path: str, fields: list[tuple[str, str]],
+                     ttl: int) -> tuple[str, Idempotency]:
+    """Hash the key and fingerprint the request of a write; None without a key"""
+    if key is None:
+        return "", None
+
+    if not 0 < len(key) <= MAX_KEY_LENGTH:
+        return f"Invalid {IDEMPOTENCY_KEY_HEADER} header; it must have 1 to {MAX_KEY_LENGTH} characters", None
+
+    fingerprint = hashlib.sha256(json.dumps([method, path, sorted(fields)]).encode()).digest()
+    return "", Idempotency(hashlib.sha256(key.encode()).digest(), fingerprint, ttl)
+
+
+def run_idempotent(cursor, idempotency: Idempotency, now: float,
+                   write: Callable[..., tuple]) -> tuple:
+    """Run write(cursor) once per key and return its response; runs inside a transaction
+
+    The response of the first run is stored with the key, so a retry gets it back without
+    writing again. Concurrent retries are serialized by the write transaction.
+    """
+    if idempotency is None:
+        return write(cursor)
+
+    cursor.execute("SELECT fingerprint, status, response FROM idempotency_keys WHERE key = ? AND expires_at > ?",
+                   (idempotency.key, now))
+    stored = cursor.fetchone()
+    if stored is not None:
+        fingerprint, status, response = stored
+        if fingerprint != idempotency.fingerprint:
+            return KEY_REUSED
+        body = json.loads(response)
+        return (body, None, status) if status < 400 else (None, body, status)
+
+    result, error, status = write(cursor)
+    cursor.execute("INSERT OR REPLACE INTO idempotency_keys (key, fingerprint, status, response, expires_at) "
+                   "VALUES (?, ?, ?, ?, ?)",
+                   (idempotency.key, idempotency.fingerprint, status, json.dumps(result or error),
+                    now + idempotency.ttl))
+    return result, error, status
+
+
+def purge_expired_keys(database, batch_size=500) -> tuple[int, str, int]:
+    """Delete the expired keys in batches through the expiry index and return their count"""
+    purged = 0
+    now = clock.time()
+    while True:
+        ret, err, count = database.execute_transaction(
+            lambda cursor: cursor.execute(
+                "DELETE FROM idempotency_keys WHERE key IN "
+                "(SELECT key FROM idempotency_keys WHERE expires_at <= ? ORDER BY expires_at LIMIT ?)",
+                (now, batch_size)).rowcount)
+        if ret == DATABASE_ERROR:
+            return ret, err, purged
+        purged += count
+        if count < batch_size:
+            return ret, "", purged
+
+
+class KeyPurger(threading.Thread):
+    """Background thread purging the expired idempotency keys periodically
+
+    Expired keys are already ignored by every lookup, the purger only bounds the table.
+    """
+
+    def __init__(self, database, interval, batch_size=500):
+        super().__init__(name="idempotency-key-purger", daemon=True)
+        self.database = database
+        self.interval = interval
+        self.batch_size = batch_size
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            purge_expired_keys(self.database, self.batch_size)
+
+    def stop(self):
+        """Stop the purger after its current batch"""
+        self._stopped.set()
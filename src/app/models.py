@@ -0,0 +1,35 @@
+"""Value types of the booking backend"""
+
+from typing import NamedTuple
+
+
+class TimeSlot(NamedTuple):
+    """A bookable time slot, laid out like a row of the bookings table"""
+
+    id: int
+    date: str
+    time: str
+    duration: int
+    available: int
+
+
+SLOT_COLUMNS = ", ".join(TimeSlot._fields)
+
+
+class SlotTemplate(NamedTuple):
+    """A recurring schedule of slots, laid out like a row of the slot_templates table
+
+    weekdays is a bitmask with bit 0 for Monday; the slots follow each other from
+    start_time until end_time on every day of the validity.
+    """
+
+    id: int
+    weekdays: int
+    start_time: str
+    end_time: str
+    duration: int
+    valid_from: str
+    valid_until: str | None
+
+
+TEMPLATE_COLUMNS = ", ".join(SlotTemplate._fields)
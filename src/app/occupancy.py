@@ -0,0 +1,129 @@
+"""Per-date occupancy bitmaps used for constant time overlap checks
+
+A slot running past midnight covers minutes of the following dates too; the bitmap of a
+date has the minutes of every slot covering it, whatever the date the slot starts on.
+"""
+
+import sqlite3
+
+from .parsing import MINUTES_PER_DAY, format_date, parse_date
+
+# Longest slot; bounds how many days before a date the slots running into it can start
+MAX_SLOT_MINUTES = 7 * MINUTES_PER_DAY
+
+# Number of dates looked up per query; stays below SQLite's variable limit
+_DATES_PER_QUERY = 500
+
+
+def slot_mask(start: int, duration: int) -> int:
+    """Return the bitmap of the minutes covered by a slot; bit n is minute n of the day"""
+    if duration <= 0:
+        return 0
+
+    return ((1 << duration) - 1) << start
+
+
+def instant_masks(start_at: int, end_at: int) -> dict[str, int]:
+    """Return the bitmaps of the minutes covered on each date by an interval of absolute minutes
+
+    Absolute minutes count from midnight of the first day of the proleptic Gregorian
+    calendar, i.e. date ordinal * MINUTES_PER_DAY + minute of the day.
+    """
+    masks = {}
+    for ordinal in range(start_at // MINUTES_PER_DAY, (end_at - 1) // MINUTES_PER_DAY + 1):
+        day_start = ordinal * MINUTES_PER_DAY
+        first, last = max(start_at, day_start) - day_start, min(end_at, day_start + MINUTES_PER_DAY) - day_start
+        masks[format_date(ordinal)] = slot_mask(first, last - first)
+
+    return masks
+
+
+def slot_masks(date: str, start: int, duration: int) -> dict[str, int]:
+    """Return the bitmaps of the minutes covered by a slot on each date it spans"""
+    start_at = parse_date(date) * MINUTES_PER_DAY + start
+    return instant_masks(start_at, start_at + duration)
+
+
+def spanned_dates(date: str, start_at: int | None, end_at: int | None) -> list[str]:
+    """Return the dates whose bitmaps include a stored slot, from its date and absolute instants"""
+    if start_at is None:
+        return [date]
+
+    return sorted({date, *instant_masks(start_at, end_at)})
+
+
+def build_bitmaps(cursor: sqlite3.Cursor, dates: list[str]) -> dict[str, int]:
+    """Build the occupancy bitmaps of the given dates from the bookings
+
+    Every run of consecutive dates is read with one range query on the absolute instants
+    of the slots, starting MAX_SLOT_MINUTES early for the slots running into the run.
+    """
+    bitmaps = {date: 0 for date in dates}
+    ordinals = sorted({parse_date(date) for date in dates})
+    runs = []
+    for ordinal in ordinals:
+        if runs and runs[-1][1] == ordinal - 1:
+            runs[-1][1] = ordinal
+        else:
+            runs.append([ordinal, ordinal])
+
+    for first, last in runs:
+        run_start, run_end = first * MINUTES_PER_DAY, (last + 1) * MINUTES_PER_DAY
+        cursor.execute("SELECT start_at, end_at FROM bookings WHERE start_at >= ? AND start_at < ? AND end_at > ?",
+                       (run_start - MAX_SLOT_MINUTES, run_end, run_start))
+        for start_at, end_at in cursor.fetchall():
+            for date, mask in instant_masks(max(start_at, run_start), min(end_at, run_end)).items():
+                bitmaps[date] |= mask
+
+    return bitmaps
+
+
+def _encode(bitmap: int) -> bytes:
+    """Encode a bitmap for the occupancy table"""
+    return bitmap.to_bytes((bitmap.bit_length() + 7) // 8, "little")
+
+
+def _decode(blob: bytes) -> int:
+    """Decode a bitmap of the occupancy table"""
+    return int.from_bytes(blob, "little")
+
+
+class OccupancyIndex:
+    """Occupancy bitmaps persisted in the occupancy table
+
+    Every method takes a cursor and has to run inside the write transaction that changes
+    the slots of the date, which keeps the table exact for every process sharing the
+    database. A bitmap is read with a primary key lookup in the transaction, which holds
+    the write lock of the overlap check anyway.
+    """
+
+    def load(self, cursor: sqlite3.Cursor, dates: list[str]) -> dict[str, int]:
+        """Return the bitmaps of the given dates, building the missing ones from the bookings"""
+        bitmaps = {}
+        for offset in range(0, len(dates), _DATES_PER_QUERY):
+            chunk = dates[offset:offset + _DATES_PER_QUERY]
+            placeholders = ", ".join("?" * len(chunk))
+            cursor.execute(f"SELECT date, bitmap FROM occupancy WHERE date IN ({placeholders})", chunk)
+            bitmaps.update((date, _decode(blob)) for date, blob in cursor.fetchall())
+
+        missing = [date for date in dates if date not in bitmaps]
+        if missing:
+            built = build_bitmaps(cursor, missing)
+            self.store(cursor, built)
+            bitmaps.update(built)
+
+        return bitmaps
+
+    def store(self, cursor: sqlite3.Cursor, bitmaps: dict[str, int]):
+        """Persist the given bitmaps"""
+        cursor.executemany("INSERT OR REPLACE INTO occupancy (date, bitmap) VALUES (?, ?)",
+                           [(date, _encode(bitmap)) for date, bitmap in bitmaps.items()])
+
+    def rebuild(self, cursor: sqlite3.Cursor, dates: list[str]) -> dict[str, int]:
+        """Rebuild the bitmaps of the given dates from the bookings"""
+        self.discard(cursor, dates)
+        return self.load(cursor, dates)
+
+    def discard(self, cursor: sqlite3.Cursor, dates: list[str]):
+        """Remove the bitmaps of the given dates; they are rebuilt on their next load"""
+        cursor.executemany("DELETE FROM occupancy WHERE date = ?", [(date,) for date in dates])
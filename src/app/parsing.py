@@ -0,0 +1,80 @@
+"""Fast parsing of the date and time strings used by the booking backend"""
+
+import re
+from datetime import date as date_cls
+from functools import lru_cache
+
+# Same inputs as strptime's "%Y-%m-%d" and "%H:%M" without the locale machinery
+_DATE_PATTERN = re.compile(r"([0-9]{4})-([0-9]{1,2})-([0-9]{1,2})")
+_TIME_PATTERN = re.compile(r"([0-9]{1,2}):([0-9]{1,2})")
+
+_DAYS_IN_MONTH = (0, 31, 29, 31, 30, 31, 30, 31, 31, 30, 31, 30, 31)
+
+MINUTES_PER_DAY = 24 * 60
+
+
+def parse_date(value) -> int | None:
+    """Parse a 'YYYY-MM-DD' string to a date ordinal, None if it is invalid"""
+    # Checked before the cache, which cannot hash lists and dicts of JSON bodies
+    if not isinstance(value, str):
+        return None
+
+    return _parse_date(value)
+
+
+@lru_cache(maxsize=4096)
+def _parse_date(value: str) -> int | None:
+    """Parse a date string, cached"""
+    match = _DATE_PATTERN.fullmatch(value)
+    if match is None:
+        return None
+
+    year, month, day = int(match[1]), int(match[2]), int(match[3])
+    if year < 1 or not 1 <= month <= 12 or not 1 <= day <= _DAYS_IN_MONTH[month]:
+        return None
+    if month == 2 and day == 29 and not (year % 4 == 0 and (year % 100 != 0 or year % 400 == 0)):
+        return None
+
+    return date_cls(year, month, day).toordinal()
+
+
+def parse_time(value) -> int | None:
+    """Parse a 'HH:MM' string to the minute of the day, None if it is invalid"""
+    if not isinstance(value, str):
+        return None
+
+    return _parse_time(value)
+
+
+@lru_cache(maxsize=2048)
+def _parse_time(value: str) -> int | None:
+    """Parse a time string, cached"""
+    match = _TIME_PATTERN.fullmatch(value)
+    if match is None:
+        return None
+
+    hour, minute = int(match[1]), int(match[2])
+    if hour > 23 or minute > 59:
+        return None
+
+    return hour * 60 + minute
+
+
+def format_date(ordinal: int) -> str:
+    """Format a date ordinal as 'YYYY-MM-DD'"""
+    return date_cls.fromordinal(ordinal).isoformat()
+
+
+def normalize_date(value: str | None) -> str | None:
+    """Return a valid date in the zero-padded form the dates are stored in, None for None"""
+    return format_date(parse_date(value)) if value is not None else None
+
+
+def format_time(minute_of_day: int) -> str:
+    """Format a minute of the day as 'HH:MM'"""
+    return f"{minute_of_day // 60:02d}:{minute_of_day % 60:02d}"
+
+
+def normalize_time(value: str | None) -> str | None:
+    """Return a valid time in the zero-padded form the times are stored in, None for None"""
+    return format_time(parse_time(value)) if value is not None else None
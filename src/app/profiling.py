@@ -0,0 +1,109 @@
+"""Opt-in request profiling for the booking endpoints"""
+
+import cProfile
+import io
+import marshal
+import pstats
+import random
+import threading
+from functools import wraps
+
+from flask import current_app, request
+
+from .auth import is_admin_request
+
+PROFILE_HEADER = "X-Profile"
+
+
+class ProfileStore:
+    """Thread-safe store of profiles aggregated per endpoint"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._stats: dict[str, pstats.Stats] = {}
+        self._samples: dict[str, int] = {}
+
+    def add(self, key: str, profile: cProfile.Profile):
+        """Merge a finished profile into the stats of the given endpoint"""
+        stats = pstats.Stats(profile)
+        with self._lock:
+            if key in self._stats:
+                self._stats[key].add(stats)
+            else:
+                self._stats[key] = stats
+            self._samples[key] = self._samples.get(key, 0) + 1
+
+    def keys(self) -> list[str]:
+        """Return the endpoints which have at least one profile"""
+        with self._lock:
+            return sorted(self._stats)
+
+    def summary(self) -> dict[str, dict]:
+        """Return the sample count and total time for each endpoint"""
+        with self._lock:
+            return {key: {"samples": self._samples[key],
+                          "total_calls": stats.total_calls,
+                          "total_time": stats.total_tt}
+                    for key, stats in self._stats.items()}
+
+    def render(self, key: str, sort: str = "cumulative", limit: int = 50) -> str:
+        """Return the aggregated stats of an endpoint as text"""
+        with self._lock:
+            stats = self._stats.get(key)
+            if stats is None:
+                return ""
+            stream = io.StringIO()
+            stats.stream = stream
+            stats.sort_stats(sort).print_stats(limit)
+            return stream.getvalue()
+
+    def dump(self, key: str) -> bytes:
+        """Return the aggregated stats of an endpoint in the pstats file format"""
+        with self._lock:
+            stats = self._stats.get(key)
+            return marshal.dumps(stats.stats) if stats is not None else b""
+
+    def reset(self):
+        """Drop every collected profile"""
+        with self._lock:
+            self._stats.clear()
+            self._samples.clear()
+
+
+profile_store = ProfileStore()
+
+
+def should_profile() -> bool:
+    """Decide whether the current request should be profiled"""
+    if request.headers.get(PROFILE_HEADER) == "1" and is_admin_request():
+        return True
+
+    if not current_app.config.get("PROFILING_ENABLED"):
+        return False
+
+    return random.random() < current_app.config.get("PROFILING_SAMPLE_RATE", 1.0)
+
+
+def profiled(view):
+    """Decorator running a view under cProfile when profiling is requested"""
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        if not should_profile():
+            return view(*args, **kwargs)
+
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is already active in this interpreter
+            return view(*args, **kwargs)
+
+        try:
+            return view(*args, **kwargs)
+        finally:
+            profile.disable()
+            rule = request.url_rule.rule if request.url_rule else request.path
+            profile_store.add(f"{request.method} {rule}", profile)
+
+    return wrapper
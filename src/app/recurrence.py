@@ -0,0 +1,98 @@
+"""Recurring slot templates and the lazy materialization of their slots"""
+
+import sqlite3
+import threading
+from datetime import date as date_cls
+from typing import Callable, Iterable
+
+from .models import SlotTemplate
+from .parsing import format_date, format_time, parse_date, parse_time
+from .storage import SqliteSlotStore
+
+WEEKDAYS = ("mon", "tue", "wed", "thu", "fri", "sat", "sun")
+
+
+def parse_weekdays(value) -> int | None:
+    """Parse comma separated weekdays and ranges, e.g. 'mon-fri,sun', into a bitmask; None if invalid"""
+    if not isinstance(value, str):
+        return None
+
+    mask = 0
+    for part in value.lower().split(","):
+        first, dash, last = part.strip().partition("-")
+        if first not in WEEKDAYS or (dash and last not in WEEKDAYS):
+            return None
+        start, end = WEEKDAYS.index(first), WEEKDAYS.index(last or first)
+        if end < start:
+            return None
+        for weekday in range(start, end + 1):
+            mask |= 1 << weekday
+
+    return mask
+
+
+def format_weekdays(mask: int) -> str:
+    """Format a weekday bitmask as comma separated weekdays"""
+    return ",".join(weekday for index, weekday in enumerate(WEEKDAYS) if mask >> index & 1)
+
+
+def due_dates(templates: Iterable[SlotTemplate], first: int, last: int) -> set[tuple[int, str]]:
+    """Return the (template id, date) pairs of the days between two date ordinals a template applies to"""
+    pairs = set()
+    for template in templates:
+        valid_until = parse_date(template.valid_until) if template.valid_until else last
+        for ordinal in range(max(first, parse_date(template.valid_from)), min(last, valid_until) + 1):
+            if template.weekdays >> date_cls.fromordinal(ordinal).weekday() & 1:
+                pairs.add((template.id, format_date(ordinal)))
+
+    return pairs
+
+
+def template_slots(template: SlotTemplate, date: str) -> list[tuple]:
+    """Return the slots of a template on a date as insert candidates of the slot store"""
+    start, end, duration = parse_time(template.start_time), parse_time(template.end_time), template.duration
+    return [(date, minute, duration, format_time(minute), 1, template.id)
+            for minute in range(start, end - duration + 1, duration)]
+
+
+def materialize(cursor: sqlite3.Cursor, store: SqliteSlotStore, templates: Iterable[SlotTemplate],
+                pairs: set[tuple[int, str]]) -> int:
+    """Insert the slots of the given (template id, date) pairs not materialized yet and return their count
+
+    The slots are checked for overlaps in bulk against the stored slots, one-off or
+    materialized before, and each other; overlapping ones are skipped. A materialized date
+    is recorded even if all its slots were skipped, so slots deleted later stay deleted.
+    """
+    if not pairs:
+        return 0
+
+    dates = sorted({date for _, date in pairs})
+    cursor.execute("SELECT template_id, date FROM template_dates WHERE date BETWEEN ? AND ?", (dates[0], dates[-1]))
+    pending = sorted(pairs - set(cursor.fetchall()), key=lambda pair: (pair[1], pair[0]))
+    by_id = {template.id: template for template in templates}
+    candidates = [slot for template_id, date in pending for slot in template_slots(by_id[template_id], date)]
+
+    rejected = store.insert_slots(cursor, candidates) if candidates else []
+    cursor.executemany("INSERT OR IGNORE INTO template_dates (date, template_id) VALUES (?, ?)",
+                       [(date, template_id) for template_id, date in pending])
+    return len(candidates) - len(rejected)
+
+
+class TemplateMaterializer(threading.Thread):
+    """Background thread materializing the slots of the templates a few weeks ahead periodically"""
+
+    def __init__(self, job: Callable[[], object], interval):
+        super().__init__(name="template-materializer", daemon=True)
+        self.job = job
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while True:
+            self.job()
+            if self._stopped.wait(self.interval):
+                return
+
+    def stop(self):
+        """Stop the materializer after its current run"""
+        self._stopped.set()
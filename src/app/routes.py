@@ -1,14 +1,55 @@
 """This module contains the Flask application that serves the booking API"""
 
-from flask import Blueprint, request
-from flask_restx import Api, Namespace, Resource, fields
+import io
 
-from .services import (book_time_slot, create_time_slot, delete_time_slot,
-                       get_time_slots)
+from flask import Blueprint, Response, current_app, request
+from flask_restx import Namespace, Resource, fields
+
+from .admission import admission_controlled
+from .apidoc import LazyDocApi
+from .auth import is_admin_request
+from .backup import create_backup, list_backups, restore_backup
+from .batch import run_batch
+from .bulk import export_time_slots, import_time_slots
+from .holds import hold_time_slot, release_hold
+from .idempotency import IDEMPOTENCY_KEY_HEADER, make_idempotency
+from .profiling import profile_store, profiled
+from .schema import ModelValidator
+from .serializer import dumps, encode_slots, encode_slots_columnar, iter_encode_slots
+from .services import (book_time_slot, cancel_reservation, create_template, create_time_slot, delete_template,
+                       delete_time_slot, find_free_windows, get_archived_time_slots, get_day_summaries, get_templates,
+                       query_time_slots, reserve_seat, stream_time_slots)
+
+# Shape of the 'HH:MM' times; their range is checked by the services
+TIME_PATTERN = r"[0-9]{1,2}:[0-9]{1,2}"
 
 bp = Blueprint('bookings', __name__)
-api = Api(bp, doc="/docs")
-bookings_ns = Namespace('bookings', description='Booking operations')
+api = LazyDocApi(bp, doc="/docs")
+bookings_ns = Namespace('bookings', description='Booking operations', decorators=[admission_controlled, profiled])
+admin_ns = Namespace('admin', description='Administrative operations')
+
+# Error body shared by the endpoints
+error_response_model = api.model('ErrorResponse', {
+    'error-msg': fields.String(description='Error message')
+})
+
+
+def request_values(validator: ModelValidator) -> tuple[str, dict]:
+    """Validate the JSON or form body of the current request and return its coerced values"""
+    if not request.is_json:
+        return validator(request.form)
+
+    body = request.get_json(silent=True)
+    if not isinstance(body, dict):
+        return "Invalid JSON body; an object is expected", None
+
+    return validator(body)
+
+
+def request_idempotency(values: dict):
+    """Return the idempotency of the current write request, None without the header"""
+    return make_idempotency(request.headers.get(IDEMPOTENCY_KEY_HEADER), request.method, request.path,
+                            list(values.items()), current_app.config['IDEMPOTENCY_TTL'])
 
 
 class Bookings(Resource):
@@ -27,103 +68,619 @@ class Bookings(Resource):
         'slots': fields.List(fields.Nested(time_slot_model), description='List of time slots.')
     })
 
-    get_time_slots_response_model_error = api.model('ErrorResponse', {
-        'error-msg': fields.String(description='Error message')
-    })
-
     @api.param('date', 'The date of which bookings should be returned.')
+    @api.param('end_date', 'Optional last date (inclusive) to return a range of dates.')
+    @api.param('stream', 'Set to 1 to stream the slots incrementally; the count is sent after them.')
+    @api.param('format', 'Set to "columnar" to get an array per field for every date instead of the slot objects.')
     @api.response(200, 'Success', get_time_slots_response_model_success)
-    @api.response(400, 'Invalid date format', get_time_slots_response_model_error)
-    @api.response(500, 'Internal Server Error', get_time_slots_response_model_error)
+    @api.response(400, 'Invalid date format', error_response_model)
+    @api.response(500, 'Internal Server Error', error_response_model)
     def get(self):
         """Return all booking time slots for the given date"""
         booking_date = request.args.get('date')
+        end_date = request.args.get('end_date')
+        response_format = request.args.get('format', 'objects')
+        if response_format not in ('objects', 'columnar'):
+            return {"error-msg": "Invalid format; valid formats are objects, columnar"}, 400
 
-        result, error, status = get_time_slots(booking_date)
+        if request.args.get('stream') == '1':
+            if response_format == 'columnar':
+                return {"error-msg": "The columnar format cannot be streamed"}, 400
+            batches, error, status = stream_time_slots(
+                booking_date, end_date, current_app.config['STREAM_BATCH_SIZE'])
+            if batches is None:
+                return error, status
 
-        return result or error, status
+            return Response(iter_encode_slots(batches), status=status, mimetype='application/json')
+
+        slots, error, status = query_time_slots(booking_date, end_date)
+        if slots is None:
+            return error, status
+
+        encode = encode_slots_columnar if response_format == 'columnar' else encode_slots
+        return Response(encode(slots), status=status, mimetype='application/json')
 
     create_time_slot_model = api.model('Create Time Slot', {
-        'date': fields.String(description='The date of the time slot'),
-        'time': fields.String(description='The time of the time slot'),
-        'duration': fields.Integer(description='The duration of the slot in minutes.')
+        'date': fields.Date(required=True, description='The date of the time slot'),
+        'time': fields.String(required=True, pattern=TIME_PATTERN, description='The time of the time slot'),
+        'duration': fields.Integer(required=True, description='The duration of the slot in minutes.'),
+        'capacity': fields.Integer(min=1, description='The number of seats of the slot, 1 by default.')
     })
+    validate_create_time_slot = ModelValidator(create_time_slot_model)
 
     create_time_slot_response_model_success = api.model('Create Time Slot Response', {
         'error-msg': fields.String(description='The error message if any.')
     })
 
-    create_time_slot_response_model_error = api.model('ErrorResponse', {
-        'error-msg': fields.String(description='Error message')
-    })
-
     @api.doc(responses={200: 'Success', 400: 'Bad Request', 500: 'Internal Server Error'})
     @api.expect(create_time_slot_model)
+    @api.header(IDEMPOTENCY_KEY_HEADER, 'Optional key making retries of the request safe.')
     @api.response(200, 'Success', create_time_slot_response_model_success)
-    @api.response(400, 'Invalid date format', create_time_slot_response_model_error)
-    @api.response(500, 'Internal Server Error', create_time_slot_response_model_error)
+    @api.response(400, 'Invalid date format', error_response_model)
+    @api.response(422, 'Idempotency key reused', error_response_model)
+    @api.response(500, 'Internal Server Error', error_response_model)
     def post(self):
         """Create a new booking time slot"""
-        date = request.form.get('date')
-        time = request.form.get('time')
-        duration = request.form.get('duration')
+        err, values = request_values(self.validate_create_time_slot)
+        if err:
+            return {"error-msg": err}, 400
 
-        result, error, status = create_time_slot(date, time, duration)
+        err, idempotency = request_idempotency(values)
+        if err:
+            return {"error-msg": err}, 400
+
+        result, error, status = create_time_slot(values['date'], values['time'], values['duration'],
+                                                 values['capacity'], idempotency)
 
         return result or error, status
 
     delete_time_slot_model = api.model('Delete Time Slot', {
-        'id': fields.Integer(description='The id of the time slot')
+        'id': fields.Integer(required=True, description='The id of the time slot')
     })
+    validate_delete_time_slot = ModelValidator(delete_time_slot_model)
 
     delete_time_slot_response_model_success = api.model('Delete Time Slot Response', {
         'error-msg': fields.String(description='The error message if any.')
     })
 
-    delete_time_slot_response_model_error = api.model('ErrorResponse', {
-        'error-msg': fields.String(description='Error message')
-    })
-
     @api.doc(responses={200: 'Success', 400: 'Bad Request', 500: 'Internal Server Error'})
     @api.expect(delete_time_slot_model)
     @api.response(200, 'Success', delete_time_slot_response_model_success)
-    @api.response(400, 'Invalid date format', delete_time_slot_response_model_error)
-    @api.response(500, 'Internal Server Error', delete_time_slot_response_model_error)
+    @api.response(400, 'Invalid date format', error_response_model)
+    @api.response(500, 'Internal Server Error', error_response_model)
     def delete(self):
         """Delete a booking time slot"""
-        time_slot_id = request.form.get('id')
+        err, values = request_values(self.validate_delete_time_slot)
+        if err:
+            return {"error-msg": err}, 400
 
-        result, error, status = delete_time_slot(time_slot_id)
+        result, error, status = delete_time_slot(values['id'])
 
         return result or error, status
 
     book_time_slot_model = api.model('Book Time Slot', {
-        'id': fields.Integer(description='The id of the time slot.'),
-        'available': fields.Integer(description='The new value to be set for available.')
+        'id': fields.Integer(required=True, description='The id of the time slot.'),
+        'available': fields.Integer(required=True, description='The new value to be set for available.'),
+        'hold_token': fields.String(description='The token of the hold on the slot, if any.')
     })
+    validate_book_time_slot = ModelValidator(book_time_slot_model)
 
     book_time_slot_response_model_success = api.model('Book Time Slot Response', {
         'error-msg': fields.String(description='The error message if any.')
     })
 
-    book_time_slot_response_model_error = api.model('ErrorResponse', {
-        'error-msg': fields.String(description='Error message')
-    })
-
     @api.doc(responses={200: 'Success', 400: 'Bad Request', 500: 'Internal Server Error'})
     @api.expect(book_time_slot_model)
+    @api.header(IDEMPOTENCY_KEY_HEADER, 'Optional key making retries of the request safe.')
     @api.response(200, 'Success', book_time_slot_response_model_success)
-    @api.response(400, 'Invalid date format', book_time_slot_response_model_error)
-    @api.response(500, 'Internal Server Error', book_time_slot_response_model_error)
+    @api.response(400, 'Invalid date format', error_response_model)
+    @api.response(409, 'Held by another client', error_response_model)
+    @api.response(422, 'Idempotency key reused', error_response_model)
+    @api.response(500, 'Internal Server Error', error_response_model)
     def put(self):
         """Book a time slot"""
+        err, values = request_values(self.validate_book_time_slot)
+        if err:
+            return {"error-msg": err}, 400
+
+        err, idempotency = request_idempotency(values)
+        if err:
+            return {"error-msg": err}, 400
+
+        result, error, status = book_time_slot(values['id'], values['available'], values['hold_token'],
+                                               idempotency)
+
+        return result or error, status
+
+
+class Holds(Resource):
+    """Temporary hold endpoints"""
+
+    hold_model = api.model('Hold Time Slot', {
+        'id': fields.Integer(description='The id of the time slot.'),
+        'ttl': fields.Integer(description='The number of seconds to hold the slot for.')
+    })
+
+    hold_response_model_success = api.model('Hold Time Slot Response', {
+        'hold-token': fields.String(description='The token to book or release the slot with.'),
+        'expires-at': fields.Float(description='The expiry of the hold as a unix timestamp.')
+    })
+
+    release_model = api.model('Release Hold', {
+        'id': fields.Integer(description='The id of the time slot.'),
+        'token': fields.String(description='The hold token.')
+    })
+
+    @api.expect(hold_model)
+    @api.response(200, 'Success', hold_response_model_success)
+    @api.response(400, 'Bad Request', error_response_model)
+    @api.response(409, 'Not available or already held', error_response_model)
+    @api.response(500, 'Internal Server Error', error_response_model)
+    def post(self):
+        """Hold an available time slot for a limited time"""
+        time_slot_id = request.form.get('id')
+        ttl = request.form.get('ttl', current_app.config['HOLD_DEFAULT_TTL'])
+
+        result, error, status = hold_time_slot(time_slot_id, ttl, current_app.config['HOLD_MAX_TTL'])
+
+        return result or error, status
+
+    @api.expect(release_model)
+    @api.response(200, 'Success')
+    @api.response(400, 'Bad Request', error_response_model)
+    @api.response(500, 'Internal Server Error', error_response_model)
+    def delete(self):
+        """Release a hold"""
         time_slot_id = request.form.get('id')
-        available = request.form.get('available')
+        token = request.form.get('token')
+
+        result, error, status = release_hold(time_slot_id, token)
+
+        return result or error, status
+
+
+class Reservations(Resource):
+    """Seat reservation endpoints"""
+
+    reserve_model = api.model('Reserve Seat', {
+        'id': fields.Integer(description='The id of the time slot.'),
+        'hold_token': fields.String(description='The token of the hold on the slot, if any.')
+    })
+
+    reserve_response_model_success = api.model('Reserve Seat Response', {
+        'reservation-id': fields.Integer(description='The id of the reservation.'),
+        'available': fields.Integer(description='The number of seats still available.')
+    })
+
+    cancel_model = api.model('Cancel Reservation', {
+        'id': fields.Integer(description='The id of the reservation.')
+    })
+
+    @api.expect(reserve_model)
+    @api.response(200, 'Success', reserve_response_model_success)
+    @api.response(400, 'Bad Request', error_response_model)
+    @api.response(409, 'Fully booked or held', error_response_model)
+    @api.response(500, 'Internal Server Error', error_response_model)
+    def post(self):
+        """Reserve a seat of a time slot"""
+        time_slot_id = request.form.get('id')
+        hold_token = request.form.get('hold_token')
+
+        result, error, status = reserve_seat(time_slot_id, hold_token)
+
+        return result or error, status
+
+    @api.expect(cancel_model)
+    @api.response(200, 'Success')
+    @api.response(400, 'Bad Request', error_response_model)
+    @api.response(500, 'Internal Server Error', error_response_model)
+    def delete(self):
+        """Cancel a reservation"""
+        reservation_id = request.form.get('id')
+
+        result, error, status = cancel_reservation(reservation_id)
+
+        return result or error, status
+
+
+class FreeWindows(Resource):
+    """Free window search endpoint"""
+
+    free_window_model = api.model('Free Window', {
+        'date': fields.String(description='The date of the window'),
+        'start': fields.String(description='The first free minute of the window'),
+        'end': fields.String(description='The end of the window, exclusive'),
+        'start_times': fields.List(fields.String, description='Candidate start times, if a step was given.')
+    })
+
+    free_windows_response_model_success = api.model('Free Windows Response', {
+        'count': fields.Integer(description='Number of windows returned.'),
+        'windows': fields.List(fields.Nested(free_window_model), description='List of free windows.')
+    })
+
+    @api.param('date', 'The first date to search.')
+    @api.param('end_date', 'Optional last date (inclusive) to search.')
+    @api.param('open', 'Optional opening time, 00:00 by default.')
+    @api.param('close', 'Optional closing time, the end of the day by default.')
+    @api.param('duration', 'The desired duration in minutes.')
+    @api.param('step', 'Optional step in minutes to list candidate start times.')
+    @api.response(200, 'Success', free_windows_response_model_success)
+    @api.response(400, 'Bad Request', error_response_model)
+    @api.response(500, 'Internal Server Error', error_response_model)
+    def get(self):
+        """Return the free windows of the given duration"""
+        result, error, status = find_free_windows(
+            request.args.get('date'), request.args.get('end_date'), request.args.get('open'),
+            request.args.get('close'), request.args.get('duration'), request.args.get('step'))
+        if result is None:
+            return error, status
+
+        response = Response(dumps(result), status=status, mimetype='application/json')
+        response.add_etag()
+        return response.make_conditional(request)
+
+
+class DaySummaries(Resource):
+    """Per-day summary endpoint for calendar views"""
+
+    day_summary_model = api.model('Day Summary', {
+        'date': fields.String(description='The date'),
+        'total': fields.Integer(description='Number of time slots of the date.'),
+        'available': fields.Integer(description='Number of time slots with an available seat.'),
+        'minutes_free': fields.Integer(description='Total duration of the available time slots in minutes.')
+    })
+
+    day_summaries_response_model_success = api.model('Day Summaries Response', {
+        'count': fields.Integer(description='Number of dates returned.'),
+        'days': fields.List(fields.Nested(day_summary_model), description='The dates having time slots.')
+    })
+
+    @api.param('month', 'The month to summarize as YYYY-MM, instead of a date range.')
+    @api.param('date', 'The first date to summarize.')
+    @api.param('end_date', 'Optional last date (inclusive) to summarize.')
+    @api.response(200, 'Success', day_summaries_response_model_success)
+    @api.response(400, 'Bad Request', error_response_model)
+    @api.response(500, 'Internal Server Error', error_response_model)
+    def get(self):
+        """Return the slot counts of the dates having time slots"""
+        result, error, status = get_day_summaries(
+            request.args.get('date'), request.args.get('end_date'), request.args.get('month'))
+        if result is None:
+            return error, status
+
+        response = Response(dumps(result), status=status, mimetype='application/json')
+        response.add_etag()
+        return response.make_conditional(request)
+
+
+class ArchivedBookings(Resource):
+    """Archived time slot endpoint"""
+
+    archived_slot_model = api.model('Archived Time Slot', {
+        'id': fields.Integer(description='The time slot id'),
+        'date': fields.String(description='The date of the time slot'),
+        'time': fields.String(description='The start time of the time slot'),
+        'duration': fields.Integer(description='The duration in minutes'),
+        'available': fields.Integer(description='The seats left when the slot was archived'),
+        'capacity': fields.Integer(description='The seats of the time slot')
+    })
+
+    archived_response_model_success = api.model('Archived Time Slots Response', {
+        'count': fields.Integer(description='Number of time slots returned.'),
+        'slots': fields.List(fields.Nested(archived_slot_model), description='List of archived time slots.')
+    })
+
+    @api.param('date', 'The first date to query.')
+    @api.param('end_date', 'Optional last date (inclusive) to query.')
+    @api.response(200, 'Success', archived_response_model_success)
+    @api.response(400, 'Bad Request', error_response_model)
+    @api.response(500, 'Internal Server Error', error_response_model)
+    def get(self):
+        """Return the archived time slots of a date or a date range"""
+        result, error, status = get_archived_time_slots(request.args.get('date'), request.args.get('end_date'))
+
+        return result or error, status
+
 
-        result, error, status = book_time_slot(time_slot_id, available)
+class Templates(Resource):
+    """Recurring slot template endpoints"""
+
+    template_model = api.model('Slot Template', {
+        'id': fields.Integer(description='The template id'),
+        'weekdays': fields.String(description='The weekdays of the template, e.g. "mon,tue,wed,thu,fri"'),
+        'start_time': fields.String(description='The start time of the first slot of a day'),
+        'end_time': fields.String(description='The time the last slot of a day ends by'),
+        'duration': fields.Integer(description='The duration of the slots in minutes'),
+        'valid_from': fields.String(description='The first date of the template'),
+        'valid_until': fields.String(description='The last date of the template, if any')
+    })
+
+    templates_response_model_success = api.model('Slot Templates Response', {
+        'count': fields.Integer(description='Number of templates returned.'),
+        'templates': fields.List(fields.Nested(template_model), description='List of templates.')
+    })
+
+    create_template_model = api.model('Create Slot Template', {
+        'weekdays': fields.String(required=True, description='Weekdays and ranges, e.g. "mon-fri" or "sat,sun".'),
+        'start_time': fields.String(required=True, pattern=TIME_PATTERN, description='The start of the first slot.'),
+        'end_time': fields.String(required=True, pattern=TIME_PATTERN, description='The time the slots end by.'),
+        'duration': fields.Integer(required=True, description='The duration of the slots in minutes.'),
+        'valid_from': fields.Date(description='The first date of the template, today by default.'),
+        'valid_until': fields.Date(description='The last date of the template; open-ended by default.')
+    })
+    validate_create_template = ModelValidator(create_template_model)
+
+    create_template_response_model_success = api.model('Create Slot Template Response', {
+        'id': fields.Integer(description='The id of the template.')
+    })
+
+    delete_template_model = api.model('Delete Slot Template', {
+        'id': fields.Integer(required=True, description='The id of the template')
+    })
+    validate_delete_template = ModelValidator(delete_template_model)
+
+    @api.response(200, 'Success', templates_response_model_success)
+    @api.response(500, 'Internal Server Error', error_response_model)
+    @api.response(501, 'Not supported by the storage engine', error_response_model)
+    def get(self):
+        """Return the recurring slot templates"""
+        result, error, status = get_templates()
+
+        return result or error, status
+
+    @api.expect(create_template_model)
+    @api.response(200, 'Success', create_template_response_model_success)
+    @api.response(400, 'Bad Request', error_response_model)
+    @api.response(403, 'Forbidden', error_response_model)
+    @api.response(500, 'Internal Server Error', error_response_model)
+    @api.response(501, 'Not supported by the storage engine', error_response_model)
+    def post(self):
+        """Create a recurring slot template, whose slots are created when their dates are first queried"""
+        if not is_admin_request():
+            return {"error-msg": "Admin token required"}, 403
+
+        err, values = request_values(self.validate_create_template)
+        if err:
+            return {"error-msg": err}, 400
+
+        result, error, status = create_template(values['weekdays'], values['start_time'], values['end_time'],
+                                                values['duration'], values['valid_from'], values['valid_until'])
 
         return result or error, status
 
+    @api.expect(delete_template_model)
+    @api.response(200, 'Success')
+    @api.response(400, 'Bad Request', error_response_model)
+    @api.response(403, 'Forbidden', error_response_model)
+    @api.response(500, 'Internal Server Error', error_response_model)
+    @api.response(501, 'Not supported by the storage engine', error_response_model)
+    def delete(self):
+        """Delete a slot template; the slots it created are kept"""
+        if not is_admin_request():
+            return {"error-msg": "Admin token required"}, 403
+
+        err, values = request_values(self.validate_delete_template)
+        if err:
+            return {"error-msg": err}, 400
+
+        result, error, status = delete_template(values['id'])
+
+        return result or error, status
+
+
+BULK_MIMETYPES = {'csv': 'text/csv', 'ndjson': 'application/x-ndjson'}
+
+
+class BookingsImport(Resource):
+    """Bulk import endpoint"""
+
+    import_response_model_success = api.model('Import Time Slots Response', {
+        'imported': fields.Integer(description='Number of imported time slots.'),
+        'rejected': fields.Integer(description='Number of invalid or overlapping records.'),
+        'errors': fields.List(fields.Raw, description='The first errors with their line numbers.')
+    })
+
+    @api.param('format', 'Either "csv" or "ndjson"; guessed from the content type by default.')
+    @api.response(200, 'Success', import_response_model_success)
+    @api.response(400, 'Bad Request', error_response_model)
+    @api.response(403, 'Forbidden', error_response_model)
+    @api.response(500, 'Internal Server Error', error_response_model)
+    def post(self):
+        """Import time slots from a CSV or NDJSON body or uploaded file"""
+        if not is_admin_request():
+            return {"error-msg": "Admin token required"}, 403
+
+        upload = request.files.get('file')
+        stream = upload.stream if upload else request.stream
+        mimetype = upload.mimetype if upload else request.mimetype
+        file_format = request.args.get('format') or \
+            ('ndjson' if mimetype == BULK_MIMETYPES['ndjson'] else 'csv')
+
+        result, error, status = import_time_slots(
+            io.TextIOWrapper(stream, encoding='utf-8', newline=''), file_format)
+
+        return result or error, status
+
+
+class BookingsBatch(Resource):
+    """Transactional batch endpoint"""
+
+    batch_operation_model = api.model('Batch Operation', {
+        'op': fields.String(description='One of "create", "delete" or "book".'),
+        'id': fields.Integer(description='The id of the time slot to delete or book.'),
+        'date': fields.String(description='The date of the time slot to create.'),
+        'time': fields.String(description='The time of the time slot to create.'),
+        'duration': fields.Integer(description='The duration in minutes of the time slot to create.'),
+        'capacity': fields.Integer(description='The number of seats of the time slot to create.'),
+        'available': fields.Integer(description='The availability of the time slot to book.'),
+        'hold_token': fields.String(description='The token of the hold on the time slot to book.')
+    })
+
+    batch_model = api.model('Batch', {
+        'operations': fields.List(fields.Nested(batch_operation_model), description='The operations in order.')
+    })
+
+    batch_response_model_success = api.model('Batch Response', {
+        'results': fields.List(fields.Raw, description='The result of every operation.')
+    })
+
+    @api.expect(batch_model)
+    @api.response(200, 'Success', batch_response_model_success)
+    @api.response(400, 'Bad Request', error_response_model)
+    @api.response(403, 'Forbidden', error_response_model)
+    @api.response(409, 'Held by another client', error_response_model)
+    @api.response(500, 'Internal Server Error', error_response_model)
+    def post(self):
+        """Run create, delete and book operations in a single transaction, all or nothing"""
+        if not is_admin_request():
+            return {"error-msg": "Admin token required"}, 403
+
+        body = request.get_json(silent=True)
+        operations = body.get('operations') if isinstance(body, dict) else None
+
+        result, error, status = run_batch(operations)
+
+        return result or error, status
+
+
+class BookingsExport(Resource):
+    """Bulk export endpoint"""
+
+    @api.param('format', 'Either "csv" (default) or "ndjson".')
+    @api.param('date', 'Optional first date to export.')
+    @api.param('end_date', 'Optional last date to export.')
+    @api.response(200, 'Success')
+    @api.response(400, 'Bad Request', error_response_model)
+    @api.response(500, 'Internal Server Error', error_response_model)
+    def get(self):
+        """Export time slots as CSV or NDJSON"""
+        file_format = request.args.get('format', 'csv')
+
+        chunks, error, status = export_time_slots(
+            file_format, request.args.get('date'), request.args.get('end_date'),
+            current_app.config['STREAM_BATCH_SIZE'])
+        if chunks is None:
+            return error, status
+
+        return Response(chunks, status=status, mimetype=BULK_MIMETYPES[file_format])
+
+
+class Profiles(Resource):
+    """Profiling endpoints"""
+
+    @api.param('endpoint', 'The profiled endpoint, e.g. "GET /bookings".')
+    @api.param('format', 'Either "json" (summary), "text" or "pstats".')
+    @api.response(200, 'Success')
+    @api.response(400, 'Bad Request', error_response_model)
+    @api.response(403, 'Forbidden', error_response_model)
+    def get(self):
+        """Download the aggregated profiling stats"""
+        if not is_admin_request():
+            return {"error-msg": "Admin token required"}, 403
+
+        output_format = request.args.get('format', 'json')
+        if output_format == 'json':
+            return profile_store.summary(), 200
+
+        endpoint = request.args.get('endpoint')
+        if endpoint not in profile_store.keys():
+            return {"error-msg": "No profile collected for the given endpoint"}, 400
+
+        if output_format == 'text':
+            return Response(profile_store.render(endpoint), mimetype='text/plain')
+        if output_format == 'pstats':
+            return Response(profile_store.dump(endpoint), mimetype='application/octet-stream',
+                            headers={'Content-Disposition': 'attachment; filename=profile.pstats'})
+
+        return {"error-msg": "Invalid format"}, 400
+
+    @api.response(200, 'Success')
+    @api.response(403, 'Forbidden', error_response_model)
+    def delete(self):
+        """Discard the collected profiles"""
+        if not is_admin_request():
+            return {"error-msg": "Admin token required"}, 403
+
+        profile_store.reset()
+        return {"error-msg": ""}, 200
+
 
 bookings_ns.add_resource(Bookings, '')
+bookings_ns.add_resource(Holds, '/hold')
+bookings_ns.add_resource(Reservations, '/reservations')
+bookings_ns.add_resource(FreeWindows, '/free')
+bookings_ns.add_resource(DaySummaries, '/summary')
+bookings_ns.add_resource(ArchivedBookings, '/archive')
+bookings_ns.add_resource(Templates, '/templates')
+bookings_ns.add_resource(BookingsImport, '/import')
+bookings_ns.add_resource(BookingsBatch, '/batch')
+bookings_ns.add_resource(BookingsExport, '/export')
+
+
+class Backups(Resource):
+    """Online backup endpoints"""
+
+    backup_response_model_success = api.model('Backup Response', {
+        'name': fields.String(description='The file name of the backup in the backup directory.'),
+        'pages': fields.Integer(description='The number of database pages copied.')
+    })
+
+    @api.response(200, 'Success')
+    @api.response(400, 'Bad Request', error_response_model)
+    @api.response(403, 'Forbidden', error_response_model)
+    def get(self):
+        """List the backups, newest first"""
+        if not is_admin_request():
+            return {"error-msg": "Admin token required"}, 403
+
+        result, error, status = list_backups(current_app.config['BACKUP_DIR'])
+
+        return result or error, status
+
+    @api.response(200, 'Success', backup_response_model_success)
+    @api.response(400, 'Bad Request', error_response_model)
+    @api.response(403, 'Forbidden', error_response_model)
+    @api.response(500, 'Internal Server Error', error_response_model)
+    def post(self):
+        """Back the database up without blocking the writers"""
+        if not is_admin_request():
+            return {"error-msg": "Admin token required"}, 403
+
+        config = current_app.config
+        result, error, status = create_backup(config['BACKUP_DIR'], config['BACKUP_STEP_PAGES'],
+                                              config['BACKUP_STEP_DELAY'])
+
+        return result or error, status
+
+
+class BackupRestore(Resource):
+    """Restore endpoint"""
+
+    restore_model = api.model('Restore Backup', {
+        'name': fields.String(required=True, description='The file name of the backup to restore.')
+    })
+    validate_restore = ModelValidator(restore_model)
+
+    @api.expect(restore_model)
+    @api.response(200, 'Success', error_response_model)
+    @api.response(400, 'Bad Request', error_response_model)
+    @api.response(403, 'Forbidden', error_response_model)
+    def post(self):
+        """Replace the database with a backup after validating it"""
+        if not is_admin_request():
+            return {"error-msg": "Admin token required"}, 403
+
+        err, values = request_values(self.validate_restore)
+        if values is None:
+            return {"error-msg": err}, 400
+
+        result, error, status = restore_backup(current_app.config['BACKUP_DIR'], values['name'])
+
+        return result or error, status
+
+
+admin_ns.add_resource(Profiles, '/profiles')
+admin_ns.add_resource(Backups, '/backups')
+admin_ns.add_resource(BackupRestore, '/backups/restore')
 api.add_namespace(bookings_ns)
+api.add_namespace(admin_ns)
@@ -0,0 +1,86 @@
+"""Request validators compiled from the flask_restx models of the API"""
+
+import re
+from typing import Any, Callable, Mapping
+
+from flask_restx import fields
+
+from .parsing import parse_date
+
+# Returned by the field checks for values which cannot be coerced
+_INVALID = object()
+
+
+def _integer_check(field: fields.Integer) -> Callable[[Any], Any]:
+    """Compile the check of an integer field, accepting JSON integers and integer strings"""
+    minimum, maximum = field.minimum, field.maximum
+
+    def check(value):
+        if isinstance(value, str):
+            try:
+                value = int(value)
+            except ValueError:
+                return _INVALID
+        elif type(value) is not int:
+            return _INVALID
+        if (minimum is not None and value < minimum) or (maximum is not None and value > maximum):
+            return _INVALID
+        return value
+
+    return check
+
+
+def _date_check(_field: fields.Date) -> Callable[[Any], Any]:
+    """Compile the check of a 'YYYY-MM-DD' date field, which stays a string"""
+    return lambda value: value if isinstance(value, str) and parse_date(value) is not None else _INVALID
+
+
+def _string_check(field: fields.String) -> Callable[[Any], Any]:
+    """Compile the check of a string field and its pattern"""
+    if field.pattern is None:
+        return lambda value: value if isinstance(value, str) else _INVALID
+
+    match = re.compile(field.pattern).fullmatch
+    return lambda value: value if isinstance(value, str) and match(value) else _INVALID
+
+
+# Most specific field types first, as e.g. Date derives from DateTime
+_FIELD_CHECKS = ((fields.Integer, _integer_check), (fields.Date, _date_check), (fields.String, _string_check))
+
+
+def _compile_field(field) -> Callable[[Any], Any]:
+    """Return the check of a model field"""
+    for field_type, compile_check in _FIELD_CHECKS:
+        if isinstance(field, field_type):
+            return compile_check(field)
+
+    raise TypeError(f"Cannot validate fields of type {type(field).__name__}")
+
+
+class ModelValidator:
+    """Validator coercing and type-checking request data against a model in a single pass
+
+    The checks of the fields are compiled once; fields missing from the data are None,
+    fields which are not in the model are ignored.
+    """
+
+    __slots__ = ("_checks",)
+
+    def __init__(self, model):
+        self._checks = tuple((name, bool(field.required), _compile_field(field)) for name, field in model.items())
+
+    def __call__(self, data: Mapping) -> tuple[str, dict]:
+        """Return the coerced values of the data, or the error of the first invalid field"""
+        values = {}
+        for name, required, check in self._checks:
+            value = data.get(name)
+            if value is None:
+                if required:
+                    return f"Missing field '{name}'", None
+            else:
+                value = check(value)
+                if value is _INVALID:
+                    return f"Invalid field '{name}'", None
+            values[name] = value
+
+        return "", values
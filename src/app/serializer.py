@@ -0,0 +1,62 @@
+"""JSON encoding of responses without intermediate dictionaries"""
+
+import json
+from itertools import groupby
+from json.encoder import encode_basestring_ascii
+from typing import Iterable, Iterator
+
+from .models import TimeSlot
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+_SLOT_TEMPLATE = '{"id":%d,"date":%s,"time":%s,"duration":%d,"available":%d}'
+
+
+def dumps(obj) -> bytes:
+    """Encode an object to JSON bytes, using orjson when it is installed"""
+    if orjson is not None:
+        return orjson.dumps(obj)
+
+    return json.dumps(obj, separators=(",", ":")).encode()
+
+
+def encode_slot(slot: TimeSlot) -> str:
+    """Encode a single time slot (or bookings row) as a JSON object"""
+    try:
+        return _SLOT_TEMPLATE % (slot[0], encode_basestring_ascii(slot[1]),
+                                 encode_basestring_ascii(slot[2]), slot[3], slot[4])
+    except TypeError:
+        # Unexpected column types (e.g. NULL values) take the generic path
+        return dumps(dict(zip(TimeSlot._fields, slot))).decode()
+
+
+def encode_slots(slots: list[TimeSlot]) -> bytes:
+    """Encode a list of time slots as the get time slots response"""
+    return (f'{{"count":{len(slots)},"slots":['
+            + ",".join([encode_slot(slot) for slot in slots])
+            + ']}').encode()
+
+
+def iter_encode_slots(batches: Iterable[list[tuple]]) -> Iterator[bytes]:
+    """Incrementally encode batches of time slots, sending the count after the slots"""
+    count = 0
+    yield b'{"slots":['
+    for batch in batches:
+        chunk = ",".join([encode_slot(slot) for slot in batch])
+        yield (chunk if count == 0 else "," + chunk).encode()
+        count += len(batch)
+    yield f'],"count":{count}}}'.encode()
+
+
+def encode_slots_columnar(slots: list[TimeSlot]) -> bytes:
+    """Encode time slots sorted by date as the compact response: one array per field for every date"""
+    days = []
+    for date, day_slots in groupby(slots, key=lambda slot: slot.date):
+        ids, times, durations, availables = zip(*[(slot.id, slot.time, slot.duration, slot.available)
+                                                   for slot in day_slots])
+        days.append({"date": date, "id": ids, "time": times, "duration": durations, "available": availables})
+
+    return dumps({"count": len(slots), "days": days})
@@ -1,34 +1,458 @@
 """Module for the business logic of the application"""
 
-from datetime import datetime
-from .database import Database
-
+import calendar
+import time as clock
+from datetime import date as date_cls
+from typing import Iterator
 
-from .statuscodes import VALIDATION_ERROR, VALIDATION_SUCCESS, DATABASE_ERROR, SUCCESS
+from .archive import ARCHIVED_SLOT_COLUMNS, ArchiveDatabase, archive_slots, compact
+from .database import Database
+from .models import TEMPLATE_COLUMNS, SlotTemplate, TimeSlot
+from .occupancy import MAX_SLOT_MINUTES, OccupancyIndex
+from .parsing import (MINUTES_PER_DAY, format_date, format_time, normalize_date, normalize_time, parse_date,
+                      parse_time)
+from .recurrence import due_dates, format_weekdays, materialize, parse_weekdays
+from .singleflight import SingleFlight
+from .snapshot import SnapshotReader
+from .storage import STORAGE_ENGINES, MemorySlotStore, SlotStore, SqliteSlotStore
+from .summary import rebuild_summaries, refresh_summaries
+
+
+from .statuscodes import VALIDATION_ERROR, VALIDATION_SUCCESS, DATABASE_ERROR, SLOT_SEATS_EXCEEDED, SUCCESS
 from .utils import Validator, TimeUtils
 
 db = Database('data.sqlite')
+occupancy = OccupancyIndex()
+# The archived slots; next to the bookings table unless another file is configured
+archive = ArchiveDatabase('data.sqlite')
+# The configured storage engine; None stores the time slots in db
+storage: SlotStore = None
+# Snapshot file of the upcoming slots answering the listings it covers; None lists from the storage engine
+snapshot: SnapshotReader = None
+NOT_SUPPORTED = None, {"error-msg": "Not supported by the configured storage engine"}, 501
+# Concurrent identical listings share one query; waiters give up after the timeout
+reads = SingleFlight()
+READ_COALESCING_TIMEOUT = 5.0
+
+MAX_FREE_WINDOW_DAYS = 366
+MAX_SUMMARY_DAYS = 366
+# Template slots are only materialized from today until this many days ahead
+MAX_TEMPLATE_DAYS = 366
+# The (template id, date) pairs this process knows to be materialized; forgotten past the limit
+materialized_templates: set[tuple[int, str]] = set()
+MAX_MATERIALIZED_TEMPLATES = 100000
+# The templates as last read by this process, None until read; read again after this process created
+# or deleted one, and past the time to live for the templates created or deleted by another process
+cached_templates: list[SlotTemplate] = None
+cached_templates_at = 0.0
+TEMPLATE_CACHE_TTL = 60.0
+
+
+def select_storage(engine: str):
+    """Select the storage engine of the time slots"""
+    global storage
+    if engine not in STORAGE_ENGINES:
+        raise ValueError(f"Invalid storage engine {engine!r}; valid engines are {', '.join(STORAGE_ENGINES)}")
+
+    storage = MemorySlotStore() if engine == "memory" else None
+
+
+def select_archive(path: str):
+    """Keep the archived slots in the given file, or in the main database file without a path"""
+    global archive
+    archive = ArchiveDatabase(path or db.db_path)
+
+
+def select_snapshot(path: str):
+    """List the time slots covered by the snapshot file at the given path from it, none without a path"""
+    global snapshot
+    snapshot = SnapshotReader(path) if path else None
+
 
+def slot_store() -> SlotStore:
+    """Return the storage engine of the time slots"""
+    return storage or SqliteSlotStore(db, occupancy)
 
-def get_time_slots(booking_date) -> tuple[str, str, int]:
+
+def sqlite_storage() -> bool:
+    """Check whether the time slots are stored in the SQLite database, which holds and reservations need"""
+    return storage is None
+
+
+def get_time_slots(booking_date, end_date=None) -> tuple[str, str, int]:
     """Return all booking time slots for the given date"""
-    ret, err = validate_get_timeslot_input(booking_date)
+    slots, error, status = query_time_slots(booking_date, end_date)
+    if slots is None:
+        return None, error, status
+
+    json_results = [slot._asdict() for slot in slots]
+
+    return {"count": len(json_results), "slots": json_results}, None, 200
+
+
+def query_time_slots(booking_date, end_date=None) -> tuple[list[TimeSlot], str, int]:
+    """Return all booking time slots for the given date (or date range) as TimeSlot values"""
+    ret, err = validate_get_timeslot_input(booking_date, end_date)
     if ret != VALIDATION_SUCCESS:
         return None, {"error-msg": err}, 400
+    # Stored dates are zero-padded, so are the bounds of their text comparisons
+    booking_date, end_date = normalize_date(booking_date), normalize_date(end_date)
 
-    ret, err, results = db.execute_query(
-        'SELECT id, date, time, duration, available FROM bookings WHERE date=?', (booking_date,))
+    ret, err = materialize_templates(booking_date, end_date)
     if ret == DATABASE_ERROR:
         return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
 
-    booking_columns = ["id", "date", "time", "duration", "available"]
-    json_results = [dict(zip(booking_columns, result_row))
-                    for result_row in results]
+    if snapshot is not None and sqlite_storage():
+        # A client reading its own writes is answered from the database until the snapshot has them
+        slots = snapshot.list_slots(booking_date, end_date, db.last_commit)
+        if slots is not None:
+            return slots, None, 200
 
-    return {"count": len(json_results), "slots": json_results}, None, 200
+    store = slot_store()
+    ret, err, slots = reads.do((booking_date, end_date), lambda: store.list_slots(booking_date, end_date),
+                               READ_COALESCING_TIMEOUT, lambda response: response[0] != DATABASE_ERROR)
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
+
+    return slots, None, 200
+
+
+def stream_time_slots(booking_date, end_date=None, batch_size=500) -> tuple[Iterator[list[tuple]], str, int]:
+    """Return an iterator over batches of the booking time slots for the given date (or date range)"""
+    ret, err = validate_get_timeslot_input(booking_date, end_date)
+    if ret != VALIDATION_SUCCESS:
+        return None, {"error-msg": err}, 400
+    booking_date, end_date = normalize_date(booking_date), normalize_date(end_date)
+
+    ret, err = materialize_templates(booking_date, end_date)
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
+
+    ret, err, batches = slot_store().stream_slots(booking_date, end_date, batch_size)
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
+
+    return batches, None, 200
+
+
+def find_free_windows(booking_date, end_date, open_time, close_time, duration,
+                      step=None) -> tuple[dict, dict, int]:
+    """Return the free windows of at least the given duration within the opening hours"""
+    ret, err = validate_find_free_windows_input(booking_date, end_date, open_time, close_time, duration, step)
+    if ret != VALIDATION_SUCCESS:
+        return None, {"error-msg": err}, 400
+
+    first_day, last_day = parse_date(booking_date), parse_date(end_date or booking_date)
+    ret, err = materialize_templates(booking_date, end_date)
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
+
+    # Slots of the previous days may run into the first days
+    lookback = MAX_SLOT_MINUTES // MINUTES_PER_DAY
+    ret, err, slots = slot_store().list_slots(format_date(first_day - lookback), format_date(last_day))
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
+
+    # Start minute relative to every day a slot covers, negative on the days after its date
+    busy_by_day = {}
+    for slot in slots:
+        start = parse_time(slot.time)
+        if start is not None:
+            start_at, slot_duration = parse_date(slot.date) * MINUTES_PER_DAY + start, int(slot.duration)
+            for ordinal in range(start_at // MINUTES_PER_DAY, (start_at + slot_duration - 1) // MINUTES_PER_DAY + 1):
+                busy_by_day.setdefault(ordinal, []).append((start_at - ordinal * MINUTES_PER_DAY, slot_duration))
+
+    open_start = parse_time(open_time) if open_time else 0
+    close_end = parse_time(close_time) if close_time else MINUTES_PER_DAY
+    duration, step = int(duration), int(step) if step else None
+    windows = []
+    for ordinal in range(first_day, last_day + 1):
+        date = format_date(ordinal)
+        for start, end in TimeUtils.find_free_windows(busy_by_day.get(ordinal, []), open_start, close_end, duration):
+            window = {"date": date, "start": format_time(start), "end": format_time(end)}
+            if step:
+                window["start_times"] = [format_time(minute) for minute in range(start, end - duration + 1, step)]
+            windows.append(window)
+
+    return {"count": len(windows), "windows": windows}, None, 200
+
+
+def validate_find_free_windows_input(date, end_date, open_time, close_time, duration, step) -> tuple[int, str]:
+    """Validate the input for finding free windows"""
+    if date is None or duration is None:
+        return VALIDATION_ERROR, "Missing input date and/or duration"
+
+    ret, err = validate_get_timeslot_input(date, end_date)
+    if ret != VALIDATION_SUCCESS:
+        return ret, err
+
+    if end_date is not None and parse_date(end_date) - parse_date(date) >= MAX_FREE_WINDOW_DAYS:
+        return VALIDATION_ERROR, f"The date range must not exceed {MAX_FREE_WINDOW_DAYS} days"
 
+    for value in (open_time, close_time):
+        if value is not None and Validator.validate_time(value) != VALIDATION_SUCCESS:
+            return VALIDATION_ERROR, "Invalid opening hours. Valid time format is 'HH:MM'"
+    if open_time is not None and close_time is not None and parse_time(close_time) <= parse_time(open_time):
+        return VALIDATION_ERROR, "The closing time must be after the opening time"
 
-def validate_get_timeslot_input(date) -> tuple[int, str]:
+    for value in (duration, step):
+        if value is not None and (Validator.validate_integer(value) != VALIDATION_SUCCESS or int(value) <= 0):
+            return VALIDATION_ERROR, "Invalid duration and/or step"
+
+    return VALIDATION_SUCCESS, ""
+
+
+def get_day_summaries(booking_date=None, end_date=None, month=None) -> tuple[dict, dict, int]:
+    """Return the slot counts of every date of a month or a date range having time slots"""
+    ret, err = validate_get_day_summaries_input(booking_date, end_date, month)
+    if ret != VALIDATION_SUCCESS:
+        return None, {"error-msg": err}, 400
+
+    if month is not None:
+        year, number = map(int, month.split("-"))
+        booking_date, end_date = f"{month}-01", f"{month}-{calendar.monthrange(year, number)[1]:02d}"
+    else:
+        booking_date, end_date = normalize_date(booking_date), normalize_date(end_date)
+
+    ret, err = materialize_templates(booking_date, end_date)
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
+
+    ret, err, summaries = slot_store().day_summaries(booking_date, end_date or booking_date)
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
+
+    return {"count": len(summaries), "days": [summary._asdict() for summary in summaries]}, None, 200
+
+
+def validate_get_day_summaries_input(date, end_date, month) -> tuple[int, str]:
+    """Validate the input for getting the day summaries"""
+    if month is not None:
+        if date is not None or end_date is not None:
+            return VALIDATION_ERROR, "Either a month or a date range is expected"
+        if len(month) != 7 or Validator.validate_date(f"{month}-01") != VALIDATION_SUCCESS:
+            return VALIDATION_ERROR, "Invalid month. Valid month format is 'YYYY-MM'"
+        return VALIDATION_SUCCESS, ""
+
+    ret, err = validate_get_timeslot_input(date, end_date)
+    if ret != VALIDATION_SUCCESS:
+        return ret, err
+
+    if end_date is not None and parse_date(end_date) - parse_date(date) >= MAX_SUMMARY_DAYS:
+        return VALIDATION_ERROR, f"The date range must not exceed {MAX_SUMMARY_DAYS} days"
+
+    return VALIDATION_SUCCESS, ""
+
+
+def rebuild_day_summaries() -> tuple[dict, dict, int]:
+    """Recompute the day summaries of every date from the bookings"""
+    if not sqlite_storage():
+        return NOT_SUPPORTED
+
+    ret, err, count = db.execute_transaction(rebuild_summaries)
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
+
+    return {"days": count}, None, 200
+
+
+def archive_past_slots(after_days, batch_size=500, vacuum_pages=1000) -> tuple[dict, dict, int]:
+    """Archive the slots dated more than after_days days ago, then compact the database"""
+    if not sqlite_storage():
+        return NOT_SUPPORTED
+
+    if Validator.validate_integer(after_days) != VALIDATION_SUCCESS or int(after_days) < 0:
+        return None, {"error-msg": "Invalid retention; it must be a non-negative number of days"}, 400
+
+    before_date = format_date(date_cls.fromtimestamp(clock.time()).toordinal() - int(after_days))
+    ret, err, archived = archive_slots(db, archive, occupancy, before_date, batch_size)
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error archiving the past slots after {archived}; error: {err}"}, 500
+
+    ret, err, freed = compact(db, vacuum_pages) if archived else (ret, err, 0)
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error compacting the database; error: {err}"}, 500
+
+    return {"archived": archived, "before": before_date, "freed-pages": freed}, None, 200
+
+
+def get_archived_time_slots(booking_date, end_date=None) -> tuple[dict, dict, int]:
+    """Return the archived time slots of a date or a date range"""
+    ret, err = validate_get_timeslot_input(booking_date, end_date)
+    if ret != VALIDATION_SUCCESS:
+        return None, {"error-msg": err}, 400
+    booking_date, end_date = normalize_date(booking_date), normalize_date(end_date)
+
+    ret, err, results = archive.execute_query(
+        f"SELECT {ARCHIVED_SLOT_COLUMNS} FROM bookings_archive WHERE date BETWEEN ? AND ? ORDER BY date, time",
+        (booking_date, end_date or booking_date))
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
+
+    slots = [dict(zip(ARCHIVED_SLOT_COLUMNS.split(", "), row)) for row in results]
+    return {"count": len(slots), "slots": slots}, None, 200
+
+
+def materialize_templates(booking_date, end_date=None) -> tuple[int, str]:
+    """Materialize the slots of the templates on the dates of a range, from today on, not materialized yet"""
+    first, last = parse_date(booking_date), parse_date(end_date or booking_date)
+    if not sqlite_storage() or first is None or last is None:
+        return SUCCESS, ""
+
+    today = date_cls.fromtimestamp(clock.time()).toordinal()
+    first, last = max(first, today), min(last, today + MAX_TEMPLATE_DAYS - 1)
+    if first > last:
+        return SUCCESS, ""
+
+    ret, err, templates = load_templates()
+    if ret == DATABASE_ERROR:
+        return ret, err
+
+    pending = due_dates(templates, first, last) - materialized_templates
+    if not pending:
+        return SUCCESS, ""
+
+    store = SqliteSlotStore(db, occupancy)
+    ret, err, _ = db.execute_transaction(lambda cursor: materialize(cursor, store, templates, pending))
+    if ret == DATABASE_ERROR:
+        return ret, err
+
+    if len(materialized_templates) + len(pending) > MAX_MATERIALIZED_TEMPLATES:
+        materialized_templates.clear()
+    materialized_templates.update(pending)
+    return SUCCESS, ""
+
+
+def load_templates() -> tuple[int, str, list[SlotTemplate]]:
+    """Return the templates, read from the database only when the cached ones are missing or expired"""
+    global cached_templates, cached_templates_at
+    now = clock.monotonic()
+    if cached_templates is not None and now - cached_templates_at < TEMPLATE_CACHE_TTL:
+        return SUCCESS, "", cached_templates
+
+    ret, err, rows = db.execute_query(f"SELECT {TEMPLATE_COLUMNS} FROM slot_templates")
+    if ret == DATABASE_ERROR:
+        return ret, err, []
+
+    cached_templates, cached_templates_at = [SlotTemplate(*row) for row in rows], now
+    return SUCCESS, "", cached_templates
+
+
+def forget_templates():
+    """Drop the cached templates, to read them again on the next materialization"""
+    global cached_templates
+    cached_templates = None
+
+
+def materialize_templates_ahead(days) -> tuple[dict, dict, int]:
+    """Materialize the slots of the templates from today until the given number of days ahead"""
+    if not sqlite_storage():
+        return NOT_SUPPORTED
+
+    if Validator.validate_integer(days) != VALIDATION_SUCCESS or not 0 < int(days) <= MAX_TEMPLATE_DAYS:
+        return None, {"error-msg": f"Invalid number of days; it must be between 1 and {MAX_TEMPLATE_DAYS}"}, 400
+
+    today = date_cls.fromtimestamp(clock.time()).toordinal()
+    first, last = format_date(today), format_date(today + int(days) - 1)
+    ret, err = materialize_templates(first, last)
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error materializing the templates; error: {err}"}, 500
+
+    return {"date": first, "end_date": last}, None, 200
+
+
+def get_templates() -> tuple[dict, dict, int]:
+    """Return the recurring slot templates"""
+    if not sqlite_storage():
+        return NOT_SUPPORTED
+
+    ret, err, rows = db.execute_query(f"SELECT {TEMPLATE_COLUMNS} FROM slot_templates ORDER BY id")
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
+
+    templates = [dict(SlotTemplate(*row)._asdict(), weekdays=format_weekdays(row[1])) for row in rows]
+    return {"count": len(templates), "templates": templates}, None, 200
+
+
+def create_template(weekdays, start_time, end_time, duration, valid_from=None,
+                    valid_until=None) -> tuple[dict, dict, int]:
+    """Create a recurring slot template; its slots are materialized when their dates are queried"""
+    if not sqlite_storage():
+        return NOT_SUPPORTED
+
+    ret, err = validate_create_template_input(weekdays, start_time, end_time, duration, valid_from, valid_until)
+    if ret != VALIDATION_SUCCESS:
+        return None, {"error-msg": err}, 400
+
+    valid_from = normalize_date(valid_from) or format_date(date_cls.fromtimestamp(clock.time()).toordinal())
+    valid_until = normalize_date(valid_until)
+    start_time, end_time = normalize_time(start_time), normalize_time(end_time)
+
+    def insert(cursor):
+        cursor.execute("INSERT INTO slot_templates (weekdays, start_time, end_time, duration, valid_from, "
+                       "valid_until) VALUES (?, ?, ?, ?, ?, ?)",
+                       (parse_weekdays(weekdays), start_time, end_time, int(duration), valid_from, valid_until))
+        return cursor.lastrowid
+
+    ret, err, template_id = db.execute_transaction(insert)
+    forget_templates()
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error inserting data to the database; error: {err}"}, 500
+
+    return {"id": template_id}, None, 200
+
+
+def validate_create_template_input(weekdays, start_time, end_time, duration, valid_from,
+                                   valid_until) -> tuple[int, str]:
+    """Validate the input for creating a slot template"""
+    if weekdays is None or start_time is None or end_time is None or duration is None:
+        return VALIDATION_ERROR, "Missing input to create a new template"
+
+    if not parse_weekdays(weekdays):
+        return VALIDATION_ERROR, "Invalid weekdays, e.g. 'mon-fri' or 'mon,wed,sat'"
+
+    if Validator.validate_time(start_time) != VALIDATION_SUCCESS or \
+            Validator.validate_time(end_time) != VALIDATION_SUCCESS:
+        return VALIDATION_ERROR, "Invalid start and/or end time. Valid time format is 'HH:MM'"
+
+    if Validator.validate_integer(duration) != VALIDATION_SUCCESS or \
+            not 0 < int(duration) <= parse_time(end_time) - parse_time(start_time):
+        return VALIDATION_ERROR, "Invalid duration; at least one slot must fit between the start and end time"
+
+    for value in (valid_from, valid_until):
+        if value is not None and Validator.validate_date(value) != VALIDATION_SUCCESS:
+            return VALIDATION_ERROR, "Invalid validity dates. Valid date format is 'YYYY-MM-DD'"
+    if valid_from is not None and valid_until is not None and parse_date(valid_until) < parse_date(valid_from):
+        return VALIDATION_ERROR, "The end of the validity must not be before its start"
+
+    return VALIDATION_SUCCESS, ""
+
+
+def delete_template(template_id) -> tuple[dict, dict, int]:
+    """Delete a slot template; the slots materialized already are kept"""
+    if not sqlite_storage():
+        return NOT_SUPPORTED
+
+    if Validator.validate_integer(template_id) != VALIDATION_SUCCESS:
+        return None, {"error-msg": "Invalid template id"}, 400
+
+    def delete(cursor):
+        cursor.execute("DELETE FROM slot_templates WHERE id = ?", (int(template_id),))
+        deleted = cursor.rowcount
+        cursor.execute("DELETE FROM template_dates WHERE template_id = ?", (int(template_id),))
+        return deleted
+
+    ret, err, deleted = db.execute_transaction(delete)
+    forget_templates()
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error deleting data from the database; error: {err}"}, 500
+    if not deleted:
+        return None, {"error-msg": "Template not found"}, 400
+
+    return {"error-msg": ""}, None, 200
+
+
+def validate_get_timeslot_input(date, end_date=None) -> tuple[int, str]:
     """Validate the input for getting a timeslot"""
     if date is None:
         return VALIDATION_ERROR, "Missing input date"
@@ -36,32 +460,42 @@ def validate_get_timeslot_input(date) -> tuple[int, str]:
     if Validator.validate_date(date) != VALIDATION_SUCCESS:
         return VALIDATION_ERROR, "Either the date or it's format is invalid. Valid date format is 'YYYY-MM-DD'"
 
+    if end_date is not None:
+        if Validator.validate_date(end_date) != VALIDATION_SUCCESS:
+            return VALIDATION_ERROR, "Either the end date or it's format is invalid. Valid date format is 'YYYY-MM-DD'"
+        if parse_date(end_date) < parse_date(date):
+            return VALIDATION_ERROR, "The end date must not be before the date"
+
     return VALIDATION_SUCCESS, ""
 
 
-def create_time_slot(date, time, duration) -> tuple[str, str, int]:
-    """Create a new booking time slot"""
-    ret, err = validate_create_time_slot_input(date, time, duration)
+def create_time_slot(date, time, duration, capacity=None, idempotency=None) -> tuple[str, str, int]:
+    """Create a new booking time slot, optionally with several seats, at most once per idempotency key"""
+    ret, err = validate_create_time_slot_input(date, time, duration, capacity)
     if ret != VALIDATION_SUCCESS:
         return None, {"error-msg": err}, 400
 
-    ret, err, bookings_for_today = db.execute_query(
-        "SELECT time, duration FROM bookings WHERE date = ?", (date,))
-    if ret == DATABASE_ERROR:
-        return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
+    # Stored zero-padded, which the date and time ranges and the absolute instants rely on
+    date, time = normalize_date(date), normalize_time(time)
+    start = parse_time(time)
+    capacity = int(capacity) if capacity is not None else 1
+
+    store = slot_store()
 
-    if check_for_overlaps(bookings_for_today, date, time, duration):
-        return None, {"error-msg": "Overlapping booking found"}, 400
+    def insert(transaction):
+        if not store.insert_slot(transaction, date, time, start, int(duration), capacity):
+            return None, {"error-msg": "Overlapping booking found"}, 400
+        return {"error-msg": ""}, None, 200
 
-    ret, err, _ = db.execute_update(
-        "INSERT INTO bookings (date, time, duration) VALUES (?, ?, ?)", (date, time, duration))
+    ret, err, response = store.atomic(
+        lambda transaction: store.idempotent(transaction, idempotency, clock.time(), insert))
     if ret == DATABASE_ERROR:
         return None, {"error-msg": f"Error inserting data to the database; error: {err}"}, 500
 
-    return {"error-msg": ""}, None, 200
+    return response
 
 
-def validate_create_time_slot_input(date, time, duration) -> tuple[int, str]:
+def validate_create_time_slot_input(date, time, duration, capacity=None) -> tuple[int, str]:
     """Validate the input for creating a time slot"""
     if date is None or time is None or duration is None:
         return VALIDATION_ERROR, "Missing input to create a new time slot"
@@ -71,23 +505,13 @@ def validate_create_time_slot_input(date, time, duration) -> tuple[int, str]:
             Validator.validate_integer(duration) != VALIDATION_SUCCESS:
         return VALIDATION_ERROR, "Invalid input to create a new time slot"
 
-    return VALIDATION_SUCCESS, ""
-
-
-def check_for_overlaps(bookings_for_today, date, time, duration) -> bool:
-    """Check for overlapping bookings"""
-    new_timeslot_start = datetime.strptime(f"{date} {time}", "%Y-%m-%d %H:%M")
-    for existing_start, existing_duration in bookings_for_today:
-        existing_start_dt = datetime.strptime(
-            f"{date} {existing_start}", "%Y-%m-%d %H:%M")
+    if not 0 < int(duration) <= MAX_SLOT_MINUTES:
+        return VALIDATION_ERROR, f"Invalid duration; it must be between 1 and {MAX_SLOT_MINUTES} minutes"
 
-        if TimeUtils.check_overlap(new_timeslot_start,
-                                   int(duration),
-                                   existing_start_dt,
-                                   int(existing_duration)):
-            return True
+    if capacity is not None and (Validator.validate_integer(capacity) != VALIDATION_SUCCESS or int(capacity) < 1):
+        return VALIDATION_ERROR, "Invalid capacity; it must be a positive integer"
 
-    return False
+    return VALIDATION_SUCCESS, ""
 
 
 def delete_time_slot(time_slot_id) -> tuple[str, str, int]:
@@ -96,18 +520,21 @@ def delete_time_slot(time_slot_id) -> tuple[str, str, int]:
     if ret != VALIDATION_SUCCESS:
         return None, {"error-msg": err}, 400
 
-    ret, err, exists = time_slot_exists(db, time_slot_id)
+    store = slot_store()
+    ret, err, exists = store.slot_exists(time_slot_id)
     if ret == DATABASE_ERROR:
         return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
 
     if not exists:
         return None, {"error-msg": "Time slot not found; err: {err}"}, 400
 
-    ret, err, _ = db.execute_update(
-        "DELETE FROM bookings WHERE id = ?", (time_slot_id,))
+    ret, err, date = store.atomic(lambda transaction: store.remove_slot(transaction, time_slot_id))
     if ret == DATABASE_ERROR:
         return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
 
+    if date is None:
+        return None, {"error-msg": "Time slot not found"}, 400
+
     return {"error-msg": ""}, None, 200
 
 
@@ -122,27 +549,112 @@ def validate_delete_time_slot_input(time_slot_id) -> tuple[int, str]:
     return VALIDATION_SUCCESS, ""
 
 
-def book_time_slot(time_slot_id, available) -> tuple[str, str, int]:
-    """Book a time slot"""
+def book_time_slot(time_slot_id, available, hold_token=None, idempotency=None) -> tuple[str, str, int]:
+    """Book a time slot, which is refused while another client holds it; at most once per idempotency key"""
     ret, err = validate_book_time_slot_input(time_slot_id, available)
     if ret != VALIDATION_SUCCESS:
         return None, {"error-msg": err}, 400
 
-    ret, err, exists = time_slot_exists(db, time_slot_id)
+    store = slot_store()
+    ret, err, exists = store.slot_exists(time_slot_id)
     if ret == DATABASE_ERROR:
         return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
 
     if not exists:
         return None, {"error-msg": "Time slot not found"}, 400
 
-    ret, err, _ = db.execute_update(
-        "UPDATE bookings SET available = ? WHERE id = ?", (available, time_slot_id,))
+    now = clock.time()
+
+    def update(transaction):
+        ret, err = store.set_availability(transaction, time_slot_id, available, hold_token, now)
+        if ret != SUCCESS:
+            return None, {"error-msg": err}, 400 if ret == SLOT_SEATS_EXCEEDED else 409
+        return {"error-msg": ""}, None, 200
+
+    ret, err, response = store.atomic(lambda transaction: store.idempotent(transaction, idempotency, now, update))
     if ret == DATABASE_ERROR:
         return None, {"error-msg": f"Error during database operation; error: {err}"}, 400
 
+    return response
+
+
+def reserve_seat(time_slot_id, hold_token=None) -> tuple[dict, dict, int]:
+    """Reserve one seat of a time slot and return the reservation id"""
+    if not sqlite_storage():
+        return NOT_SUPPORTED
+
+    if time_slot_id is None:
+        return None, {"error-msg": "Missing time slot id"}, 400
+
+    if Validator.validate_integer(time_slot_id) != VALIDATION_SUCCESS:
+        return None, {"error-msg": "Invalid time slot id"}, 400
+
+    ret, err, reservation = db.execute_transaction(
+        lambda cursor: insert_reservation(cursor, time_slot_id, hold_token, clock.time()))
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
+
+    if reservation is None:
+        return None, {"error-msg": "Time slot not found, fully booked or held by another client"}, 409
+
+    reservation_id, available = reservation
+    return {"reservation-id": reservation_id, "available": available}, None, 200
+
+
+def insert_reservation(cursor, time_slot_id, hold_token, now) -> tuple[int, int]:
+    """Take a seat with a single decrement-if-positive and record the reservation; runs inside a transaction"""
+    cursor.execute("""
+        UPDATE bookings SET available = available - 1
+        WHERE id = ? AND available > 0 AND NOT EXISTS (
+            SELECT 1 FROM holds WHERE slot_id = ? AND expires_at > ? AND token IS NOT ?)
+    """, (time_slot_id, time_slot_id, now, hold_token))
+    if cursor.rowcount != 1:
+        return None
+
+    cursor.execute("INSERT INTO reservations (slot_id, created_at) VALUES (?, ?)", (time_slot_id, now))
+    reservation_id = cursor.lastrowid
+    cursor.execute("SELECT available, date FROM bookings WHERE id = ?", (time_slot_id,))
+    available, date = cursor.fetchone()
+    refresh_summaries(cursor, [date])
+    return reservation_id, available
+
+
+def cancel_reservation(reservation_id) -> tuple[dict, dict, int]:
+    """Cancel a reservation, giving its seat back"""
+    if not sqlite_storage():
+        return NOT_SUPPORTED
+
+    if reservation_id is None:
+        return None, {"error-msg": "Missing reservation id"}, 400
+
+    if Validator.validate_integer(reservation_id) != VALIDATION_SUCCESS:
+        return None, {"error-msg": "Invalid reservation id"}, 400
+
+    ret, err, cancelled = db.execute_transaction(lambda cursor: delete_reservation(cursor, reservation_id))
+    if ret == DATABASE_ERROR:
+        return None, {"error-msg": f"Error during database operation; error: {err}"}, 500
+
+    if not cancelled:
+        return None, {"error-msg": "Reservation not found"}, 400
+
     return {"error-msg": ""}, None, 200
 
 
+def delete_reservation(cursor, reservation_id) -> bool:
+    """Delete a reservation and increment the seats of its slot; runs inside a transaction"""
+    cursor.execute("SELECT slot_id FROM reservations WHERE id = ?", (reservation_id,))
+    row = cursor.fetchone()
+    if row is None:
+        return False
+
+    cursor.execute("DELETE FROM reservations WHERE id = ?", (reservation_id,))
+    cursor.execute("UPDATE bookings SET available = available + 1 WHERE id = ? AND available < capacity",
+                   (row[0],))
+    cursor.execute("SELECT date FROM bookings WHERE id = ?", (row[0],))
+    refresh_summaries(cursor, [date for date, in cursor.fetchall()])
+    return True
+
+
 def validate_book_time_slot_input(time_slot_id, available) -> tuple[int, str]:
     """Validate the input for booking a time slot"""
     if time_slot_id is None or available is None:
@@ -154,12 +666,3 @@ def validate_book_time_slot_input(time_slot_id, available) -> tuple[int, str]:
 
     return VALIDATION_SUCCESS, ""
 
-
-def time_slot_exists(database, time_slot_id) -> tuple[int, str, bool]:
-    """Get the count of time slots with the given id"""
-    ret, err, time_slots = database.execute_query(
-        "SELECT available FROM bookings WHERE id = ?", (time_slot_id,))
-    if ret == DATABASE_ERROR:
-        return ret, err, None
-
-    return SUCCESS, "", len(time_slots) > 0
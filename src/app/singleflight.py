@@ -0,0 +1,57 @@
+"""Coalescing of concurrent identical calls into a single in-flight call"""
+
+import threading
+from typing import Any, Callable, Hashable
+
+
+class _Call:
+    """An in-flight call and its outcome"""
+
+    __slots__ = ("done", "result", "failed")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.failed = True
+
+
+class SingleFlight:
+    """Share the result of an in-flight call among the concurrent callers of the same key
+
+    The first caller of a key runs the call, the callers arriving meanwhile wait for its
+    result. A waiter falls through to its own call when the wait times out or when the
+    shared call raised or returned an unsuccessful result. Results are shared, not copied,
+    so they must not be mutated by the callers.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls: dict[Hashable, _Call] = {}
+
+    def do(self, key: Hashable, function: Callable[[], Any], timeout: float,
+           succeeded: Callable[[Any], bool] = None) -> Any:
+        """Return the result of function(), shared with the concurrent callers of key"""
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+
+        if not leader:
+            if call.done.wait(timeout) and not call.failed:
+                return call.result
+            return function()
+
+        try:
+            call.result = function()
+            call.failed = succeeded is not None and not succeeded(call.result)
+            return call.result
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def in_flight(self) -> int:
+        """Return the number of calls currently in flight"""
+        with self._lock:
+            return len(self._calls)
@@ -0,0 +1,232 @@
+"""Read-only snapshot of the upcoming time slots in a binary file shared by the worker processes
+
+Layout, little-endian: a header (magic, version, first date ordinal, number of days, time
+the slots were read at), an offset table with the index of the first record of every day
+plus the record count, and fixed-width records (id, start minute, duration, available)
+sorted by date and time.
+"""
+
+import mmap
+import os
+import sqlite3
+import struct
+import threading
+import time as clock
+from contextlib import closing
+from datetime import date as date_cls
+from pathlib import Path
+
+from .database import Database
+from .models import TimeSlot
+from .parsing import format_date, format_time, parse_date, parse_time
+from .statuscodes import DATABASE_ERROR, SUCCESS
+
+MAGIC = b"BKSNAP02"
+HEADER = struct.Struct("<8sQIId")
+OFFSET = struct.Struct("<I")
+RECORD = struct.Struct("<qHHi")
+
+
+class _Snapshot:
+    """A mapped snapshot file"""
+
+    __slots__ = ("key", "data", "version", "first", "days", "taken_at", "records")
+
+    def __init__(self, key, data, version, first, days, taken_at):
+        self.key = key
+        self.data = data
+        self.version = version
+        self.first = first
+        self.days = days
+        self.taken_at = taken_at
+        self.records = HEADER.size + (days + 1) * OFFSET.size
+
+    def offset(self, day: int) -> int:
+        """Return the index of the first record of a day of the snapshot"""
+        return OFFSET.unpack_from(self.data, HEADER.size + day * OFFSET.size)[0]
+
+
+def _file_key(stat: os.stat_result) -> tuple:
+    """Return what changes when a file is replaced or rewritten"""
+    return stat.st_ino, stat.st_mtime_ns, stat.st_size
+
+
+def _read_version(path: str) -> int:
+    """Return the version of a snapshot file, 0 if there is none"""
+    try:
+        with open(path, "rb") as file:
+            magic, version, _, _, _ = HEADER.unpack(file.read(HEADER.size))
+    except (OSError, struct.error):
+        return 0
+    return version if magic == MAGIC else 0
+
+
+def write_snapshot(database: Database, path: str, days: int, first_date: str = None) -> tuple[int, str, int]:
+    """Write the slots of the next days to the snapshot file and return its new version
+
+    The file is written next to the snapshot and renamed over it, so the readers map either
+    the previous or the new version, never a partial one.
+    """
+    taken_at = clock.time()
+    first = parse_date(first_date) if first_date else date_cls.fromtimestamp(taken_at).toordinal()
+    ret, err, slots = database.execute_query(
+        "SELECT id, date, time, duration, available FROM bookings WHERE date BETWEEN ? AND ? ORDER BY date, time",
+        (format_date(first), format_date(first + days - 1)))
+    if ret == DATABASE_ERROR:
+        return ret, err, 0
+
+    offsets = [0] * (days + 1)
+    records = bytearray(len(slots) * RECORD.size)
+    day = first
+    for index, (time_slot_id, date, time, duration, available) in enumerate(slots):
+        slot_day = parse_date(date)
+        try:
+            RECORD.pack_into(records, index * RECORD.size, time_slot_id, parse_time(time), duration, available or 0)
+        except struct.error:
+            slot_day, day = None, slot_day or day
+        if slot_day is None:
+            # A row that does not fit a record, e.g. a negative duration or an unreadable date or time:
+            # the snapshot stops before its day, or before the day of the previous row when its date is
+            # unreadable, and the days from there on are left to the database
+            days = day - first
+            break
+        day = slot_day
+        offsets[day - first + 1] = index + 1
+    offsets = offsets[:days + 1]
+    for day in range(1, days + 1):
+        offsets[day] = max(offsets[day], offsets[day - 1])
+    del records[offsets[days] * RECORD.size:]
+
+    version = _read_version(path) + 1
+    partial = f"{path}.{os.getpid()}.part"
+    try:
+        with open(partial, "wb") as file:
+            file.write(HEADER.pack(MAGIC, version, first, days, taken_at))
+            file.write(struct.pack(f"<{days + 1}I", *offsets))
+            file.write(records)
+        os.replace(partial, path)
+    except (OSError, struct.error) as e:
+        Path(partial).unlink(missing_ok=True)
+        return DATABASE_ERROR, str(e), 0
+
+    return SUCCESS, "", version
+
+
+class SnapshotReader:
+    """Lists the time slots of a snapshot file through a read-only memory map
+
+    The file is remapped when it has been replaced; the slots of a listing come from a
+    single version. Dates outside the days of the snapshot are left to the database.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._lock = threading.Lock()
+        self._snapshot: _Snapshot = None
+
+    def _current(self) -> _Snapshot | None:
+        """Return the mapped snapshot, remapping the file if it was replaced"""
+        try:
+            key = _file_key(os.stat(self.path))
+        except OSError:
+            return None
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.key == key:
+            return snapshot
+
+        with self._lock:
+            if self._snapshot is None or self._snapshot.key != key:
+                self._snapshot = self._map()
+            return self._snapshot
+
+    def _map(self) -> _Snapshot | None:
+        """Map the snapshot file, None if it is missing or invalid"""
+        try:
+            with open(self.path, "rb") as file:
+                key = _file_key(os.fstat(file.fileno()))
+                if key[2] < HEADER.size:
+                    return None
+                # The map stays valid after the file is replaced and is unmapped when its last reader is done
+                data = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+        except (OSError, ValueError):
+            return None
+
+        magic, version, first, days, taken_at = HEADER.unpack_from(data)
+        if magic != MAGIC or len(data) < HEADER.size + (days + 1) * OFFSET.size:
+            return None
+        snapshot = _Snapshot(key, data, version, first, days, taken_at)
+        if len(data) != snapshot.records + snapshot.offset(days) * RECORD.size:
+            return None
+        return snapshot
+
+    @property
+    def version(self) -> int:
+        """Version of the current snapshot, 0 without one"""
+        snapshot = self._current()
+        return snapshot.version if snapshot else 0
+
+    def list_slots(self, booking_date: str, end_date: str = None, changed_at: float = 0.0) -> list[TimeSlot] | None:
+        """Return the time slots of a date or date range, None if the snapshot does not cover it
+
+        A snapshot whose slots were read before changed_at, e.g. the last write of the
+        calling process, may miss that write and is not used either.
+        """
+        first = parse_date(booking_date)
+        last = parse_date(end_date) if end_date else first
+        snapshot = self._current()
+        if snapshot is None or snapshot.taken_at <= changed_at or first < snapshot.first or \
+                last >= snapshot.first + snapshot.days:
+            return None
+
+        slots = []
+        view = memoryview(snapshot.data)
+        for day in range(first - snapshot.first, last - snapshot.first + 1):
+            start, end = snapshot.offset(day), snapshot.offset(day + 1)
+            if start == end:
+                continue
+            date = format_date(snapshot.first + day)
+            records = view[snapshot.records + start * RECORD.size:snapshot.records + end * RECORD.size]
+            slots.extend(TimeSlot(time_slot_id, date, format_time(minute), duration, available)
+                         for time_slot_id, minute, duration, available in RECORD.iter_unpack(records))
+        return slots
+
+
+class SnapshotWriter(threading.Thread):
+    """Background thread rewriting the snapshot file when the database changed
+
+    Commits of any connection or process are noticed through the data version of a
+    connection kept open, checked every interval; the window also moves on with the date.
+    The snapshot lags the writes by up to the interval.
+    """
+
+    def __init__(self, database: Database, path: str, days: int, interval):
+        super().__init__(name="snapshot-writer", daemon=True)
+        self.database = database
+        self.path = path
+        self.days = days
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        self.database.check_db_integrity()
+        written = None
+        with closing(self.database.connect()) as connection:
+            while True:
+                try:
+                    state = (connection.execute("PRAGMA data_version").fetchone()[0],
+                             date_cls.fromtimestamp(clock.time()))
+                except sqlite3.Error:
+                    state = None
+                if state is None or state != written:
+                    try:
+                        ret, _, _ = write_snapshot(self.database, self.path, self.days)
+                    except Exception:
+                        # The thread outlives a failed write; the readers keep the previous version meanwhile
+                        ret = DATABASE_ERROR
+                    written = state if ret != DATABASE_ERROR else None
+                if self._stopped.wait(self.interval):
+                    return
+
+    def stop(self):
+        """Stop the writer after its current run"""
+        self._stopped.set()
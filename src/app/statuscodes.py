@@ -11,3 +11,7 @@ DATABASE_ERROR = 2
 # Validator return codes
 VALIDATION_SUCCESS = 0
 VALIDATION_ERROR = 1
+
+# Slot store return codes
+SLOT_HELD = 1
+SLOT_SEATS_EXCEEDED = 2
@@ -0,0 +1,357 @@
+"""Storage engines of the time slots: the SQLite database and an in-memory engine"""
+
+import json
+import threading
+from abc import ABC, abstractmethod
+from bisect import bisect_left, bisect_right, insort
+from itertools import islice
+from typing import Any, Callable, Iterator
+
+from .idempotency import KEY_REUSED, Idempotency, run_idempotent
+from .models import SLOT_COLUMNS, TimeSlot
+from .parsing import MINUTES_PER_DAY, parse_date
+from .occupancy import slot_masks, spanned_dates
+from .statuscodes import DATABASE_ERROR, SLOT_HELD, SLOT_SEATS_EXCEEDED, SUCCESS
+from .summary import DAY_SUMMARY_COLUMNS, DaySummary, refresh_summaries, summarize
+
+STORAGE_ENGINES = ("sqlite", "memory")
+
+
+# Order of the listed time slots
+SLOT_ORDER = "ORDER BY date, time"
+
+
+def _invalid_availability(seats: int) -> str:
+    """Return the error of an availability outside of the seats a client may set"""
+    return f"Invalid availability; it must be between 0 and the {seats} seats not reserved"
+
+
+def time_slot_filter(booking_date, end_date=None) -> tuple[str, tuple]:
+    """Return the WHERE clause and its parameters selecting a date or a date range"""
+    if end_date is None:
+        return "date=?", (booking_date,)
+
+    return "date BETWEEN ? AND ?", (booking_date, end_date)
+
+
+def time_slot_exists(database, time_slot_id) -> tuple[int, str, bool]:
+    """Get the count of time slots with the given id"""
+    ret, err, time_slots = database.execute_query(
+        "SELECT available FROM bookings WHERE id = ?", (time_slot_id,))
+    if ret == DATABASE_ERROR:
+        return ret, err, None
+
+    return SUCCESS, "", len(time_slots) > 0
+
+
+class SlotStore(ABC):
+    """Interface of the storage engines of the time slots
+
+    Reads return (ret, err, data) like Database. Writes run inside atomic(callback), which
+    passes callback a transaction handle for the write methods; the changes of a callback
+    raising an exception are rolled back.
+    """
+
+    @abstractmethod
+    def list_slots(self, booking_date, end_date=None) -> tuple[int, str, list[TimeSlot]]:
+        """Return the time slots of a date or a date range, ordered by date and time"""
+
+    @abstractmethod
+    def stream_slots(self, booking_date=None, end_date=None,
+                     batch_size=500) -> tuple[int, str, Iterator[list[tuple]]]:
+        """Return batches of the time slots of a date, a date range or, without a date, of all dates"""
+
+    @abstractmethod
+    def slot_exists(self, time_slot_id) -> tuple[int, str, bool]:
+        """Check whether a time slot exists"""
+
+    @abstractmethod
+    def day_summaries(self, booking_date, end_date) -> tuple[int, str, list[DaySummary]]:
+        """Return the summaries of the dates of a range having time slots, ordered by date"""
+
+    @abstractmethod
+    def atomic(self, callback: Callable[[Any], Any]) -> tuple[int, str, Any]:
+        """Run callback(transaction) atomically and return its result"""
+
+    @abstractmethod
+    def insert_slot(self, transaction, date, time, start, duration, capacity=1) -> bool:
+        """Insert a time slot unless it overlaps another one, including the ones of the adjacent dates"""
+
+    @abstractmethod
+    def insert_slots(self, transaction, candidates: list[tuple]) -> list[tuple]:
+        """Insert the candidates not overlapping stored or earlier candidates, returning the others
+
+        Candidates are (date, start, duration, time, available, tag) tuples.
+        """
+
+    @abstractmethod
+    def remove_slot(self, transaction, time_slot_id) -> str:
+        """Delete a time slot and return its date, None if it does not exist"""
+
+    @abstractmethod
+    def set_availability(self, transaction, time_slot_id, available, hold_token, now) -> tuple[int, str]:
+        """Set the availability of a time slot unless another token holds it
+
+        The availability counts the free seats, so it has to be between 0 and the capacity
+        less the reserved seats, SLOT_SEATS_EXCEEDED otherwise; SLOT_HELD if the slot is held.
+        """
+
+    @abstractmethod
+    def idempotent(self, transaction, idempotency: Idempotency, now: float, write: Callable[..., tuple]) -> tuple:
+        """Run write(transaction) once per idempotency key and return its response"""
+
+
+class SqliteSlotStore(SlotStore):
+    """The time slots in the SQLite database, checked against the occupancy bitmaps"""
+
+    def __init__(self, database, occupancy):
+        self.database = database
+        self.occupancy = occupancy
+
+    def list_slots(self, booking_date, end_date=None) -> tuple[int, str, list[TimeSlot]]:
+        where, params = time_slot_filter(booking_date, end_date)
+        ret, err, results = self.database.execute_query(
+            f'SELECT {SLOT_COLUMNS} FROM bookings WHERE {where} {SLOT_ORDER}', params)
+        if ret == DATABASE_ERROR:
+            return ret, err, None
+
+        return ret, err, list(map(TimeSlot._make, results))
+
+    def stream_slots(self, booking_date=None, end_date=None,
+                     batch_size=500) -> tuple[int, str, Iterator[list[tuple]]]:
+        if booking_date is None:
+            where, params = "1", ()
+        else:
+            where, params = time_slot_filter(booking_date, end_date)
+
+        return self.database.stream_query(f'SELECT {SLOT_COLUMNS} FROM bookings WHERE {where} {SLOT_ORDER}', params,
+                                          batch_size)
+
+    def slot_exists(self, time_slot_id) -> tuple[int, str, bool]:
+        return time_slot_exists(self.database, time_slot_id)
+
+    def day_summaries(self, booking_date, end_date) -> tuple[int, str, list[DaySummary]]:
+        ret, err, results = self.database.execute_query(
+            f"SELECT {DAY_SUMMARY_COLUMNS} FROM day_summary WHERE date BETWEEN ? AND ? ORDER BY date",
+            (booking_date, end_date))
+        if ret == DATABASE_ERROR:
+            return ret, err, None
+
+        return ret, err, list(map(DaySummary._make, results))
+
+    def atomic(self, callback) -> tuple[int, str, Any]:
+        # The transaction handle is the cursor of the write transaction
+        return self.database.execute_transaction(callback)
+
+    def insert_slot(self, transaction, date, time, start, duration, capacity=1) -> bool:
+        masks = slot_masks(date, start, duration)
+        bitmaps = self.occupancy.load(transaction, list(masks))
+        if any(bitmaps[spanned] & mask for spanned, mask in masks.items()):
+            return False
+
+        # Every seat of a new slot is available
+        transaction.execute("INSERT INTO bookings (date, time, duration, available, capacity) VALUES (?, ?, ?, ?, ?)",
+                            (date, time, duration, capacity, capacity))
+        self.occupancy.store(transaction, {spanned: bitmaps[spanned] | mask for spanned, mask in masks.items()})
+        refresh_summaries(transaction, [date])
+        return True
+
+    def insert_slots(self, transaction, candidates: list[tuple]) -> list[tuple]:
+        masks_by_candidate = [slot_masks(candidate[0], candidate[1], candidate[2]) for candidate in candidates]
+        bitmaps = self.occupancy.load(transaction, list({date for masks in masks_by_candidate for date in masks}))
+        rows, rejected = [], []
+        for candidate, masks in zip(candidates, masks_by_candidate):
+            date, _, duration, time, available, _ = candidate
+            if any(bitmaps[spanned] & mask for spanned, mask in masks.items()):
+                rejected.append(candidate)
+                continue
+            for spanned, mask in masks.items():
+                bitmaps[spanned] |= mask
+            rows.append((date, time, duration, available))
+
+        transaction.executemany("INSERT INTO bookings (date, time, duration, available) VALUES (?, ?, ?, ?)", rows)
+        self.occupancy.store(transaction, bitmaps)
+        refresh_summaries(transaction, {row[0] for row in rows})
+        return rejected
+
+    def remove_slot(self, transaction, time_slot_id) -> str:
+        transaction.execute("SELECT date, start_at, end_at FROM bookings WHERE id = ?", (time_slot_id,))
+        row = transaction.fetchone()
+        if row is None:
+            return None
+
+        transaction.execute("DELETE FROM bookings WHERE id = ?", (time_slot_id,))
+        transaction.execute("DELETE FROM holds WHERE slot_id = ?", (time_slot_id,))
+        transaction.execute("DELETE FROM reservations WHERE slot_id = ?", (time_slot_id,))
+        # Rebuilt rather than cleared, as slots stored before the index may overlap
+        self.occupancy.rebuild(transaction, spanned_dates(*row))
+        refresh_summaries(transaction, [row[0]])
+        return row[0]
+
+    def set_availability(self, transaction, time_slot_id, available, hold_token, now) -> tuple[int, str]:
+        transaction.execute("SELECT token FROM holds WHERE slot_id = ? AND expires_at > ?", (time_slot_id, now))
+        hold = transaction.fetchone()
+        if hold is not None and hold[0] != hold_token:
+            return SLOT_HELD, "Time slot is held by another client"
+
+        transaction.execute("SELECT capacity - (SELECT COUNT(*) FROM reservations WHERE slot_id = ?) FROM bookings "
+                            "WHERE id = ?", (time_slot_id, time_slot_id))
+        row = transaction.fetchone()
+        if row is not None and not 0 <= int(available) <= row[0]:
+            return SLOT_SEATS_EXCEEDED, _invalid_availability(row[0])
+
+        transaction.execute("UPDATE bookings SET available = ? WHERE id = ?", (available, time_slot_id))
+        if hold is not None:
+            # Booking consumes the hold of its owner
+            transaction.execute("DELETE FROM holds WHERE slot_id = ?", (time_slot_id,))
+        transaction.execute("SELECT date FROM bookings WHERE id = ?", (time_slot_id,))
+        refresh_summaries(transaction, [row[0] for row in transaction.fetchall()])
+        return SUCCESS, ""
+
+    def idempotent(self, transaction, idempotency, now, write) -> tuple:
+        return run_idempotent(transaction, idempotency, now, write)
+
+
+class MemorySlotStore(SlotStore):
+    """The time slots in process memory, in per-date arrays sorted by start minute
+
+    Meant for ephemeral demo and test deployments and as a reference for benchmarks: the
+    data is lost with the process, and holds, seat reservations and batches are not
+    supported. A single lock serializes the writes; the transaction handle is the list of
+    the undo actions of the running write. Overlaps are checked in an array of the absolute
+    instants of all the slots, which catches the slots running past midnight.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        # id -> [id, date, time, duration, available, capacity, start, start_at]
+        self._slots: dict[int, list] = {}
+        # date -> (start, end, id) of its slots, sorted
+        self._days: dict[str, list[tuple[int, int, int]]] = {}
+        self._dates: list[str] = []
+        # (start, end, id) of every slot in absolute minutes, sorted
+        self._instants: list[tuple[int, int, int]] = []
+        self._next_id = 1
+        # key -> (fingerprint, status, response, expires_at)
+        self._keys: dict[bytes, tuple] = {}
+        self._keys_purge_size = 1024
+
+    def list_slots(self, booking_date, end_date=None) -> tuple[int, str, list[TimeSlot]]:
+        with self._lock:
+            if end_date is None:
+                dates = [booking_date] if booking_date in self._days else []
+            else:
+                dates = self._dates[bisect_left(self._dates, booking_date):bisect_right(self._dates, end_date)]
+            slots = [TimeSlot._make(self._slots[slot_id][:5]) for date in dates for _, _, slot_id in self._days[date]]
+
+        return SUCCESS, "", slots
+
+    def stream_slots(self, booking_date=None, end_date=None,
+                     batch_size=500) -> tuple[int, str, Iterator[list[tuple]]]:
+        if booking_date is None:
+            with self._lock:
+                booking_date, end_date = (self._dates[0], self._dates[-1]) if self._dates else ("", "")
+        ret, err, slots = self.list_slots(booking_date, end_date)
+        rows = iter(slots)
+
+        return ret, err, iter(lambda: list(islice(rows, batch_size)), [])
+
+    def slot_exists(self, time_slot_id) -> tuple[int, str, bool]:
+        return SUCCESS, "", int(time_slot_id) in self._slots
+
+    def day_summaries(self, booking_date, end_date) -> tuple[int, str, list[DaySummary]]:
+        # Computed from the slots, which are in memory anyway
+        ret, err, slots = self.list_slots(booking_date, end_date)
+        return ret, err, summarize(slots)
+
+    def atomic(self, callback) -> tuple[int, str, Any]:
+        with self._lock:
+            undo = []
+            try:
+                return SUCCESS, "", callback(undo)
+            except BaseException:
+                for action in reversed(undo):
+                    action()
+                raise
+
+    def insert_slot(self, transaction, date, time, start, duration, capacity=1) -> bool:
+        return self._insert(transaction, date, time, start, duration, capacity, capacity)
+
+    def insert_slots(self, transaction, candidates: list[tuple]) -> list[tuple]:
+        return [candidate for candidate in candidates
+                if not self._insert(transaction, candidate[0], candidate[3], candidate[1], candidate[2],
+                                    candidate[4], 1)]
+
+    def remove_slot(self, transaction, time_slot_id) -> str:
+        slot = self._slots.get(int(time_slot_id))
+        if slot is None:
+            return None
+
+        self._discard(slot)
+        transaction.append(lambda: self._add(slot))
+        return slot[1]
+
+    def set_availability(self, transaction, time_slot_id, available, hold_token, now) -> tuple[int, str]:
+        slot = self._slots.get(int(time_slot_id))
+        if slot is not None:
+            if not 0 <= int(available) <= slot[5]:
+                return SLOT_SEATS_EXCEEDED, _invalid_availability(slot[5])
+            previous, slot[4] = slot[4], int(available)
+            transaction.append(lambda: slot.__setitem__(4, previous))
+        return SUCCESS, ""
+
+    def idempotent(self, transaction, idempotency, now, write) -> tuple:
+        if idempotency is None:
+            return write(transaction)
+
+        stored = self._keys.get(idempotency.key)
+        if stored is not None and stored[3] > now:
+            fingerprint, status, response, _ = stored
+            if fingerprint != idempotency.fingerprint:
+                return KEY_REUSED
+            body = json.loads(response)
+            return (body, None, status) if status < 400 else (None, body, status)
+
+        result, error, status = write(transaction)
+        self._keys[idempotency.key] = (idempotency.fingerprint, status, json.dumps(result or error),
+                                       now + idempotency.ttl)
+        transaction.append(lambda: self._keys.pop(idempotency.key, None))
+        if len(self._keys) >= self._keys_purge_size:
+            self._keys = {key: stored for key, stored in self._keys.items() if stored[3] > now}
+            self._keys_purge_size = 2 * len(self._keys) + 1024
+        return result, error, status
+
+    def _insert(self, transaction, date, time, start, duration, available, capacity) -> bool:
+        """Insert a slot unless it overlaps its neighbours, on its date or the adjacent ones"""
+        start_at = parse_date(date) * MINUTES_PER_DAY + start
+        index = bisect_left(self._instants, (start_at,))
+        if (index > 0 and self._instants[index - 1][1] > start_at) or \
+                (index < len(self._instants) and self._instants[index][0] < start_at + duration):
+            return False
+
+        slot = [self._next_id, date, time, duration, available, capacity, start, start_at]
+        self._next_id += 1
+        self._add(slot)
+        transaction.append(lambda: self._discard(slot))
+        return True
+
+    def _add(self, slot: list):
+        """Index a slot"""
+        slot_id, date, _, duration, _, _, start, start_at = slot
+        self._slots[slot_id] = slot
+        if date not in self._days:
+            self._days[date] = []
+            insort(self._dates, date)
+        insort(self._days[date], (start, start + duration, slot_id))
+        insort(self._instants, (start_at, start_at + duration, slot_id))
+
+    def _discard(self, slot: list):
+        """Remove a slot from the indexes"""
+        slot_id, date, _, duration, _, _, start, start_at = slot
+        del self._slots[slot_id]
+        del self._instants[bisect_left(self._instants, (start_at, start_at + duration, slot_id))]
+        day = self._days[date]
+        day.remove((start, start + duration, slot_id))
+        if not day:
+            del self._days[date]
+            self._dates.pop(bisect_left(self._dates, date))
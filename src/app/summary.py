@@ -0,0 +1,52 @@
+"""Per-day summaries of the time slots for calendar views, kept in the day_summary table"""
+
+import sqlite3
+from typing import Iterable, NamedTuple
+
+from .database import DAY_SUMMARY_SELECT
+from .models import TimeSlot
+
+# Number of dates refreshed per query; stays below SQLite's variable limit
+_DATES_PER_QUERY = 500
+
+
+class DaySummary(NamedTuple):
+    """The slot counts of a date, laid out like a row of the day_summary table"""
+
+    date: str
+    total: int
+    available: int
+    minutes_free: int
+
+
+DAY_SUMMARY_COLUMNS = ", ".join(DaySummary._fields)
+
+
+def summarize(slots: Iterable[TimeSlot]) -> list[DaySummary]:
+    """Compute the summaries of the dates of the slots, ordered by date"""
+    days = {}
+    for slot in slots:
+        total, available, minutes_free = days.get(slot.date, (0, 0, 0))
+        if slot.available > 0:
+            available, minutes_free = available + 1, minutes_free + slot.duration
+        days[slot.date] = (total + 1, available, minutes_free)
+
+    return [DaySummary(date, *days[date]) for date in sorted(days)]
+
+
+def refresh_summaries(cursor: sqlite3.Cursor, dates: Iterable[str]):
+    """Recompute the summaries of the given dates from their bookings; runs inside the write transaction"""
+    dates = sorted(set(dates))
+    for offset in range(0, len(dates), _DATES_PER_QUERY):
+        chunk = dates[offset:offset + _DATES_PER_QUERY]
+        placeholders = ", ".join("?" * len(chunk))
+        cursor.execute(f"DELETE FROM day_summary WHERE date IN ({placeholders})", chunk)
+        cursor.execute(f"INSERT INTO day_summary {DAY_SUMMARY_SELECT} WHERE date IN ({placeholders}) GROUP BY date",
+                       chunk)
+
+
+def rebuild_summaries(cursor: sqlite3.Cursor) -> int:
+    """Recompute the summaries of every date and return their count; runs inside a transaction"""
+    cursor.execute("DELETE FROM day_summary")
+    cursor.execute(f"INSERT INTO day_summary {DAY_SUMMARY_SELECT} GROUP BY date")
+    return cursor.rowcount
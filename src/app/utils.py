@@ -2,6 +2,7 @@
 
 from datetime import datetime, timedelta
 
+from .parsing import parse_date, parse_time
 from .statuscodes import VALIDATION_ERROR, VALIDATION_SUCCESS
 
 
@@ -11,20 +12,12 @@ class Validator:
     @staticmethod
     def validate_date(date: str) -> int:
         """Validate the date format"""
-        try:
-            datetime.strptime(date, "%Y-%m-%d")
-            return VALIDATION_SUCCESS
-        except ValueError:
-            return VALIDATION_ERROR
+        return VALIDATION_SUCCESS if parse_date(date) is not None else VALIDATION_ERROR
 
     @staticmethod
     def validate_time(time: str) -> int:
         """Validate the time format"""
-        try:
-            datetime.strptime(time, "%H:%M")
-            return VALIDATION_SUCCESS
-        except ValueError:
-            return VALIDATION_ERROR
+        return VALIDATION_SUCCESS if parse_time(time) is not None else VALIDATION_ERROR
 
     @staticmethod
     def validate_integer(value: str) -> int:
@@ -32,7 +25,7 @@ class Validator:
         try:
             int(value)
             return VALIDATION_SUCCESS
-        except ValueError:
+        except (TypeError, ValueError):
             return VALIDATION_ERROR
 
 
@@ -46,3 +39,23 @@ class TimeUtils:
         existing_end_dt = existing_start_dt + \
             timedelta(minutes=float(existing_duration))
         return not (new_end_dt <= existing_start_dt or new_start_dt >= existing_end_dt)
+
+    @staticmethod
+    def find_free_windows(busy: list[tuple[int, int]], open_start: int, close_end: int,
+                          min_duration: int) -> list[tuple[int, int]]:
+        """Return the gaps of at least min_duration minutes between (start, duration) slots
+
+        Slots only touching a gap do not overlap it, like in check_overlap.
+        """
+        windows = []
+        cursor = open_start
+        for start, duration in sorted(busy):
+            if start >= close_end:
+                break
+            if start - cursor >= min_duration:
+                windows.append((cursor, start))
+            cursor = max(cursor, start + duration)
+        if close_end - cursor >= min_duration:
+            windows.append((cursor, close_end))
+
+        return windows
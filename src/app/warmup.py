@@ -0,0 +1,59 @@
+"""Warm-up of the upcoming days, at startup and periodically"""
+
+import threading
+import time as clock
+from datetime import date as date_cls
+
+from .parsing import format_date, parse_date, parse_time
+from .services import get_day_summaries, query_time_slots
+from .statuscodes import GENERIC_ERROR, SUCCESS
+
+
+def warm_up(days: int, first_date: str = None) -> tuple[int, str, dict]:
+    """List the slots and day summaries of the next days the way the requests do
+
+    The listing is answered like a request, from the snapshot when one covers the days,
+    else from the database: the pages it reads, of the mapped snapshot or of the database
+    and its indexes, are pulled into the page cache of the operating system, which the
+    worker processes share. The templates of the days are materialized on the way and the
+    parsing caches are filled with the dates and times of the slots.
+    """
+    first = parse_date(first_date) if first_date else date_cls.fromtimestamp(clock.time()).toordinal()
+    if days <= 0:
+        return SUCCESS, "", {"slots": 0, "summaries": 0}
+    booking_date, end_date = format_date(first), format_date(first + days - 1)
+
+    slots, error, status = query_time_slots(booking_date, end_date)
+    if status != 200:
+        return GENERIC_ERROR, error["error-msg"], None
+
+    summaries, error, status = get_day_summaries(booking_date, end_date)
+    if status != 200:
+        return GENERIC_ERROR, error["error-msg"], None
+
+    for slot in slots:
+        parse_date(slot.date)
+        parse_time(slot.time)
+
+    return SUCCESS, "", {"slots": len(slots), "summaries": summaries["count"]}
+
+
+class CacheWarmer(threading.Thread):
+    """Background thread warming the upcoming days up periodically
+
+    Keeps the days entering the window warm as the calendar moves on.
+    """
+
+    def __init__(self, days, interval):
+        super().__init__(name="cache-warmer", daemon=True)
+        self.days = days
+        self.interval = interval
+        self._stopped = threading.Event()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            warm_up(self.days)
+
+    def stop(self):
+        """Stop the warmer after its current run"""
+        self._stopped.set()
@@ -0,0 +1,160 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from contextlib import closing
+from unittest.mock import patch
+
+from app import create_app
+from app.admission import AdmissionControl, SharedTokenBuckets, TokenBuckets, WriteGate
+
+
+class TestTokenBuckets(unittest.TestCase):
+    """Test for the token bucket stores"""
+
+    def _check_bucket(self, buckets):
+        self.assertEqual(buckets.take("client", 0.0), 0)
+        self.assertEqual(buckets.take("client", 0.0), 0)
+        self.assertAlmostEqual(buckets.take("client", 0.0), 0.5)
+        self.assertEqual(buckets.take("other", 0.0), 0)
+        self.assertEqual(buckets.take("client", 0.5), 0)
+
+    def test_in_memory(self):
+        """Test the refill and the burst of the in-memory buckets"""
+        self._check_bucket(TokenBuckets(rate=2, burst=2))
+
+    def test_eviction(self):
+        """Test that the least recently used bucket is evicted and starts full again"""
+        buckets = TokenBuckets(rate=1, burst=1, max_clients=1)
+        buckets.take("first", 0.0)
+        buckets.take("second", 0.0)
+        self.assertEqual(buckets.take("first", 0.0), 0)
+
+    def test_shared(self):
+        """Test that the shared buckets are seen by every instance"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "buckets.sqlite")
+            self._check_bucket(SharedTokenBuckets(path, rate=2, burst=2))
+            self.assertGreater(SharedTokenBuckets(path, rate=2, burst=2).take("client", 0.5), 0)
+
+    def test_shared_locked(self):
+        """Test that a locked or unreachable bucket file lets the requests through"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "buckets.sqlite")
+            buckets = SharedTokenBuckets(path, rate=1, burst=1)
+            self.assertEqual(buckets.take("client", 0.0), 0)
+            with closing(sqlite3.connect(path, isolation_level=None)) as locker:
+                locker.execute("BEGIN EXCLUSIVE")
+                self.assertEqual(buckets.take("client", 0.0), 0)
+                locker.execute("ROLLBACK")
+            with patch.object(SharedTokenBuckets, "_connect", side_effect=sqlite3.OperationalError("disk I/O error")):
+                self.assertEqual(buckets.take("client", 0.0), 0)
+
+    def test_shared_pruned(self):
+        """Test that the shared buckets which have refilled are deleted and the connection is kept"""
+        with tempfile.TemporaryDirectory() as directory:
+            buckets = SharedTokenBuckets(os.path.join(directory, "buckets.sqlite"), rate=1, burst=2, prune_every=3)
+            connection = buckets._connection
+            buckets.take("first", 0.0)
+            buckets.take("second", 1.0)
+            buckets.take("third", 1.5)
+            self.assertEqual(connection.execute("SELECT key FROM buckets ORDER BY key").fetchall(),
+                             [("second",), ("third",)])
+            self.assertIs(buckets._connection, connection)
+
+
+class TestWriteGate(unittest.TestCase):
+    """Test for WriteGate class"""
+
+    def test_queue_bound(self):
+        """Test that writes beyond the queue size are refused"""
+        gate = WriteGate(max_pending=2)
+        self.assertTrue(gate.enter())
+        self.assertTrue(gate.enter())
+        self.assertFalse(gate.enter())
+        gate.leave(0.01)
+        self.assertTrue(gate.enter())
+
+    def test_slow_writes(self):
+        """Test that slow writes shrink the gate to a probe until they are fast again"""
+        gate = WriteGate(latency_threshold=0.1, smoothing=1.0)
+        self.assertTrue(gate.enter())
+        gate.leave(1.0)
+
+        self.assertTrue(gate.enter())
+        self.assertFalse(gate.enter())
+        gate.leave(0.01)
+        self.assertTrue(gate.enter())
+        self.assertTrue(gate.enter())
+
+    def test_from_config(self):
+        """Test that nothing is built when every part is disabled"""
+        config = {"RATE_LIMIT_RATE": 0, "RATE_LIMIT_BURST": 1, "RATE_LIMIT_STORAGE": "",
+                  "WRITE_QUEUE_SIZE": 0, "WRITE_LATENCY_THRESHOLD": 0, "LOAD_SHED_RETRY_AFTER": 1}
+        self.assertIsNone(AdmissionControl.from_config(config))
+
+        control = AdmissionControl.from_config(dict(config, RATE_LIMIT_RATE=1))
+        self.assertIsInstance(control.buckets, TokenBuckets)
+        self.assertIsNone(control.gate)
+
+
+class TestAdmissionRoutes(unittest.TestCase):
+    """Test for the rate limiting and load shedding of the bookings endpoints"""
+
+    def _client(self, **config):
+        app = create_app(config)
+        app.testing = True
+        return app.test_client()
+
+    @patch('app.routes.create_time_slot')
+    def test_rate_limit(self, mock_create_time_slot):
+        """Test that each client address and method has its own bucket, whatever its unverified headers"""
+        mock_create_time_slot.return_value = {'error-msg': ''}, None, 200
+        client = self._client(RATE_LIMIT_RATE=0.1, RATE_LIMIT_BURST=1, ADMIN_TOKEN="secret")
+        data = {'date': '2025-02-14', 'time': '09:00', 'duration': 30}
+
+        self.assertEqual(client.post('/bookings', data=data, headers={'X-API-Key': 'a'}).status_code, 200)
+        response = client.post('/bookings', data=data, headers={'X-API-Key': 'b'})
+        self.assertEqual(response.status_code, 429)
+        self.assertEqual(response.headers['Retry-After'], '10')
+        self.assertEqual(client.post('/bookings', data=data, environ_base={'REMOTE_ADDR': '10.0.0.2'}).status_code,
+                         200)
+        self.assertEqual(client.post('/bookings', data=data, headers={'X-Admin-Token': 'secret'}).status_code, 200)
+        self.assertEqual(client.post('/bookings', data=data, headers={'X-Admin-Token': 'wrong'}).status_code, 429)
+        self.assertEqual(mock_create_time_slot.call_count, 3)
+
+    @patch('app.routes.query_time_slots')
+    def test_reads_not_limited(self, mock_query_time_slots):
+        """Test that reads are neither limited nor shed"""
+        mock_query_time_slots.return_value = [], None, 200
+        client = self._client(RATE_LIMIT_RATE=0.1, RATE_LIMIT_BURST=1)
+        for _ in range(3):
+            self.assertEqual(client.get('/bookings?date=2025-02-14').status_code, 200)
+
+    @patch('app.routes.book_time_slot')
+    def test_load_shedding(self, mock_book_time_slot):
+        """Test that writes beyond the queue size are shed"""
+        entered, release = threading.Event(), threading.Event()
+
+        def book_time_slot(*args):
+            entered.set()
+            release.wait(1)
+            return {'error-msg': ''}, None, 200
+
+        mock_book_time_slot.side_effect = book_time_slot
+        client = self._client(WRITE_QUEUE_SIZE=1, LOAD_SHED_RETRY_AFTER=2)
+        first = threading.Thread(target=lambda: client.put('/bookings', data={'id': 1, 'available': 0}))
+        first.start()
+        entered.wait(1)
+
+        response = client.put('/bookings', data={'id': 1, 'available': 0})
+        release.set()
+        first.join()
+        self.assertEqual(response.status_code, 503)
+        self.assertEqual(response.headers['Retry-After'], '2')
+        self.assertEqual(client.put('/bookings', data={'id': 1, 'available': 0}).status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
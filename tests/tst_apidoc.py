@@ -0,0 +1,67 @@
+import os
+import subprocess
+import sys
+import unittest
+
+from app import create_app, routes
+
+# Generous bound of the seconds importing the application takes in a fresh interpreter, to catch
+# heavy imports and work added at import time; see benchmarks/bench_import.py for the timings
+IMPORT_TIME_BUDGET = 2.0
+
+IMPORT = """
+import time
+start = time.perf_counter()
+import app
+print(time.perf_counter() - start)
+"""
+
+DOCS_DISABLED = """
+from app import create_app, routes
+client = create_app().test_client()
+print(client.get('/docs').status_code, client.get('/swagger.json').status_code, bool(routes.api._pending_docs),
+      client.get('/bookings?date=invalid').status_code)
+"""
+
+
+def run_python(code: str, **env) -> str:
+    """Run code in a fresh interpreter with the application on its path and return its output"""
+    source = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "src")
+    env = dict(os.environ, PYTHONPATH=source, **env)
+    return subprocess.run([sys.executable, "-c", code], env=env, check=True, capture_output=True,
+                          text=True).stdout.split("\n")[-2]
+
+
+class TestApiDoc(unittest.TestCase):
+    """Test for apidoc module"""
+
+    def test_import_time(self):
+        """Test that importing the application stays within its budget"""
+        self.assertLess(float(run_python(IMPORT)), IMPORT_TIME_BUDGET)
+
+    def test_lazy_docs(self):
+        """Test that the documentation is applied when the specification is first requested"""
+        client = create_app().test_client()
+        response = client.get('/swagger.json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(routes.api._pending_docs, [])
+        self.assertEqual(response.json['paths']['/bookings']['get']['responses']['400']['schema'],
+                         {'$ref': '#/definitions/ErrorResponse'})
+        self.assertIn('date', [param['name'] for param in response.json['paths']['/bookings']['get']['parameters']])
+        self.assertEqual(client.get('/docs').status_code, 200)
+
+    def test_docs_disabled(self):
+        """Test that nothing is documented nor served with the documentation disabled"""
+        self.assertEqual(run_python(DOCS_DISABLED, BOOKING_API_DOCS_ENABLED="0"), "404 404 True 400")
+
+    def test_docs_disabled_by_config(self):
+        """Test that the documentation is switched per application by its configuration"""
+        client = create_app({"API_DOCS_ENABLED": False}).test_client()
+        self.assertEqual(client.get('/docs').status_code, 404)
+        self.assertEqual(client.get('/swagger.json').status_code, 404)
+        self.assertEqual(client.get('/bookings?date=invalid').status_code, 400)
+        self.assertEqual(create_app().test_client().get('/swagger.json').status_code, 200)
+
+
+if __name__ == '__main__':
+    unittest.main()
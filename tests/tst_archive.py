@@ -0,0 +1,114 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import services
+from app.archive import ArchiveDatabase, Archiver, archive_slots, compact
+from app.database import Database
+from app.occupancy import OccupancyIndex
+from app.services import (archive_past_slots, create_time_slot, get_archived_time_slots, get_day_summaries,
+                          reserve_seat)
+from app.statuscodes import DATABASE_SUCCESS, SUCCESS
+
+
+class TestArchive(unittest.TestCase):
+    """Test for archive module"""
+
+    def setUp(self):
+        """Use a temporary database for every test"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db = Database(os.path.join(self.directory.name, "test.sqlite"))
+        self.occupancy = OccupancyIndex()
+        for patcher in (patch("app.services.db", self.db), patch("app.services.occupancy", self.occupancy),
+                        patch("app.services.archive", ArchiveDatabase(self.db.db_path))):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _dates(self, table):
+        return [row[0] for row in self.db.execute_query(f"SELECT date FROM {table} ORDER BY date, time")[2]]
+
+    def test_archive_slots(self):
+        """Test that the past slots and their reservations are moved in batches"""
+        for day in range(10, 15):
+            create_time_slot(f"2025-02-{day}", "09:00", 30, 2)
+        reserve_seat(1)
+
+        ret, err, archived = archive_slots(self.db, services.archive, self.occupancy, "2025-02-13", batch_size=2)
+        self.assertEqual((ret, err, archived), (SUCCESS, "", 3))
+        self.assertEqual(self._dates("bookings"), ["2025-02-13", "2025-02-14"])
+        self.assertEqual(self._dates("bookings_archive"), ["2025-02-10", "2025-02-11", "2025-02-12"])
+        self.assertEqual(self.db.execute_query("SELECT slot_id FROM reservations_archive")[2], [(1,)])
+        self.assertEqual(self.db.execute_query("SELECT COUNT(*) FROM reservations")[2], [(0,)])
+        self.assertEqual(get_day_summaries("2025-02-01", "2025-02-28")[0]["count"], 2)
+
+        # The dates of the archived slots are free again
+        self.assertEqual(create_time_slot("2025-02-10", "09:00", 30)[2], 200)
+
+    def test_archive_file(self):
+        """Test archiving into a separate file, which only gets the archive tables"""
+        archive = ArchiveDatabase(os.path.join(self.directory.name, "archive.sqlite"))
+        create_time_slot("2025-02-10", "09:00", 30)
+
+        self.assertEqual(archive_slots(self.db, archive, self.occupancy, "2025-02-11")[2], 1)
+        self.assertEqual(archive.execute_query("SELECT date FROM bookings_archive")[2], [("2025-02-10",)])
+        self.assertEqual(archive.execute_query("SELECT name FROM sqlite_master WHERE name = 'bookings'")[2], [])
+        self.assertEqual(self._dates("bookings"), [])
+
+    def test_changed_slot_kept(self):
+        """Test that a slot changed after being copied is not deleted"""
+        create_time_slot("2025-02-10", "09:00", 30)
+        archive = services.archive
+        execute_transaction = archive.execute_transaction
+
+        def copy_then_book(callback):
+            result = execute_transaction(callback)
+            self.db.execute_update("UPDATE bookings SET available = 0")
+            return result
+
+        with patch.object(archive, "execute_transaction", copy_then_book):
+            self.assertEqual(archive_slots(self.db, archive, self.occupancy, "2025-02-11")[2], 0)
+        self.assertEqual(self._dates("bookings"), ["2025-02-10"])
+
+        self.assertEqual(archive_slots(self.db, archive, self.occupancy, "2025-02-11")[2], 1)
+        self.assertEqual(archive.execute_query("SELECT available FROM bookings_archive")[2], [(0,)])
+
+    def test_compact(self):
+        """Test that the pages of the archived slots are given back"""
+        for day in range(1, 29):
+            for hour in range(24):
+                create_time_slot(f"2025-02-{day:02d}", f"{hour:02d}:00", 30)
+        with patch("app.services.clock.time", return_value=1767268800):
+            result, error, status = archive_past_slots(30)
+
+        self.assertEqual(status, 200, error)
+        self.assertEqual(result["archived"], 28 * 24)
+        self.assertEqual(result["before"], "2025-12-02")
+        self.assertGreater(result["freed-pages"], 0)
+        self.assertEqual(self.db.execute_query("PRAGMA auto_vacuum")[2], [(2,)])
+        self.assertEqual(compact(self.db)[0], DATABASE_SUCCESS)
+
+    def test_get_archived_time_slots(self):
+        """Test querying the archive and its validation"""
+        create_time_slot("2025-02-10", "09:00", 30)
+        archive_slots(self.db, services.archive, self.occupancy, "2025-02-11")
+
+        result, error, status = get_archived_time_slots("2025-02-01", "2025-02-28")
+        self.assertEqual(status, 200)
+        self.assertEqual(result["slots"], [{"id": 1, "date": "2025-02-10", "time": "09:00", "duration": 30,
+                                            "available": 1, "capacity": 1}])
+        self.assertEqual(get_archived_time_slots(None)[2], 400)
+        self.assertEqual(archive_past_slots(-1)[2], 400)
+
+    def test_archiver_stop(self):
+        """Test starting and stopping the archiver"""
+        archiver = Archiver(lambda: None, 0.01)
+        archiver.start()
+        archiver.stop()
+        archiver.join(1)
+        self.assertFalse(archiver.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,158 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from app import create_app
+from app.backup import backup_database, restore_database, validate_snapshot
+from app.database import Database
+from app.occupancy import OccupancyIndex
+from app.services import create_time_slot
+from app.statuscodes import DATABASE_ERROR, DATABASE_SUCCESS, VALIDATION_ERROR
+
+
+class TestBackup(unittest.TestCase):
+    """Test for backup module"""
+
+    def setUp(self):
+        """Use a temporary database for every test"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db = Database(self._path("test.sqlite"))
+        self.materialized = {(1, "2025-02-14")}
+        for patcher in (patch("app.services.db", self.db), patch("app.services.occupancy", OccupancyIndex()),
+                        patch("app.backup.db", self.db), patch("app.backup.materialized_templates", self.materialized)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _path(self, name):
+        return os.path.join(self.directory.name, name)
+
+    def _times(self, database):
+        return [row[0] for row in database.execute_query("SELECT time FROM bookings ORDER BY time")[2]]
+
+    def test_backup_during_writes(self):
+        """Test that a paged backup taken while slots are created is consistent"""
+        for minute in range(0, 600, 5):
+            create_time_slot("2025-02-14", f"{minute // 60:02d}:{minute % 60:02d}", 5)
+        stop = threading.Event()
+
+        def write():
+            minute = 600
+            while not stop.is_set() and minute < 1440:
+                create_time_slot("2025-02-14", f"{minute // 60:02d}:{minute % 60:02d}", 5)
+                minute += 5
+
+        writer = threading.Thread(target=write)
+        writer.start()
+        ret, err, pages = backup_database(self.db, self._path("backup.sqlite"), step_pages=1, step_delay=0.001)
+        stop.set()
+        writer.join()
+
+        self.assertEqual((ret, err), (DATABASE_SUCCESS, ""))
+        self.assertGreater(pages, 1)
+        self.assertFalse(os.path.exists(self._path("backup.sqlite.part")))
+        self.assertEqual(validate_snapshot(self._path("backup.sqlite")), (DATABASE_SUCCESS, ""))
+        times = self._times(Database(self._path("backup.sqlite")))
+        self.assertGreaterEqual(len(times), 120)
+        self.assertEqual(len(times), len(set(times)))
+
+    def test_restore(self):
+        """Test that a restore replaces the content, the occupancy and the materialized templates"""
+        create_time_slot("2025-02-14", "09:00", 60)
+        backup_database(self.db, self._path("backup.sqlite"))
+        create_time_slot("2025-02-14", "11:00", 60)
+
+        self.assertEqual(restore_database(self.db, self._path("backup.sqlite")), (DATABASE_SUCCESS, ""))
+        self.assertEqual(self._times(self.db), ["09:00"])
+        self.assertEqual(self.materialized, set())
+        self.assertEqual(create_time_slot("2025-02-14", "11:00", 60)[2], 200)
+        self.assertEqual(create_time_slot("2025-02-14", "09:30", 60)[2], 400)
+
+    def test_restore_older_snapshot(self):
+        """Test that the tables missing from an older snapshot are created after the restore"""
+        with sqlite3.connect(self._path("old.sqlite")) as connection:
+            connection.execute("CREATE TABLE bookings (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL, "
+                               "time TEXT NOT NULL, duration INTEGER NOT NULL, available INTEGER DEFAULT 1)")
+            connection.execute("INSERT INTO bookings (date, time, duration) VALUES ('2025-02-14', '09:00', 30)")
+        connection.close()
+
+        self.assertEqual(restore_database(self.db, self._path("old.sqlite"))[0], DATABASE_SUCCESS)
+        self.assertEqual(self.db.execute_query("SELECT capacity FROM bookings")[2], [(1,)])
+        self.assertEqual(self.db.execute_query("SELECT total FROM day_summary")[2], [(1,)])
+
+    def test_invalid_snapshots(self):
+        """Test that missing, corrupt and foreign files are not restored"""
+        create_time_slot("2025-02-14", "09:00", 60)
+        with open(self._path("corrupt.sqlite"), "wb") as file:
+            file.write(b"not a database" * 100)
+        with sqlite3.connect(self._path("foreign.sqlite")) as connection:
+            connection.execute("CREATE TABLE other (id INTEGER)")
+        connection.close()
+
+        for name in ("missing.sqlite", "corrupt.sqlite", "foreign.sqlite"):
+            ret, err = restore_database(self.db, self._path(name))
+            self.assertEqual(ret, VALIDATION_ERROR, name)
+        self.assertEqual(self._times(self.db), ["09:00"])
+
+
+class TestBackupRoutes(unittest.TestCase):
+    """Test for the backup endpoints"""
+
+    def setUp(self):
+        """Set up the test client with an admin token and a backup directory"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        app = create_app({"ADMIN_TOKEN": "secret", "BACKUP_DIR": self.directory.name})
+        app.testing = True
+        self.client = app.test_client()
+        self.headers = {'X-Admin-Token': 'secret'}
+
+    def test_admin_required(self):
+        """Test that the backup endpoints need the admin token"""
+        self.assertEqual(self.client.get('/admin/backups').status_code, 403)
+        self.assertEqual(self.client.post('/admin/backups').status_code, 403)
+        self.assertEqual(self.client.post('/admin/backups/restore', json={'name': 'a.sqlite'}).status_code, 403)
+
+    @patch('app.backup.restore_database')
+    @patch('app.backup.backup_database')
+    def test_backup_and_restore(self, mock_backup_database, mock_restore_database):
+        """Test creating, listing and restoring backups"""
+        def backup(database, target, step_pages, step_delay):
+            open(target, "wb").close()
+            return DATABASE_SUCCESS, "", 1
+
+        mock_backup_database.side_effect = backup
+        mock_restore_database.return_value = DATABASE_SUCCESS, ""
+
+        response = self.client.post('/admin/backups', headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        name = response.json['name']
+        self.assertEqual(self.client.get('/admin/backups', headers=self.headers).json['backups'],
+                         [{'name': name, 'size': 0}])
+
+        response = self.client.post('/admin/backups/restore', json={'name': name}, headers=self.headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_restore_database.call_args[0][1], os.path.join(self.directory.name, name))
+
+        for invalid in ('../data.sqlite', 'backup.txt'):
+            response = self.client.post('/admin/backups/restore', json={'name': invalid}, headers=self.headers)
+            self.assertEqual(response.status_code, 400, invalid)
+
+        mock_restore_database.return_value = VALIDATION_ERROR, "Snapshot not found"
+        response = self.client.post('/admin/backups/restore', json={'name': name}, headers=self.headers)
+        self.assertEqual(response.status_code, 400)
+        mock_restore_database.return_value = DATABASE_ERROR, "disk I/O error"
+        response = self.client.post('/admin/backups/restore', json={'name': name}, headers=self.headers)
+        self.assertEqual(response.status_code, 500)
+
+    def test_disabled(self):
+        """Test that backups need a backup directory"""
+        self.client.application.config['BACKUP_DIR'] = ''
+        self.assertEqual(self.client.post('/admin/backups', headers=self.headers).status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
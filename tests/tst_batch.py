@@ -0,0 +1,160 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import create_app
+from app.batch import MAX_BATCH_OPERATIONS, run_batch
+from app.database import Database
+from app.holds import hold_time_slot
+from app.occupancy import OccupancyIndex
+from app.services import create_time_slot
+
+
+class TestBatch(unittest.TestCase):
+    """Test for batch module"""
+
+    def setUp(self):
+        """Use a temporary database with two slots for every test"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db = Database(os.path.join(self.directory.name, "test.sqlite"))
+        self.occupancy = OccupancyIndex()
+        for patcher in (patch("app.services.db", self.db), patch("app.batch.db", self.db),
+                        patch("app.holds.db", self.db), patch("app.services.occupancy", self.occupancy),
+                        patch("app.batch.occupancy", self.occupancy)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        create_time_slot("2025-02-14", "09:00", 30)
+        create_time_slot("2025-02-14", "10:00", 30)
+
+    def _bitmap(self, date):
+        rows = self.db.execute_query("SELECT bitmap FROM occupancy WHERE date = ?", (date,))[2]
+        return int.from_bytes(rows[0][0], "little") if rows else None
+
+    def _slots(self):
+        return self.db.execute_query("SELECT id, time, available FROM bookings ORDER BY id")[2]
+
+    def test_mixed_operations(self):
+        """Test that deletes, creates and books are applied in order"""
+        result, error, status = run_batch([
+            {"op": "delete", "id": 1},
+            {"op": "create", "date": "2025-02-14", "time": "09:00", "duration": 30},
+            {"op": "create", "date": "2025-02-15", "time": "09:00", "duration": 30, "capacity": 2},
+            {"op": "book", "id": 2, "available": 0},
+        ])
+
+        self.assertIsNone(error)
+        self.assertEqual(status, 200)
+        self.assertEqual([r["status"] for r in result["results"]], [200] * 4)
+        self.assertEqual(result["results"][1]["id"], 3)
+        self.assertEqual(self._slots(), [(2, "10:00", 0), (3, "09:00", 1), (4, "09:00", 2)])
+        self.assertEqual(self._bitmap("2025-02-15"), (2 ** 30 - 1) << 540)
+
+    def test_overlap_rolls_back(self):
+        """Test that an overlap, also with an earlier operation, rolls back the whole batch"""
+        result, error, status = run_batch([
+            {"op": "book", "id": 2, "available": 0},
+            {"op": "create", "date": "2025-02-14", "time": "11:00", "duration": 30},
+            {"op": "create", "date": "2025-02-14", "time": "11:15", "duration": 30},
+        ])
+
+        self.assertIsNone(result)
+        self.assertEqual(status, 400)
+        self.assertEqual(error["errors"], [{"operation": 3, "error-msg": "Overlapping booking found"}])
+        self.assertEqual(self._slots(), [(1, "09:00", 1), (2, "10:00", 1)])
+        self.assertEqual(create_time_slot("2025-02-14", "11:00", 30)[2], 200)
+
+    def test_across_midnight(self):
+        """Test that created slots running past midnight overlap the slots of the next date"""
+        result, error, status = run_batch([
+            {"op": "create", "date": "2025-02-14", "time": "23:30", "duration": 90},
+            {"op": "create", "date": "2025-02-15", "time": "00:30", "duration": 30},
+        ])
+
+        self.assertEqual(status, 400)
+        self.assertEqual(error["errors"], [{"operation": 2, "error-msg": "Overlapping booking found"}])
+        self.assertIsNone(self._bitmap("2025-02-15"))
+        self.assertEqual(create_time_slot("2025-02-14", "23:30", 90)[2], 200)
+        result, error, status = run_batch([
+            {"op": "create", "date": "2025-02-15", "time": "00:30", "duration": 30},
+        ])
+        self.assertEqual(status, 400)
+        result, error, status = run_batch([
+            {"op": "delete", "id": 3},
+            {"op": "create", "date": "2025-02-15", "time": "00:30", "duration": 30},
+        ])
+        self.assertEqual(status, 200)
+        self.assertEqual(self._bitmap("2025-02-15"), (2 ** 30 - 1) << 30)
+
+    def test_unpadded_input(self):
+        """Test that created slots without zero padding are stored zero-padded"""
+        result, error, status = run_batch([
+            {"op": "create", "date": "2025-2-14", "time": "23:30", "duration": 90},
+            {"op": "create", "date": "2025-2-15", "time": "0:30", "duration": 30},
+        ])
+        self.assertEqual(status, 400)
+        self.assertEqual(run_batch([{"op": "create", "date": "2025-2-14", "time": "9:30", "duration": 30}])[2], 200)
+        self.assertEqual(self.db.execute_query("SELECT date, time FROM bookings WHERE id = 3")[2],
+                         [("2025-02-14", "09:30")])
+
+    def test_held_and_missing_slots(self):
+        """Test that held or missing slots fail the batch"""
+        hold_time_slot(1, 60, 600)
+        self.assertEqual(run_batch([{"op": "book", "id": 1, "available": 0}])[2], 409)
+        self.assertEqual(run_batch([{"op": "delete", "id": 2}, {"op": "delete", "id": 9}])[2], 400)
+        self.assertEqual(len(self._slots()), 2)
+
+    def test_invalid_input(self):
+        """Test that invalid operations are all reported and nothing is applied"""
+        _, error, status = run_batch([{"op": "delete", "id": 1}, {"op": "move"}, {"op": "book", "id": [1]},
+                                      {"op": "create", "date": "2025-02-30", "time": "09:00", "duration": 30}])
+        self.assertEqual(status, 400)
+        self.assertEqual([e["operation"] for e in error["errors"]], [2, 3, 4])
+        self.assertEqual(len(self._slots()), 2)
+
+        for operations in (None, [], {"op": "delete"}, [{"op": "delete", "id": 1}] * (MAX_BATCH_OPERATIONS + 1)):
+            self.assertEqual(run_batch(operations)[2], 400)
+
+    def test_unhashable_values(self):
+        """Test that lists and objects of JSON bodies are reported per operation"""
+        _, error, status = run_batch([{"op": "create", "date": ["x"], "time": "09:00", "duration": 30},
+                                      {"op": "create", "date": "2025-02-15", "time": {}, "duration": 30},
+                                      {"op": ["create"]}])
+        self.assertEqual(status, 400)
+        self.assertEqual([e["operation"] for e in error["errors"]], [1, 2, 3])
+        self.assertEqual(len(self._slots()), 2)
+
+
+class TestBatchRoute(unittest.TestCase):
+    """Test for the batch endpoint"""
+
+    def setUp(self):
+        """Set up the test client with an admin token"""
+        app = create_app({"ADMIN_TOKEN": "secret"})
+        app.testing = True
+        self.client = app.test_client()
+
+    def test_forbidden(self):
+        """Test that the batch endpoint requires the admin token"""
+        response = self.client.post('/bookings/batch', json={'operations': []})
+        self.assertEqual(response.status_code, 403)
+
+    @patch('app.routes.run_batch')
+    def test_post_batch(self, mock_run_batch):
+        """Test that the operations of the JSON body are passed on"""
+        mock_run_batch.return_value = {'results': [{'status': 200}]}, None, 200
+        operations = [{'op': 'delete', 'id': 1}]
+        response = self.client.post('/bookings/batch', json={'operations': operations},
+                                    headers={'X-Admin-Token': 'secret'})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {'results': [{'status': 200}]})
+        mock_run_batch.assert_called_once_with(operations)
+
+        self.client.post('/bookings/batch', data='not json', headers={'X-Admin-Token': 'secret'})
+        mock_run_batch.assert_called_with(None)
+
+
+if __name__ == '__main__':
+    unittest.main()
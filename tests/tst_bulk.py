@@ -0,0 +1,100 @@
+import io
+import json
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.bulk import export_time_slots, import_time_slots, read_records
+from app.database import Database
+from app.occupancy import OccupancyIndex
+
+
+class TestBulk(unittest.TestCase):
+    """Test for bulk module"""
+
+    def setUp(self):
+        """Use a temporary database for every test"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.db = Database(os.path.join(self.directory.name, "test.sqlite"))
+        for patcher in (patch("app.services.db", self.db), patch("app.services.occupancy", OccupancyIndex())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.addCleanup(self.directory.cleanup)
+
+    def test_read_records_ndjson(self):
+        """Test reading NDJSON records including invalid lines"""
+        stream = io.StringIO('{"date": "2025-02-14"}\n\nnot json\n[1]\n')
+        self.assertEqual(list(read_records(stream, "ndjson")),
+                         [(1, {"date": "2025-02-14"}), (3, {}), (4, {})])
+
+    def test_import_csv(self):
+        """Test importing a CSV with invalid and overlapping rows"""
+        self.db.execute_update("INSERT INTO bookings (date, time, duration) VALUES (?, ?, ?)",
+                               ("2025-02-14", "10:00", 60))
+        stream = io.StringIO("date,time,duration,available\n"
+                             "2025-02-14,09:00,60,\n"
+                             "2025-02-14,10:30,30,1\n"
+                             "2025-02-14,08:30,60,1\n"
+                             "2025-02-30,09:00,60,1\n"
+                             "2025-02-15,09:00,60,0\n")
+        result, error, status = import_time_slots(stream, "csv", chunk_size=2)
+
+        self.assertEqual(status, 200)
+        self.assertIsNone(error)
+        self.assertEqual(result["imported"], 2)
+        self.assertEqual(result["rejected"], 3)
+        self.assertEqual(sorted(entry["line"] for entry in result["errors"]), [3, 4, 5])
+        _, _, rows = self.db.execute_query("SELECT date, time, available FROM bookings ORDER BY date, time")
+        self.assertEqual(rows, [("2025-02-14", "09:00", 1), ("2025-02-14", "10:00", 1),
+                                ("2025-02-15", "09:00", 0)])
+
+    def test_import_unpadded_values(self):
+        """Test that imported dates and times are stored zero-padded"""
+        result, _, _ = import_time_slots(io.StringIO("date,time,duration,available\n2025-2-14,9:00,60,1\n"), "csv")
+        self.assertEqual(result["imported"], 1)
+        self.assertEqual(self.db.execute_query("SELECT date, time FROM bookings")[2], [("2025-02-14", "09:00")])
+
+    def test_import_invalid_format(self):
+        """Test importing with an unknown format"""
+        result, error, status = import_time_slots(io.StringIO(""), "xml")
+        self.assertIsNone(result)
+        self.assertEqual(status, 400)
+        self.assertIn("Invalid format", error["error-msg"])
+
+    def test_export_roundtrip(self):
+        """Test exporting in both formats"""
+        import_time_slots(io.StringIO('{"date": "2025-02-14", "time": "09:00", "duration": 30}\n'
+                                      '{"date": "2025-02-15", "time": "09:00", "duration": 30}\n'), "ndjson")
+
+        chunks, _, status = export_time_slots("ndjson", "2025-02-14")
+        self.assertEqual(status, 200)
+        lines = b"".join(chunks).decode().splitlines()
+        self.assertEqual([json.loads(line)["date"] for line in lines], ["2025-02-14"])
+
+        chunks, _, _ = export_time_slots("csv")
+        self.assertEqual(b"".join(chunks).decode().splitlines(),
+                         ["id,date,time,duration,available",
+                          "1,2025-02-14,09:00,30,1", "2,2025-02-15,09:00,30,1"])
+
+    def test_export_invalid_input(self):
+        """Test exporting with an invalid format or date"""
+        self.assertEqual(export_time_slots("xml")[2], 400)
+        self.assertEqual(export_time_slots("csv", "invalid")[2], 400)
+        result, error, status = export_time_slots("csv", end_date="2025-02-14")
+        self.assertEqual(status, 400)
+        self.assertEqual(error["error-msg"], "Missing input date")
+
+    def test_import_unhashable_values(self):
+        """Test that lists and objects in the records are reported per line"""
+        result, _, status = import_time_slots(io.StringIO('{"date": [1], "time": "09:00", "duration": 30}\n'
+                                                          '{"date": "2025-02-14", "time": {}, "duration": 30}\n'
+                                                          '{"date": "2025-02-14", "time": "09:00", "duration": 30}\n'),
+                                              "ndjson")
+        self.assertEqual(status, 200)
+        self.assertEqual(result["imported"], 1)
+        self.assertEqual([error["line"] for error in result["errors"]], [1, 2])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,75 @@
+import gzip
+import unittest
+import zlib
+from unittest.mock import patch
+
+from app import create_app
+from app.compression import compress_stream, negotiate
+from app.models import TimeSlot
+
+
+class TestCompression(unittest.TestCase):
+    """Test for compression module"""
+
+    def setUp(self):
+        """Set up the test client with compression enabled"""
+        app = create_app({"COMPRESSION_ENABLED": True, "COMPRESSION_MIN_SIZE": 100})
+        app.testing = True
+        self.client = app.test_client()
+
+    @patch('app.compression.brotli', None)
+    def test_negotiate(self):
+        """Test choosing the content coding from Accept-Encoding"""
+        self.assertEqual(negotiate("gzip, deflate"), "gzip")
+        self.assertEqual(negotiate("*"), "gzip")
+        self.assertIsNone(negotiate(""))
+        self.assertIsNone(negotiate("gzip;q=0, deflate"))
+        self.assertIsNone(negotiate("*;q=0"))
+        self.assertIsNone(negotiate("br"))
+
+    def test_compress_stream(self):
+        """Test that a compressed stream decompresses to its chunks"""
+        chunks = [b'{"slots":[', b'{"id":1}', b']}']
+        with patch('app.compression.brotli', None):
+            data = b"".join(compress_stream(iter(chunks), "gzip", 6))
+        self.assertEqual(zlib.decompress(data, 16 + zlib.MAX_WBITS), b"".join(chunks))
+
+    @patch('app.compression.brotli', None)
+    @patch('app.routes.query_time_slots')
+    def test_compressed_listing(self, mock_query_time_slots):
+        """Test that only large enough listings are compressed, for the clients accepting it"""
+        slots = [TimeSlot(index, '2025-02-14', '14:30', 30, 1) for index in range(20)]
+        mock_query_time_slots.return_value = slots, None, 200
+
+        response = self.client.get('/bookings?date=2025-02-14', headers={'Accept-Encoding': 'gzip'})
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertIn('Accept-Encoding', response.headers['Vary'])
+        self.assertEqual(gzip.decompress(response.data).count(b'"date"'), 20)
+
+        response = self.client.get('/bookings?date=2025-02-14')
+        self.assertNotIn('Content-Encoding', response.headers)
+        self.assertEqual(response.json['count'], 20)
+
+        mock_query_time_slots.return_value = slots[:1], None, 200
+        response = self.client.get('/bookings?date=2025-02-14', headers={'Accept-Encoding': 'gzip'})
+        self.assertNotIn('Content-Encoding', response.headers)
+
+    @patch('app.compression.brotli', None)
+    @patch('app.routes.get_day_summaries')
+    def test_conditional_request(self, mock_get_day_summaries):
+        """Test that the weakened ETag of a compressed response still matches"""
+        mock_get_day_summaries.return_value = {"count": 28, "days": [
+            {"date": f"2025-02-{day:02d}", "total": 1, "available": 1, "minutes_free": 30}
+            for day in range(1, 29)]}, None, 200
+        headers = {'Accept-Encoding': 'gzip'}
+        response = self.client.get('/bookings/summary?month=2025-02', headers=headers)
+        self.assertEqual(response.headers['Content-Encoding'], 'gzip')
+        self.assertTrue(response.headers['ETag'].startswith('W/'))
+
+        response = self.client.get('/bookings/summary?month=2025-02',
+                                   headers=dict(headers, **{'If-None-Match': response.headers['ETag']}))
+        self.assertEqual(response.status_code, 304)
+
+
+if __name__ == '__main__':
+    unittest.main()
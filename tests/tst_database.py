@@ -1,6 +1,8 @@
 import unittest
 from unittest.mock import patch, MagicMock
 import sqlite3
+import os
+import tempfile
 
 from app.database import Database
 from app.statuscodes import DATABASE_ERROR, DATABASE_SUCCESS
@@ -104,7 +106,7 @@ class TestDatabase(unittest.TestCase):
     def test_create_tables_success(self, mock_cursor):
         """Test create_tables success"""
         status, message = Database.create_tables(mock_cursor)
-        mock_cursor.execute.assert_called_once()
+        self.assertEqual(mock_cursor.execute.call_count, 2)
 
         self.assertEqual(status, DATABASE_SUCCESS)
         self.assertEqual(message, "")
@@ -238,6 +240,47 @@ class TestDatabase(unittest.TestCase):
         self.assertEqual(status, DATABASE_SUCCESS)
         self.assertEqual("", message)
 
+    def test_stream_query_batches(self):
+        """Test stream_query yields the rows in batches"""
+        with tempfile.TemporaryDirectory() as directory:
+            db = Database(os.path.join(directory, "test.sqlite"))
+            for hour in range(10, 15):
+                db.execute_update("INSERT INTO bookings (date, time, duration) VALUES (?, ?, ?)",
+                                  ("2025-02-14", f"{hour}:00", 30))
+            status, message, batches = db.stream_query("SELECT time FROM bookings ORDER BY id", None, 2)
+            batches = list(batches)
+
+        self.assertEqual(status, DATABASE_SUCCESS)
+        self.assertEqual(message, "")
+        self.assertEqual([len(batch) for batch in batches], [2, 2, 1])
+        self.assertEqual(batches[0][0], ("10:00",))
+
+    @patch("app.database.Database.check_db_integrity")
+    def test_stream_query_integrity_check_failed(self, mock_check_integrity):
+        """Test stream_query with integrity check failed"""
+        mock_check_integrity.return_value = (DATABASE_ERROR, "Mocked error")
+        db = Database(":memory:")
+        status, message, batches = db.stream_query("")
+
+        self.assertEqual(status, DATABASE_ERROR)
+        self.assertIn("Database integrity check failed", message)
+        self.assertEqual(list(batches), [])
+
+    @patch("app.database.Database.connect")
+    @patch("app.database.Database.check_db_integrity")
+    def test_stream_query_execute_error(self, mock_check_integrity, mock_connect):
+        """Test stream_query with execute error"""
+        mock_check_integrity.return_value = (DATABASE_SUCCESS, "")
+        mock_connection = MagicMock(spec=sqlite3.Connection)
+        mock_connection.execute.side_effect = sqlite3.Error("Mocked error")
+        mock_connect.return_value = mock_connection
+        db = Database(":memory:")
+        status, message, _ = db.stream_query("")
+
+        self.assertEqual(status, DATABASE_ERROR)
+        self.assertIn("Mocked error", message)
+        mock_connection.close.assert_called_once()
+
 
 if __name__ == '__main__':
     unittest.main()
@@ -0,0 +1,103 @@
+import os
+import sqlite3
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from app.database import Database
+from app.occupancy import OccupancyIndex
+from app.services import create_time_slot
+from app.statuscodes import DATABASE_ERROR, DATABASE_SUCCESS
+
+
+class TestGroupCommit(unittest.TestCase):
+    """Test for the group commit mode of Database"""
+
+    def setUp(self):
+        """Use a temporary database with group commit for every test"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db = Database(os.path.join(self.directory.name, "test.sqlite"))
+        self.writer = self.db.start_group_commit(max_batch=16, max_delay=0.05)
+        self.addCleanup(self.db.stop_group_commit)
+
+    def _insert(self, time):
+        return lambda cursor: cursor.execute("INSERT INTO bookings (date, time, duration) VALUES (?, ?, ?)",
+                                             ("2025-02-14", time, 30)).lastrowid
+
+    def _count(self):
+        return self.db.execute_query("SELECT COUNT(*) FROM bookings")[2][0][0]
+
+    def test_concurrent_writes_share_commits(self):
+        """Test that concurrent transactions are committed in groups with their own results"""
+        results = []
+        threads = [threading.Thread(target=lambda index=index: results.append(
+            self.db.execute_transaction(self._insert(f"{index:02d}:00")))) for index in range(16)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(result[2] for result in results), list(range(1, 17)))
+        self.assertTrue(all(result[0] == DATABASE_SUCCESS for result in results))
+        self.assertLess(self.writer.groups, 16)
+        self.assertEqual(self._count(), 16)
+
+    def test_failing_write_is_rolled_back_alone(self):
+        """Test that a failing transaction neither commits its changes nor affects the others"""
+        def failing(cursor):
+            self._insert("10:00")(cursor)
+            cursor.execute("INSERT INTO missing_table VALUES (1)")
+
+        def raising(cursor):
+            self._insert("11:00")(cursor)
+            raise KeyError("failed")
+
+        results = {}
+        threads = [
+            threading.Thread(target=lambda: results.update(ok=self.db.execute_transaction(self._insert("09:00")))),
+            threading.Thread(target=lambda: results.update(failing=self.db.execute_transaction(failing)))]
+        for thread in threads:
+            thread.start()
+        with self.assertRaises(KeyError):
+            self.db.execute_transaction(raising)
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results["ok"][0], DATABASE_SUCCESS)
+        self.assertEqual(results["failing"][0], DATABASE_ERROR)
+        self.assertEqual(self.db.execute_query("SELECT time FROM bookings")[2], [("09:00",)])
+
+    def test_failing_commit(self):
+        """Test that every write of a group fails when the group cannot be committed"""
+        with patch.object(Database, "connect", side_effect=sqlite3.OperationalError("disk I/O error")):
+            ret, err, result = self.db.execute_transaction(self._insert("09:00"))
+
+        self.assertEqual(ret, DATABASE_ERROR)
+        self.assertIn("disk I/O error", err)
+        self.assertIsNone(result)
+
+    def test_services_and_stop(self):
+        """Test the services through the writer and the transactions after it stopped"""
+        with patch("app.services.db", self.db), patch("app.services.occupancy", OccupancyIndex()):
+            self.assertEqual(create_time_slot("2025-02-14", "09:00", 30)[2], 200)
+            self.assertEqual(create_time_slot("2025-02-14", "09:15", 30)[2], 400)
+
+        self.db.stop_group_commit()
+        self.assertFalse(self.writer.is_alive())
+        self.assertEqual(self.db.execute_transaction(self._insert("12:00"))[0], DATABASE_SUCCESS)
+        self.assertEqual(self._count(), 2)
+
+    def test_stopped_while_submitting(self):
+        """Test that a transaction handed to a writer stopped meanwhile runs without it"""
+        self.writer.stop()
+        self.writer.join()
+        self.assertIsNone(self.writer.submit(self._insert("09:00")))
+        self.assertIs(self.db.writer, self.writer)
+        self.assertEqual(self.db.execute_transaction(self._insert("09:00"))[0], DATABASE_SUCCESS)
+        self.assertEqual(self._count(), 1)
+
+
+if __name__ == '__main__':
+    unittest.main()
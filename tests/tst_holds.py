@@ -0,0 +1,85 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.database import Database
+from app.holds import HoldSweeper, hold_time_slot, release_expired_holds, release_hold
+from app.services import book_time_slot
+
+
+class TestHolds(unittest.TestCase):
+    """Test for holds module"""
+
+    def setUp(self):
+        """Use a temporary database with two slots for every test"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db = Database(os.path.join(self.directory.name, "test.sqlite"))
+        for patcher in (patch("app.holds.db", self.db), patch("app.services.db", self.db)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.db.execute_update("INSERT INTO bookings (date, time, duration) VALUES (?, ?, ?)",
+                               ("2025-02-14", "09:00", 30))
+        self.db.execute_update("INSERT INTO bookings (date, time, duration, available) VALUES (?, ?, ?, ?)",
+                               ("2025-02-14", "10:00", 30, 0))
+
+    def test_hold_and_book(self):
+        """Test that a held slot can only be booked with its token"""
+        result, error, status = hold_time_slot(1, 60, 600)
+        self.assertEqual(status, 200)
+        self.assertIsNone(error)
+        token = result["hold-token"]
+
+        self.assertEqual(hold_time_slot(1, 60, 600)[2], 409)
+        self.assertEqual(book_time_slot(1, 0)[2], 409)
+        self.assertEqual(book_time_slot(1, 0, "wrong")[2], 409)
+        self.assertEqual(book_time_slot(1, 0, token)[2], 200)
+        _, _, rows = self.db.execute_query("SELECT COUNT(*) FROM holds")
+        self.assertEqual(rows, [(0,)])
+
+    def test_hold_unavailable_or_missing(self):
+        """Test holding booked or missing slots"""
+        self.assertEqual(hold_time_slot(2, 60, 600)[2], 409)
+        self.assertEqual(hold_time_slot(3, 60, 600)[2], 409)
+
+    def test_hold_invalid_input(self):
+        """Test the validation of hold_time_slot"""
+        for args in ((None, 60), ("abc", 60), (1, 0), (1, 601), (1, "abc")):
+            result, error, status = hold_time_slot(*args, 600)
+            self.assertIsNone(result)
+            self.assertEqual(status, 400)
+            self.assertIn("error-msg", error)
+
+    def test_expired_hold(self):
+        """Test that expired holds neither block others nor survive the sweep"""
+        with patch("app.holds.clock.time", return_value=0):
+            hold_time_slot(1, 60, 600)
+
+        self.assertEqual(hold_time_slot(1, 60, 600)[2], 200)
+        with patch("app.holds.clock.time", return_value=10 ** 10):
+            ret, _, released = release_expired_holds(batch_size=1)
+        self.assertEqual(released, 1)
+        _, _, rows = self.db.execute_query("SELECT COUNT(*) FROM holds")
+        self.assertEqual(rows, [(0,)])
+
+    def test_release_hold(self):
+        """Test releasing a hold"""
+        token = hold_time_slot(1, 60, 600)[0]["hold-token"]
+        self.assertEqual(release_hold(1, "wrong")[2], 400)
+        self.assertEqual(release_hold(1, token)[2], 200)
+        self.assertEqual(release_hold(None, token)[2], 400)
+        self.assertEqual(release_hold("abc", token)[2], 400)
+        self.assertEqual(book_time_slot(1, 0)[2], 200)
+
+    def test_sweeper_stop(self):
+        """Test starting and stopping the sweeper"""
+        sweeper = HoldSweeper(0.01)
+        sweeper.start()
+        sweeper.stop()
+        sweeper.join(1)
+        self.assertFalse(sweeper.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,147 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import create_app
+from app.database import Database
+from app.idempotency import KeyPurger, make_idempotency, purge_expired_keys
+from app.occupancy import OccupancyIndex
+from app.services import book_time_slot, create_time_slot
+
+
+class TestIdempotency(unittest.TestCase):
+    """Test for idempotency module"""
+
+    def setUp(self):
+        """Use a temporary database for every test"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db = Database(os.path.join(self.directory.name, "test.sqlite"))
+        for patcher in (patch("app.services.db", self.db), patch("app.services.occupancy", OccupancyIndex())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _idempotency(self, key, fields, ttl=60):
+        return make_idempotency(key, "POST", "/bookings", fields, ttl)[1]
+
+    def _count(self, table):
+        return self.db.execute_query(f"SELECT COUNT(*) FROM {table}")[2][0][0]
+
+    def test_make_idempotency(self):
+        """Test the key validation and the request fingerprint"""
+        self.assertEqual(make_idempotency(None, "POST", "/bookings", [], 60), ("", None))
+        self.assertIn("Idempotency-Key", make_idempotency("", "POST", "/bookings", [], 60)[0])
+        self.assertIn("Idempotency-Key", make_idempotency("k" * 256, "POST", "/bookings", [], 60)[0])
+
+        first = self._idempotency("key", [("date", "2025-02-14"), ("time", "09:00")])
+        reordered = self._idempotency("key", [("time", "09:00"), ("date", "2025-02-14")])
+        self.assertEqual(first, reordered)
+        self.assertNotEqual(first.fingerprint, self._idempotency("key", [("time", "10:00")]).fingerprint)
+
+    def test_retried_create_inserts_once(self):
+        """Test that a retried create returns the stored response without inserting again"""
+        idempotency = self._idempotency("key", [("date", "2025-02-14")])
+        self.assertEqual(create_time_slot("2025-02-14", "09:00", 30, None, idempotency)[2], 200)
+        self.assertEqual(create_time_slot("2025-02-14", "09:00", 30, None, idempotency),
+                         ({"error-msg": ""}, None, 200))
+        self.assertEqual(self._count("bookings"), 1)
+
+        # Without a key the retry is a new, overlapping slot
+        self.assertEqual(create_time_slot("2025-02-14", "09:00", 30)[2], 400)
+
+    def test_stored_error_response(self):
+        """Test that error responses are replayed as errors"""
+        create_time_slot("2025-02-14", "09:00", 30)
+        idempotency = self._idempotency("key", [("date", "2025-02-14")])
+        first = create_time_slot("2025-02-14", "09:00", 30, None, idempotency)
+        self.assertEqual(first[2], 400)
+        self.assertEqual(create_time_slot("2025-02-14", "09:00", 30, None, idempotency), first)
+
+    def test_key_reused_for_another_request(self):
+        """Test that a key cannot be reused with another request"""
+        create_time_slot("2025-02-14", "09:00", 30, None, self._idempotency("key", [("time", "09:00")]))
+        result, error, status = create_time_slot("2025-02-14", "10:00", 30, None,
+                                                 self._idempotency("key", [("time", "10:00")]))
+        self.assertIsNone(result)
+        self.assertEqual(status, 422)
+        self.assertEqual(self._count("bookings"), 1)
+
+    def test_retried_book(self):
+        """Test that a retried booking returns the stored response"""
+        create_time_slot("2025-02-14", "09:00", 30)
+        idempotency = self._idempotency("key", [("id", "1")])
+        self.assertEqual(book_time_slot(1, 0, None, idempotency)[2], 200)
+        self.db.execute_update("UPDATE bookings SET available = 1 WHERE id = 1")
+        self.assertEqual(book_time_slot(1, 0, None, idempotency)[2], 200)
+        self.assertEqual(self.db.execute_query("SELECT available FROM bookings")[2], [(1,)])
+
+    def test_expired_keys(self):
+        """Test that expired keys are ignored and purged"""
+        with patch("app.services.clock.time", return_value=0):
+            create_time_slot("2025-02-14", "09:00", 30, None, self._idempotency("key", [("time", "09:00")]))
+
+        self.assertEqual(create_time_slot("2025-02-14", "10:00", 30, None,
+                                          self._idempotency("key", [("time", "10:00")]))[2], 200)
+        with patch("app.idempotency.clock.time", return_value=10 ** 10):
+            ret, _, purged = purge_expired_keys(self.db, batch_size=1)
+        self.assertEqual(purged, 1)
+        self.assertEqual(self._count("idempotency_keys"), 0)
+
+    def test_purger_stop(self):
+        """Test starting and stopping the purger"""
+        purger = KeyPurger(self.db, 0.01)
+        purger.start()
+        purger.stop()
+        purger.join(1)
+        self.assertFalse(purger.is_alive())
+
+
+class TestIdempotencyRoutes(unittest.TestCase):
+    """Test for the Idempotency-Key header of the bookings endpoints"""
+
+    def setUp(self):
+        """Set up the test client"""
+        app = create_app({"IDEMPOTENCY_TTL": 60})
+        app.testing = True
+        self.client = app.test_client()
+
+    @patch('app.routes.create_time_slot')
+    def test_post_with_key(self, mock_create_time_slot):
+        """Test that the key is passed on with the request fingerprint"""
+        mock_create_time_slot.return_value = {'error-msg': ''}, None, 200
+        data = {'date': '2025-02-14', 'time': '09:00', 'duration': 30}
+        self.client.post('/bookings', data=data, headers={'Idempotency-Key': 'key'})
+
+        idempotency = mock_create_time_slot.call_args[0][4]
+        self.assertEqual(idempotency, self._expected('POST', dict(data, capacity=None)))
+        self.assertEqual(idempotency.ttl, 60)
+
+        # The same request as JSON has the same fingerprint
+        self.client.post('/bookings', json=data, headers={'Idempotency-Key': 'key'})
+        self.assertEqual(mock_create_time_slot.call_args[0][4], idempotency)
+
+    @patch('app.routes.book_time_slot')
+    def test_put_without_key(self, mock_book_time_slot):
+        """Test that requests without a key are not idempotent"""
+        mock_book_time_slot.return_value = {'error-msg': ''}, None, 200
+        self.client.put('/bookings', data={'id': 1, 'available': 0})
+
+        self.assertIsNone(mock_book_time_slot.call_args[0][3])
+
+    @patch('app.routes.book_time_slot')
+    def test_invalid_key(self, mock_book_time_slot):
+        """Test that invalid keys are refused"""
+        response = self.client.put('/bookings', data={'id': 1, 'available': 0},
+                                   headers={'Idempotency-Key': 'k' * 256})
+
+        self.assertEqual(response.status_code, 400)
+        mock_book_time_slot.assert_not_called()
+
+    @staticmethod
+    def _expected(method, data):
+        return make_idempotency('key', method, '/bookings', list(data.items()), 60)[1]
+
+
+if __name__ == '__main__':
+    unittest.main()
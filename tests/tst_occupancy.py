@@ -0,0 +1,94 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+
+from app.database import Database
+from app.occupancy import OccupancyIndex, build_bitmaps, slot_mask, slot_masks, spanned_dates
+from app.statuscodes import DATABASE_ERROR
+
+
+class TestOccupancy(unittest.TestCase):
+    """Test for occupancy module"""
+
+    def setUp(self):
+        """Use a temporary database for every test"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db = Database(os.path.join(self.directory.name, "test.sqlite"))
+        self.db.execute_update("INSERT INTO bookings (date, time, duration) VALUES (?, ?, ?)",
+                               ("2025-02-14", "09:00", 60))
+
+    def test_slot_mask(self):
+        """Test the minutes covered by a slot"""
+        self.assertEqual(slot_mask(2, 3), 0b11100)
+        self.assertEqual(slot_mask(10, 0), 0)
+        self.assertEqual(slot_mask(10, -5), 0)
+
+    def test_slot_masks(self):
+        """Test the minutes covered by a slot on every date it spans"""
+        self.assertEqual(slot_masks("2025-02-14", 2, 3), {"2025-02-14": 0b11100})
+        self.assertEqual(slot_masks("2025-02-14", 1410, 90),
+                         {"2025-02-14": slot_mask(1410, 30), "2025-02-15": slot_mask(0, 60)})
+        self.assertEqual(slot_masks("2025-02-28", 0, 2 * 1440 + 1),
+                         {"2025-02-28": slot_mask(0, 1440), "2025-03-01": slot_mask(0, 1440),
+                          "2025-03-02": slot_mask(0, 1)})
+        self.assertEqual(slot_masks("2025-02-14", 1410, 30), {"2025-02-14": slot_mask(1410, 30)})
+
+    def test_build_bitmaps(self):
+        """Test building the bitmaps of dates from the slots covering them, whatever their start date"""
+        self.db.execute_update("INSERT INTO bookings (date, time, duration) VALUES (?, ?, ?), (?, ?, ?), (?, ?, ?)",
+                               ("2025-02-13", "23:30", 90, "2025-02-10", "12:00", 7 * 1440, "2025-02-14", "x", 5))
+        _, _, bitmaps = self.db.execute_transaction(
+            lambda cursor: build_bitmaps(cursor, ["2025-02-14", "2025-02-17", "2025-02-18"]))
+
+        self.assertEqual(bitmaps, {"2025-02-14": slot_mask(0, 1440), "2025-02-17": slot_mask(0, 720),
+                                   "2025-02-18": 0})
+        _, _, bitmaps = self.db.execute_transaction(lambda cursor: build_bitmaps(cursor, ["2025-02-13"]))
+        self.assertEqual(bitmaps, {"2025-02-13": slot_mask(0, 1440)})
+
+    def test_spanned_dates(self):
+        """Test the dates whose bitmaps include a stored slot"""
+        _, _, rows = self.db.execute_query("SELECT date, start_at, end_at FROM bookings")
+        self.assertEqual(spanned_dates(*rows[0]), ["2025-02-14"])
+        self.db.execute_update("INSERT INTO bookings (date, time, duration) VALUES (?, ?, ?)",
+                               ("2025-02-14", "23:00", 120))
+        _, _, rows = self.db.execute_query("SELECT date, start_at, end_at FROM bookings WHERE id = 2")
+        self.assertEqual(spanned_dates(*rows[0]), ["2025-02-14", "2025-02-15"])
+        self.assertEqual(spanned_dates("2025-02-14", None, None), ["2025-02-14"])
+
+    def test_load_builds_and_persists(self):
+        """Test that missing bitmaps are built from the bookings and stored"""
+        index = OccupancyIndex()
+        _, _, bitmaps = self.db.execute_transaction(
+            lambda cursor: index.load(cursor, ["2025-02-14", "2025-02-15"]))
+
+        self.assertEqual(bitmaps, {"2025-02-14": slot_mask(540, 60), "2025-02-15": 0})
+        _, _, rows = self.db.execute_query("SELECT date FROM occupancy ORDER BY date")
+        self.assertEqual(rows, [("2025-02-14",), ("2025-02-15",)])
+
+    def test_store_and_rebuild(self):
+        """Test storing a bitmap and rebuilding it from the bookings"""
+        index = OccupancyIndex()
+        self.db.execute_transaction(lambda cursor: index.store(cursor, {"2025-02-14": 1}))
+        _, _, bitmaps = self.db.execute_transaction(lambda cursor: index.load(cursor, ["2025-02-14"]))
+        self.assertEqual(bitmaps["2025-02-14"], 1)
+
+        _, _, bitmaps = self.db.execute_transaction(lambda cursor: index.rebuild(cursor, ["2025-02-14"]))
+        self.assertEqual(bitmaps["2025-02-14"], slot_mask(540, 60))
+
+    def test_transaction_rollback(self):
+        """Test that a failing transaction is rolled back"""
+        def failing(cursor):
+            cursor.execute("DELETE FROM bookings")
+            raise sqlite3.OperationalError("Mocked error")
+
+        status, message, _ = self.db.execute_transaction(failing)
+        self.assertEqual(status, DATABASE_ERROR)
+        self.assertEqual(message, "Mocked error")
+        _, _, rows = self.db.execute_query("SELECT COUNT(*) FROM bookings")
+        self.assertEqual(rows, [(1,)])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,42 @@
+import unittest
+
+from datetime import date
+from app.parsing import format_date, format_time, parse_date, parse_time
+
+
+class TestParsing(unittest.TestCase):
+    """Test for parsing module"""
+
+    def test_parse_date_success(self):
+        """Test parse_date with valid dates"""
+        self.assertEqual(parse_date("2025-02-14"), date(2025, 2, 14).toordinal())
+        self.assertEqual(parse_date("2024-02-29"), date(2024, 2, 29).toordinal())
+        self.assertEqual(parse_date("2025-2-4"), date(2025, 2, 4).toordinal())
+
+    def test_parse_date_failure(self):
+        """Test parse_date with invalid dates"""
+        for value in ("2025-02-30", "2025-02-29", "1900-02-29", "2025-13-01", "0000-01-01",
+                      "2025-00-10", "2025-01-64", "2025/01/01", "2025-01-01 ", "abc", "", None, 20250101,
+                      ["2025-01-01"], {}):
+            self.assertIsNone(parse_date(value), value)
+
+    def test_parse_time_success(self):
+        """Test parse_time with valid times"""
+        self.assertEqual(parse_time("00:00"), 0)
+        self.assertEqual(parse_time("14:30"), 870)
+        self.assertEqual(parse_time("9:05"), 545)
+        self.assertEqual(parse_time("23:59"), 1439)
+
+    def test_parse_time_failure(self):
+        """Test parse_time with invalid times"""
+        for value in ("24:00", "12:60", "12-30", "1230", "12:30:00", "", None, 1230, ["12:30"], {}):
+            self.assertIsNone(parse_time(value), value)
+
+    def test_format_roundtrip(self):
+        """Test that formatting inverts parsing"""
+        self.assertEqual(format_date(parse_date("2025-02-14")), "2025-02-14")
+        self.assertEqual(format_time(parse_time("09:05")), "09:05")
+
+
+if __name__ == '__main__':
+    unittest.main()
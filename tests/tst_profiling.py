@@ -0,0 +1,116 @@
+import marshal
+import unittest
+import cProfile
+from unittest.mock import patch
+
+from app import create_app
+from app.profiling import ProfileStore, profile_store
+
+
+class TestProfileStore(unittest.TestCase):
+    """Test for ProfileStore class"""
+
+    def _profile(self):
+        profile = cProfile.Profile()
+        profile.enable()
+        sum(range(100))
+        profile.disable()
+        return profile
+
+    def test_add_aggregates_per_endpoint(self):
+        """Test that profiles of the same endpoint are merged"""
+        store = ProfileStore()
+        store.add("GET /bookings", self._profile())
+        store.add("GET /bookings", self._profile())
+        store.add("POST /bookings", self._profile())
+
+        summary = store.summary()
+        self.assertEqual(store.keys(), ["GET /bookings", "POST /bookings"])
+        self.assertEqual(summary["GET /bookings"]["samples"], 2)
+        self.assertEqual(summary["POST /bookings"]["samples"], 1)
+
+    def test_render_and_dump(self):
+        """Test the text and pstats outputs"""
+        store = ProfileStore()
+        store.add("GET /bookings", self._profile())
+
+        self.assertIn("function calls", store.render("GET /bookings"))
+        self.assertIsInstance(marshal.loads(store.dump("GET /bookings")), dict)
+        self.assertEqual(store.render("missing"), "")
+        self.assertEqual(store.dump("missing"), b"")
+
+    def test_reset(self):
+        """Test that reset drops all profiles"""
+        store = ProfileStore()
+        store.add("GET /bookings", self._profile())
+        store.reset()
+        self.assertEqual(store.summary(), {})
+
+
+class TestProfilingRoutes(unittest.TestCase):
+    """Test for the profiling hook and endpoint"""
+
+    def setUp(self):
+        """Set up the test client with an admin token"""
+        app = create_app({"ADMIN_TOKEN": "secret"})
+        app.testing = True
+        self.client = app.test_client()
+        profile_store.reset()
+
+    def tearDown(self):
+        profile_store.reset()
+
+    @patch('app.routes.query_time_slots')
+    def test_header_profiles_admin_request(self, mock_query_time_slots):
+        """Test that the profile header is honored for admins"""
+        mock_query_time_slots.return_value = [], None, 200
+        self.client.get('/bookings?date=2025-02-14',
+                        headers={'X-Profile': '1', 'X-Admin-Token': 'secret'})
+
+        self.assertEqual(profile_store.keys(), ["GET /bookings"])
+
+    @patch('app.routes.query_time_slots')
+    def test_header_ignored_for_non_admin(self, mock_query_time_slots):
+        """Test that the profile header is ignored without the admin token"""
+        mock_query_time_slots.return_value = [], None, 200
+        self.client.get('/bookings?date=2025-02-14', headers={'X-Profile': '1'})
+
+        self.assertEqual(profile_store.keys(), [])
+
+    def test_get_profiles_forbidden(self):
+        """Test that the stats endpoint requires the admin token"""
+        response = self.client.get('/admin/profiles')
+        self.assertEqual(response.status_code, 403)
+
+    @patch('app.routes.query_time_slots')
+    def test_get_profiles_formats(self, mock_query_time_slots):
+        """Test downloading the stats in every format"""
+        mock_query_time_slots.return_value = [], None, 200
+        headers = {'X-Profile': '1', 'X-Admin-Token': 'secret'}
+        self.client.get('/bookings?date=2025-02-14', headers=headers)
+
+        response = self.client.get('/admin/profiles', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json["GET /bookings"]["samples"], 1)
+
+        response = self.client.get('/admin/profiles?format=text&endpoint=GET /bookings',
+                                   headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIn(b"function calls", response.data)
+
+        response = self.client.get('/admin/profiles?format=pstats&endpoint=GET /bookings',
+                                   headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsInstance(marshal.loads(response.data), dict)
+
+        response = self.client.get('/admin/profiles?format=text&endpoint=missing',
+                                   headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.delete('/admin/profiles', headers=headers)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(profile_store.keys(), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,139 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import create_app, services
+from app.database import Database
+from app.occupancy import OccupancyIndex
+from app.recurrence import format_weekdays, parse_weekdays
+from app.services import (create_template, create_time_slot, delete_template, delete_time_slot, get_day_summaries,
+                          get_templates, get_time_slots, materialize_templates_ahead)
+
+# 2026-01-01 12:00 UTC, a Thursday
+NOW = 1767268800
+
+
+class TestRecurrence(unittest.TestCase):
+    """Test for recurrence module"""
+
+    def setUp(self):
+        """Use a temporary database and a fixed clock for every test"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db = Database(os.path.join(self.directory.name, "test.sqlite"))
+        for patcher in (patch("app.services.db", self.db), patch("app.services.occupancy", OccupancyIndex()),
+                        patch("app.services.materialized_templates", set()), patch("app.services.cached_templates"),
+                        patch("app.services.clock.time", return_value=NOW)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _times(self, booking_date, end_date=None):
+        return [(slot["date"], slot["time"]) for slot in get_time_slots(booking_date, end_date)[0]["slots"]]
+
+    def test_weekdays(self):
+        """Test parsing and formatting weekdays"""
+        self.assertEqual(parse_weekdays("mon-fri"), 0b0011111)
+        self.assertEqual(parse_weekdays("Sat, sun,mon"), 0b1100001)
+        self.assertEqual(format_weekdays(parse_weekdays("tue-thu,sun")), "tue,wed,thu,sun")
+        for invalid in ("", "fri-mon", "monday", "mon-", None):
+            self.assertIsNone(parse_weekdays(invalid), invalid)
+
+    def test_lazy_materialization(self):
+        """Test that the slots of a template are created on the first query, around the one-off slots"""
+        create_time_slot("2026-01-02", "09:15", 30)
+        self.assertEqual(create_template("mon-fri", "09:00", "11:00", 30)[2], 200)
+
+        self.assertEqual(self._times("2026-01-01", "2026-01-05"), [
+            ("2026-01-01", "09:00"), ("2026-01-01", "09:30"), ("2026-01-01", "10:00"), ("2026-01-01", "10:30"),
+            ("2026-01-02", "09:15"), ("2026-01-02", "10:00"), ("2026-01-02", "10:30"),
+            ("2026-01-05", "09:00"), ("2026-01-05", "09:30"), ("2026-01-05", "10:00"), ("2026-01-05", "10:30")])
+        self.assertEqual(get_day_summaries("2026-01-06")[0]["days"][0]["total"], 4)
+
+        # Deleted slots are not recreated, not even by another process
+        for slot in get_time_slots("2026-01-01")[0]["slots"][:2]:
+            delete_time_slot(slot["id"])
+        services.materialized_templates.clear()
+        self.assertEqual(len(self._times("2026-01-01")), 2)
+
+    def test_cached_templates(self):
+        """Test that the templates are read once until one is created or deleted"""
+        with patch.object(self.db, "execute_query", wraps=self.db.execute_query) as query:
+            self.assertEqual(len(self._times("2026-01-01")), 0)
+            self.assertEqual(len(self._times("2026-01-02")), 0)
+            self.assertEqual(sum("slot_templates" in call.args[0] for call in query.call_args_list), 1)
+
+            template_id = create_template("mon-sun", "09:00", "10:00", 60)[0]["id"]
+            self.assertEqual(len(self._times("2026-01-02")), 1)
+            self.assertEqual(len(self._times("2026-01-02")), 1)
+            self.assertEqual(sum("slot_templates" in call.args[0] for call in query.call_args_list), 2)
+
+            delete_template(template_id)
+            self.assertEqual(len(self._times("2026-01-03")), 0)
+            self.assertEqual(sum("slot_templates" in call.args[0] for call in query.call_args_list), 3)
+
+    def test_window(self):
+        """Test that past dates and dates beyond the horizon or the validity are left alone"""
+        create_template("mon-sun", "09:00", "10:00", 60, "2025-12-01", "2026-01-03")
+        create_template("mon-sun", "12:00", "13:00", 60)
+        self.assertEqual(self._times("2025-12-30", "2026-01-05"), [
+            ("2026-01-01", "09:00"), ("2026-01-01", "12:00"), ("2026-01-02", "09:00"), ("2026-01-02", "12:00"),
+            ("2026-01-03", "09:00"), ("2026-01-03", "12:00"), ("2026-01-04", "12:00"), ("2026-01-05", "12:00")])
+        self.assertEqual(self._times("2027-01-02"), [])
+
+        self.assertEqual(materialize_templates_ahead(30)[0], {"date": "2026-01-01", "end_date": "2026-01-30"})
+        self.assertEqual(self.db.execute_query("SELECT COUNT(*) FROM bookings")[2], [(33,)])
+        self.assertEqual(materialize_templates_ahead(0)[2], 400)
+
+    def test_templates(self):
+        """Test listing, validating and deleting templates"""
+        self.assertEqual(create_template("mon-fri", "09:00", "17:00", 30)[0], {"id": 1})
+        self.assertEqual(get_templates()[0]["templates"], [
+            {"id": 1, "weekdays": "mon,tue,wed,thu,fri", "start_time": "09:00", "end_time": "17:00",
+             "duration": 30, "valid_from": "2026-01-01", "valid_until": None}])
+        for args in (("fri-mon", "09:00", "17:00", 30), ("mon", "17:00", "09:00", 30), ("mon", "09:00", "09:20", 30),
+                     ("mon", "09:00", "17:00", 30, "2026-02-01", "2026-01-01")):
+            self.assertEqual(create_template(*args)[2], 400, args)
+        self.assertEqual(create_template("mon", "9:00", "9:30", 30, "2026-1-5", "2026-1-5")[0], {"id": 2})
+        self.assertEqual(get_templates()[0]["templates"][1], {
+            "id": 2, "weekdays": "mon", "start_time": "09:00", "end_time": "09:30", "duration": 30,
+            "valid_from": "2026-01-05", "valid_until": "2026-01-05"})
+
+        self.assertEqual(delete_template(1)[2], 200)
+        self.assertEqual(delete_template(1)[2], 400)
+        self.assertEqual(self._times("2026-01-01"), [])
+
+    def test_memory_engine(self):
+        """Test that the templates need the SQLite engine"""
+        services.select_storage("memory")
+        self.addCleanup(services.select_storage, "sqlite")
+        self.assertEqual(create_template("mon-fri", "09:00", "17:00", 30)[2], 501)
+        self.assertEqual(get_time_slots("2026-01-01")[0]["count"], 0)
+
+
+class TestTemplateRoutes(unittest.TestCase):
+    """Test for the template endpoints"""
+
+    def setUp(self):
+        """Set up the test client with an admin token"""
+        app = create_app({"ADMIN_TOKEN": "secret"})
+        app.testing = True
+        self.client = app.test_client()
+
+    @patch('app.routes.create_template')
+    def test_create(self, mock_create_template):
+        """Test that creating a template needs the admin token and a valid body"""
+        mock_create_template.return_value = {"id": 1}, None, 200
+        body = {'weekdays': 'mon-fri', 'start_time': '09:00', 'end_time': '17:00', 'duration': 30}
+        self.assertEqual(self.client.post('/bookings/templates', json=body).status_code, 403)
+
+        headers = {'X-Admin-Token': 'secret'}
+        response = self.client.post('/bookings/templates', json=body, headers=headers)
+        self.assertEqual(response.json, {"id": 1})
+        mock_create_template.assert_called_once_with('mon-fri', '09:00', '17:00', 30, None, None)
+        response = self.client.post('/bookings/templates', json=dict(body, duration='long'), headers=headers)
+        self.assertEqual(response.status_code, 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,108 @@
+import os
+import tempfile
+import threading
+import unittest
+from unittest.mock import patch
+
+from app.database import Database
+from app.holds import hold_time_slot
+from app.occupancy import OccupancyIndex
+from app.services import book_time_slot, cancel_reservation, create_time_slot, delete_time_slot, reserve_seat
+
+
+class TestReservations(unittest.TestCase):
+    """Test for the seat reservations of multi-seat time slots"""
+
+    def setUp(self):
+        """Use a temporary database with a three seat slot for every test"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db = Database(os.path.join(self.directory.name, "test.sqlite"))
+        for patcher in (patch("app.holds.db", self.db), patch("app.services.db", self.db),
+                        patch("app.services.occupancy", OccupancyIndex())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        self.assertEqual(create_time_slot("2025-02-14", "09:00", 30, 3)[2], 200)
+
+    def _seats(self):
+        _, _, rows = self.db.execute_query("SELECT available, capacity FROM bookings WHERE id = 1")
+        return rows[0]
+
+    def test_reserve_until_full(self):
+        """Test that every seat can be reserved once"""
+        for remaining in (2, 1, 0):
+            result, error, status = reserve_seat(1)
+            self.assertEqual(status, 200)
+            self.assertEqual(result["available"], remaining)
+
+        self.assertEqual(reserve_seat(1)[2], 409)
+        self.assertEqual(self._seats(), (0, 3))
+
+    def test_concurrent_reservations(self):
+        """Test that concurrent reservations never oversell the slot"""
+        statuses = []
+        threads = [threading.Thread(target=lambda: statuses.append(reserve_seat(1)[2])) for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(sorted(statuses), [200] * 3 + [409] * 5)
+        self.assertEqual(self._seats(), (0, 3))
+
+    def test_set_availability_within_seats(self):
+        """Test that the availability set by clients stays within the seats not reserved"""
+        reserve_seat(1)
+        for available in (3, 5, -3):
+            result, error, status = book_time_slot(1, available)
+            self.assertEqual(status, 400, available)
+            self.assertIn("between 0 and the 2 seats", error["error-msg"])
+        self.assertEqual(book_time_slot(1, 2)[2], 200)
+        self.assertEqual(self._seats(), (2, 3))
+
+        self.assertEqual(create_time_slot("2025-02-14", "10:00", 30)[2], 200)
+        self.assertEqual(book_time_slot(2, 5)[2], 400)
+        self.assertEqual(book_time_slot(2, 0)[2], 200)
+        self.assertEqual(reserve_seat(2)[2], 409)
+
+    def test_cancel_reservation(self):
+        """Test that cancelling gives the seat back exactly once"""
+        reservation_id = reserve_seat(1)[0]["reservation-id"]
+
+        self.assertEqual(cancel_reservation(reservation_id)[2], 200)
+        self.assertEqual(cancel_reservation(reservation_id)[2], 400)
+        self.assertEqual(self._seats(), (3, 3))
+
+    def test_reserve_held_slot(self):
+        """Test that a held slot can only be reserved with its token"""
+        token = hold_time_slot(1, 60, 600)[0]["hold-token"]
+
+        self.assertEqual(reserve_seat(1)[2], 409)
+        self.assertEqual(reserve_seat(1, token)[2], 200)
+
+    def test_book_keeps_reservations(self):
+        """Test that setting the availability leaves the reservations alone"""
+        reservation_id = reserve_seat(1)[0]["reservation-id"]
+        self.assertEqual(book_time_slot(1, 0)[2], 200)
+
+        self.assertEqual(cancel_reservation(reservation_id)[2], 200)
+        self.assertEqual(self._seats(), (1, 3))
+
+    def test_delete_slot_with_reservations(self):
+        """Test that deleting a slot removes its reservations"""
+        reserve_seat(1)
+        self.assertEqual(delete_time_slot(1)[2], 200)
+        _, _, rows = self.db.execute_query("SELECT COUNT(*) FROM reservations")
+        self.assertEqual(rows, [(0,)])
+
+    def test_invalid_input(self):
+        """Test the validation of the capacity and the ids"""
+        for capacity in (0, -1, "abc"):
+            self.assertEqual(create_time_slot("2025-02-15", "09:00", 30, capacity)[2], 400)
+        for function in (reserve_seat, cancel_reservation):
+            self.assertEqual(function(None)[2], 400)
+            self.assertEqual(function("abc")[2], 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,6 +1,7 @@
 import unittest
 from unittest.mock import patch
 from app import create_app
+from app.models import TimeSlot
 
 
 class TestRoutes(unittest.TestCase):
@@ -12,27 +13,172 @@ class TestRoutes(unittest.TestCase):
         app.testing = True
         self.client = app.test_client()
 
-    @patch('app.routes.get_time_slots')
-    def test_get_bookings_success(self, mock_get_time_slots):
-        """The when the get_time_slots service is successful"""
+    @patch('app.routes.query_time_slots')
+    def test_get_bookings_success(self, mock_query_time_slots):
+        """The when the query_time_slots service is successful"""
         mock_json = {'count': 1, 'slots': [
             {'id': 1, 'date': '2025-02-14', 'time': '14:30', 'duration': 30, 'available': 1}]}
-        mock_get_time_slots.return_value = mock_json, None, 200
+        mock_query_time_slots.return_value = [TimeSlot(1, '2025-02-14', '14:30', 30, 1)], None, 200
         response = self.client.get('/bookings?date=2025-02-24')
 
         self.assertEqual(response.status_code, 200)
         self.assertEqual(response.json, mock_json)
 
-    @patch('app.routes.get_time_slots')
-    def test_get_bookings_failure(self, mock_get_time_slots):
-        """Test when the get_time_slots service fails"""
+    @patch('app.routes.query_time_slots')
+    def test_get_bookings_columnar(self, mock_query_time_slots):
+        """Test the columnar format of the listing"""
+        mock_query_time_slots.return_value = [TimeSlot(1, '2025-02-14', '14:30', 30, 1),
+                                              TimeSlot(2, '2025-02-14', '15:00', 60, 0)], None, 200
+        response = self.client.get('/bookings?date=2025-02-14&format=columnar')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {'count': 2, 'days': [
+            {'date': '2025-02-14', 'id': [1, 2], 'time': ['14:30', '15:00'], 'duration': [30, 60],
+             'available': [1, 0]}]})
+        self.assertEqual(self.client.get('/bookings?date=2025-02-14&format=xml').status_code, 400)
+        self.assertEqual(self.client.get('/bookings?date=2025-02-14&format=columnar&stream=1').status_code, 400)
+
+    @patch('app.routes.query_time_slots')
+    def test_get_bookings_failure(self, mock_query_time_slots):
+        """Test when the query_time_slots service fails"""
         error_json = {'error': 'Invalid date format'}
-        mock_get_time_slots.return_value = (None, error_json, 400)
+        mock_query_time_slots.return_value = (None, error_json, 400)
         response = self.client.get('/bookings?date=invalid-date')
 
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json, error_json)
 
+    @patch('app.routes.stream_time_slots')
+    def test_get_bookings_stream(self, mock_stream_time_slots):
+        """Test the streaming mode of the listing"""
+        mock_stream_time_slots.return_value = iter([[TimeSlot(1, '2025-02-14', '14:30', 30, 1)]]), None, 200
+        response = self.client.get('/bookings?date=2025-02-14&end_date=2025-02-20&stream=1')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, {'count': 1, 'slots': [
+            {'id': 1, 'date': '2025-02-14', 'time': '14:30', 'duration': 30, 'available': 1}]})
+        self.assertEqual(mock_stream_time_slots.call_args[0][:2], ('2025-02-14', '2025-02-20'))
+
+    @patch('app.routes.stream_time_slots')
+    def test_get_bookings_stream_failure(self, mock_stream_time_slots):
+        """Test when the stream_time_slots service fails"""
+        error_json = {'error-msg': 'Invalid date format'}
+        mock_stream_time_slots.return_value = None, error_json, 400
+        response = self.client.get('/bookings?date=invalid&stream=1')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json, error_json)
+
+    @patch('app.routes.hold_time_slot')
+    def test_post_hold(self, mock_hold_time_slot):
+        """Test the hold endpoint with the default ttl"""
+        result_json = {'hold-token': 'token', 'expires-at': 1.0}
+        mock_hold_time_slot.return_value = result_json, None, 200
+        response = self.client.post('/bookings/hold', data={'id': 1})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, result_json)
+        self.assertEqual(mock_hold_time_slot.call_args[0], ('1', 300, 1800))
+
+    @patch('app.routes.release_hold')
+    def test_delete_hold(self, mock_release_hold):
+        """Test the hold release endpoint"""
+        mock_release_hold.return_value = None, {'error-msg': 'Hold not found'}, 400
+        response = self.client.delete('/bookings/hold', data={'id': 1, 'token': 'token'})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(mock_release_hold.call_args[0], ('1', 'token'))
+
+    @patch('app.routes.reserve_seat')
+    def test_post_reservation(self, mock_reserve_seat):
+        """Test the seat reservation endpoint"""
+        result_json = {'reservation-id': 1, 'available': 2}
+        mock_reserve_seat.return_value = result_json, None, 200
+        response = self.client.post('/bookings/reservations', data={'id': 1})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, result_json)
+        self.assertEqual(mock_reserve_seat.call_args[0], ('1', None))
+
+    @patch('app.routes.cancel_reservation')
+    def test_delete_reservation(self, mock_cancel_reservation):
+        """Test the reservation cancel endpoint"""
+        mock_cancel_reservation.return_value = None, {'error-msg': 'Reservation not found'}, 400
+        response = self.client.delete('/bookings/reservations', data={'id': 1})
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(mock_cancel_reservation.call_args[0], ('1',))
+
+    @patch('app.routes.find_free_windows')
+    def test_get_free_windows(self, mock_find_free_windows):
+        """Test the free window search endpoint and its ETag"""
+        result_json = {'count': 1, 'windows': [{'date': '2025-02-14', 'start': '09:00', 'end': '12:00'}]}
+        mock_find_free_windows.return_value = result_json, None, 200
+        response = self.client.get('/bookings/free?date=2025-02-14&duration=45')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, result_json)
+        response = self.client.get('/bookings/free?date=2025-02-14&duration=45',
+                                   headers={'If-None-Match': response.headers['ETag']})
+        self.assertEqual(response.status_code, 304)
+
+    @patch('app.routes.find_free_windows')
+    def test_get_free_windows_failure(self, mock_find_free_windows):
+        """Test when the find_free_windows service fails"""
+        error_json = {'error-msg': 'Invalid duration and/or step'}
+        mock_find_free_windows.return_value = None, error_json, 400
+        response = self.client.get('/bookings/free?date=2025-02-14&duration=abc')
+
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.json, error_json)
+
+    @patch('app.routes.get_day_summaries')
+    def test_get_day_summaries(self, mock_get_day_summaries):
+        """Test the day summary endpoint"""
+        result_json = {'count': 1, 'days': [{'date': '2025-02-14', 'total': 2, 'available': 1, 'minutes_free': 30}]}
+        mock_get_day_summaries.return_value = result_json, None, 200
+        response = self.client.get('/bookings/summary?month=2025-02')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, result_json)
+        self.assertEqual(mock_get_day_summaries.call_args[0], (None, None, '2025-02'))
+
+    @patch('app.routes.get_archived_time_slots')
+    def test_get_archived_bookings(self, mock_get_archived_time_slots):
+        """Test the archived time slot endpoint"""
+        mock_get_archived_time_slots.return_value = {'count': 0, 'slots': []}, None, 200
+        response = self.client.get('/bookings/archive?date=2025-02-01&end_date=2025-02-28')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_get_archived_time_slots.call_args[0], ('2025-02-01', '2025-02-28'))
+
+    @patch('app.routes.import_time_slots')
+    def test_import_bookings(self, mock_import_time_slots):
+        """Test the bulk import endpoint"""
+        result_json = {'imported': 1, 'rejected': 0, 'errors': []}
+        mock_import_time_slots.return_value = result_json, None, 200
+        self.client.application.config['ADMIN_TOKEN'] = 'secret'
+
+        response = self.client.post('/bookings/import', data='{"date": "2025-02-14"}\n',
+                                    content_type='application/x-ndjson')
+        self.assertEqual(response.status_code, 403)
+
+        response = self.client.post('/bookings/import', data='{"date": "2025-02-14"}\n',
+                                    content_type='application/x-ndjson', headers={'X-Admin-Token': 'secret'})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json, result_json)
+        self.assertEqual(mock_import_time_slots.call_args[0][1], 'ndjson')
+
+    @patch('app.routes.export_time_slots')
+    def test_export_bookings(self, mock_export_time_slots):
+        """Test the bulk export endpoint"""
+        mock_export_time_slots.return_value = iter([b"id,date\n"]), None, 200
+        response = self.client.get('/bookings/export?format=csv')
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.mimetype, 'text/csv')
+        self.assertEqual(response.data, b"id,date\n")
+
     @patch('app.routes.create_time_slot')
     def test_post_bookings_success(self, mock_create_time_slot):
         """Test when the create_time_slot service is successful"""
@@ -47,14 +193,45 @@ class TestRoutes(unittest.TestCase):
     @patch('app.routes.create_time_slot')
     def test_post_bookings_failure(self, mock_create_time_slot):
         """Test when the create_time_slot service fails"""
-        error_json = {'error-msg': 'Invalid date format'}
+        error_json = {'error-msg': 'Overlapping booking found'}
         mock_create_time_slot.return_value = None, error_json, 400
         response = self.client.post(
-            '/bookings', data={'date': 'invalid-date', 'time': '14:30', 'duration': 30})
+            '/bookings', data={'date': '2025-02-14', 'time': '14:30', 'duration': 30})
 
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json, error_json)
 
+    @patch('app.routes.create_time_slot')
+    def test_post_bookings_json(self, mock_create_time_slot):
+        """Test that JSON bodies are accepted and coerced like form data"""
+        mock_create_time_slot.return_value = {'error-msg': ''}, None, 200
+        response = self.client.post(
+            '/bookings', json={'date': '2025-02-14', 'time': '14:30', 'duration': 30, 'capacity': 2})
+
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(mock_create_time_slot.call_args[0], ('2025-02-14', '14:30', 30, 2, None))
+
+        self.client.post('/bookings', data={'date': '2025-02-14', 'time': '14:30', 'duration': '30'})
+        self.assertEqual(mock_create_time_slot.call_args[0], ('2025-02-14', '14:30', 30, None, None))
+
+    @patch('app.routes.create_time_slot')
+    def test_post_bookings_invalid_input(self, mock_create_time_slot):
+        """Test that invalid bodies are rejected before the service is called"""
+        for kwargs in ({'data': {'date': 'invalid-date', 'time': '14:30', 'duration': 30}},
+                       {'data': {'date': '2025-02-14', 'time': '14:30'}},
+                       {'data': {'date': '2025-02-14', 'time': '2pm', 'duration': 30}},
+                       {'json': {'date': '2025-02-14', 'time': '14:30', 'duration': '30 minutes'}},
+                       {'json': {'date': '2025-02-14', 'time': '14:30', 'duration': 30.5}},
+                       {'json': {'date': '2025-02-14', 'time': '14:30', 'duration': 30, 'capacity': 0}},
+                       {'json': {'date': ['x'], 'time': '14:30', 'duration': 30}},
+                       {'json': {'date': {'year': 2025}, 'time': '14:30', 'duration': 30}},
+                       {'json': ['2025-02-14', '14:30', 30]}):
+            response = self.client.post('/bookings', **kwargs)
+            self.assertEqual(response.status_code, 400)
+            self.assertIn('error-msg', response.json)
+
+        mock_create_time_slot.assert_not_called()
+
     @patch('app.routes.delete_time_slot')
     def test_delete_bookigs_success(self, mock_delete_time_slot):
         """Test when the delete_time_slot service is successful"""
@@ -68,13 +245,17 @@ class TestRoutes(unittest.TestCase):
     @patch('app.routes.delete_time_slot')
     def test_delete_bookings_failure(self, mock_delete_time_slot):
         """Test when the delete_time_slot service fails"""
-        error_json = {'error-msg': 'Invalid date format'}
+        error_json = {'error-msg': 'Time slot not found'}
         mock_delete_time_slot.return_value = None, error_json, 400
-        response = self.client.delete('/bookings', data={'id': 'invalid-id'})
+        response = self.client.delete('/bookings', data={'id': 1})
 
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json, error_json)
 
+        response = self.client.delete('/bookings', data={'id': 'invalid-id'})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(mock_delete_time_slot.call_count, 1)
+
     @patch('app.routes.book_time_slot')
     def test_put_bookings_success(self, mock_book_time_slot):
         """Test when the book_time_slot service is successful"""
@@ -88,10 +269,15 @@ class TestRoutes(unittest.TestCase):
     @patch('app.routes.book_time_slot')
     def test_put_bookings_failure(self, mock_book_time_slot):
         """Test when the book_time_slot service fails"""
-        error_json = {'error-msg': 'Invalid date format'}
+        error_json = {'error-msg': 'Time slot not found'}
         mock_book_time_slot.return_value = None, error_json, 400
         response = self.client.put(
-            '/bookings', data={'id': 'invalid-id', 'available': 0})
+            '/bookings', json={'id': 1, 'available': 0})
 
         self.assertEqual(response.status_code, 400)
         self.assertEqual(response.json, error_json)
+        self.assertEqual(mock_book_time_slot.call_args[0], (1, 0, None, None))
+
+        response = self.client.put('/bookings', data={'id': 'invalid-id', 'available': 0})
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(mock_book_time_slot.call_count, 1)
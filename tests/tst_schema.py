@@ -0,0 +1,42 @@
+import unittest
+
+from flask_restx import Model, fields
+
+from app.schema import ModelValidator
+
+
+class TestModelValidator(unittest.TestCase):
+    """Test for ModelValidator class"""
+
+    validate = ModelValidator(Model('Test', {
+        'date': fields.Date(required=True),
+        'time': fields.String(pattern=r"[0-9]{2}:[0-9]{2}"),
+        'count': fields.Integer(min=1, max=10),
+        'name': fields.String()
+    }))
+
+    def test_coercion(self):
+        """Test that form strings and JSON values are coerced alike"""
+        expected = {'date': '2025-02-14', 'time': '09:00', 'count': 3, 'name': None}
+        self.assertEqual(self.validate({'date': '2025-02-14', 'time': '09:00', 'count': '3'}), ('', expected))
+        self.assertEqual(self.validate({'date': '2025-02-14', 'time': '09:00', 'count': 3, 'other': 1}),
+                         ('', expected))
+
+    def test_invalid_values(self):
+        """Test that missing required fields and invalid values are reported"""
+        self.assertEqual(self.validate({}), ("Missing field 'date'", None))
+        for data in ({'date': '2025-02-30'}, {'date': 20250214}, {'date': '2025-02-14', 'time': '9:00'},
+                     {'date': '2025-02-14', 'count': '3.5'}, {'date': '2025-02-14', 'count': True},
+                     {'date': '2025-02-14', 'count': 11}, {'date': '2025-02-14', 'name': 1}):
+            err, values = self.validate(data)
+            self.assertTrue(err.startswith("Invalid field"), data)
+            self.assertIsNone(values)
+
+    def test_unsupported_field(self):
+        """Test that models with fields which cannot be checked are refused"""
+        with self.assertRaises(TypeError):
+            ModelValidator(Model('Nested', {'items': fields.List(fields.String)}))
+
+
+if __name__ == '__main__':
+    unittest.main()
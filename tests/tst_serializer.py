@@ -0,0 +1,51 @@
+import json
+import unittest
+from unittest.mock import patch
+
+from app import serializer
+from app.models import TimeSlot
+from app.serializer import dumps, encode_slot, encode_slots, iter_encode_slots
+
+
+class TestSerializer(unittest.TestCase):
+    """Test for serializer module"""
+
+    def test_encode_slots(self):
+        """Test encoding slots matches the stdlib json output"""
+        slots = [TimeSlot(1, '2025-02-14', '14:30', 30, 1),
+                 TimeSlot(2, '2025-02-14', '15:00', 45, 0)]
+        self.assertEqual(json.loads(encode_slots(slots)),
+                         {"count": 2, "slots": [slot._asdict() for slot in slots]})
+
+    def test_encode_slots_empty(self):
+        """Test encoding an empty listing"""
+        self.assertEqual(json.loads(encode_slots([])), {"count": 0, "slots": []})
+
+    def test_encode_slot_escapes_strings(self):
+        """Test that string columns are escaped"""
+        slot = TimeSlot(1, 'a"b', 'c\\d', 30, 1)
+        self.assertEqual(json.loads(encode_slot(slot))["date"], 'a"b')
+        self.assertEqual(json.loads(encode_slot(slot))["time"], 'c\\d')
+
+    def test_encode_slot_null_column(self):
+        """Test that NULL columns fall back to the generic encoder"""
+        slot = TimeSlot(1, '2025-02-14', '14:30', 30, None)
+        self.assertIsNone(json.loads(encode_slot(slot))["available"])
+
+    def test_iter_encode_slots(self):
+        """Test the incremental encoding of batches"""
+        batches = [[TimeSlot(1, '2025-02-14', '14:30', 30, 1), TimeSlot(2, '2025-02-14', '15:00', 30, 1)],
+                   [TimeSlot(3, '2025-02-14', '15:30', 30, 0)]]
+        body = json.loads(b"".join(iter_encode_slots(iter(batches))))
+        self.assertEqual(body["count"], 3)
+        self.assertEqual([slot["id"] for slot in body["slots"]], [1, 2, 3])
+        self.assertEqual(json.loads(b"".join(iter_encode_slots(iter([])))), {"count": 0, "slots": []})
+
+    def test_dumps_without_orjson(self):
+        """Test the stdlib fallback of dumps"""
+        with patch.object(serializer, "orjson", None):
+            self.assertEqual(dumps({"a": 1}), b'{"a":1}')
+
+
+if __name__ == '__main__':
+    unittest.main()
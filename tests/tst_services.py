@@ -1,18 +1,24 @@
+import io
+import os
+import sqlite3
+import tempfile
 import unittest
 from unittest.mock import patch
 
 from app.database import Database
+from app.occupancy import OccupancyIndex
 from app.services import (create_time_slot, get_time_slots,
                           validate_create_time_slot_input,
                           validate_get_timeslot_input,
-                          check_for_overlaps,
                           delete_time_slot,
                           validate_delete_time_slot_input,
                           book_time_slot,
                           validate_book_time_slot_input,
-                          time_slot_exists)
+                          stream_time_slots,
+                          find_free_windows)
 from app.statuscodes import (DATABASE_ERROR, DATABASE_SUCCESS,
                              VALIDATION_ERROR, VALIDATION_SUCCESS)
+from app.storage import time_slot_exists
 
 
 class TestServices(unittest.TestCase):
@@ -52,6 +58,98 @@ class TestServices(unittest.TestCase):
         self.assertEqual(status, 200)
         self.assertIsNone(error)
 
+    @patch.object(Database, "execute_query")
+    def test_get_time_slots_range(self, mock_execute_query):
+        """Test when a date range is requested"""
+        mock_execute_query.return_value = (DATABASE_SUCCESS, "", [])
+        result, error, status = get_time_slots("2025-02-14", "2025-02-20")
+        self.assertEqual(result, {"count": 0, "slots": []})
+        self.assertEqual(status, 200)
+        self.assertIsNone(error)
+        self.assertIn("BETWEEN", mock_execute_query.call_args[0][0])
+        self.assertEqual(mock_execute_query.call_args[0][1], ("2025-02-14", "2025-02-20"))
+
+    def test_validate_get_timeslot_input_invalid_end_date(self):
+        """Test when the end date is invalid or before the date"""
+        ret, error = validate_get_timeslot_input("2025-02-14", "2025-02-30")
+        self.assertEqual(ret, VALIDATION_ERROR)
+        self.assertIn("end date", error)
+        ret, error = validate_get_timeslot_input("2025-02-14", "2025-02-13")
+        self.assertEqual(ret, VALIDATION_ERROR)
+        self.assertEqual(error, "The end date must not be before the date")
+
+    def test_stream_time_slots_not_valid_input(self):
+        """Test when an invalid date is streamed"""
+        batches, error, status = stream_time_slots("invalid")
+        self.assertIsNone(batches)
+        self.assertEqual(status, 400)
+        self.assertIn("error-msg", error)
+
+    @patch.object(Database, "stream_query")
+    def test_stream_time_slots_database_error(self, mock_stream_query):
+        """Test when database error occurs for stream_time_slots"""
+        mock_stream_query.return_value = (DATABASE_ERROR, "Mock error", iter(()))
+        batches, error, status = stream_time_slots("2025-02-14")
+        self.assertIsNone(batches)
+        self.assertEqual(status, 500)
+        self.assertEqual(
+            error, {"error-msg": "Error during database operation; error: Mock error"})
+
+    @patch.object(Database, "stream_query")
+    def test_stream_time_slots_success(self, mock_stream_query):
+        """Test when stream_time_slots returns the batches"""
+        rows = [[(1, '2025-02-14', '14:30', 30, 1)]]
+        mock_stream_query.return_value = (DATABASE_SUCCESS, "", iter(rows))
+        batches, error, status = stream_time_slots("2025-02-14", batch_size=10)
+        self.assertEqual(list(batches), rows)
+        self.assertEqual(status, 200)
+        self.assertIsNone(error)
+        self.assertEqual(mock_stream_query.call_args[0][2], 10)
+
+    @patch.object(Database, "execute_query")
+    def test_find_free_windows_success(self, mock_execute_query):
+        """Test finding free windows over two dates"""
+        mock_execute_query.return_value = (
+            DATABASE_SUCCESS, "", [(1, "2025-02-14", "09:00", 60, 1), (2, "2025-02-14", "10:30", 30, 1)])
+        result, error, status = find_free_windows("2025-02-14", "2025-02-15", "09:00", "12:00", 45, 15)
+        self.assertIsNone(error)
+        self.assertEqual(status, 200)
+        self.assertEqual(result, {"count": 2, "windows": [
+            {"date": "2025-02-14", "start": "11:00", "end": "12:00", "start_times": ["11:00", "11:15"]},
+            {"date": "2025-02-15", "start": "09:00", "end": "12:00",
+             "start_times": [f"{hour:02d}:{minute:02d}" for hour in (9, 10) for minute in (0, 15, 30, 45)]
+             + ["11:00", "11:15"]}]})
+        self.assertEqual(mock_execute_query.call_args[0][1], ("2025-02-07", "2025-02-15"))
+
+    @patch.object(Database, "execute_query")
+    def test_find_free_windows_across_midnight(self, mock_execute_query):
+        """Test that slots running past midnight are busy on the next date"""
+        mock_execute_query.return_value = (DATABASE_SUCCESS, "", [(1, "2025-02-14", "23:30", 630, 1)])
+        result, _, _ = find_free_windows("2025-02-14", "2025-02-15", "09:00", "12:00", 60)
+        self.assertEqual(result["windows"], [{"date": "2025-02-14", "start": "09:00", "end": "12:00"},
+                                             {"date": "2025-02-15", "start": "10:00", "end": "12:00"}])
+
+    @patch.object(Database, "execute_query")
+    def test_find_free_windows_database_error(self, mock_execute_query):
+        """Test when database error occurs for find_free_windows"""
+        mock_execute_query.return_value = (DATABASE_ERROR, "Mock error", [])
+        result, error, status = find_free_windows("2025-02-14", None, None, None, 45)
+        self.assertIsNone(result)
+        self.assertEqual(status, 500)
+        self.assertEqual(
+            error, {"error-msg": "Error during database operation; error: Mock error"})
+
+    def test_find_free_windows_invalid_input(self):
+        """Test the validation of find_free_windows"""
+        for args in ((None, None, None, None, 45), ("2025-02-14", None, None, None, None),
+                     ("2025-02-14", "2026-03-14", None, None, 45), ("2025-02-14", None, "9", None, 45),
+                     ("2025-02-14", None, "12:00", "09:00", 45), ("2025-02-14", None, None, None, 0),
+                     ("2025-02-14", None, None, None, 45, "abc")):
+            result, error, status = find_free_windows(*args)
+            self.assertIsNone(result)
+            self.assertEqual(status, 400, args)
+            self.assertIn("error-msg", error)
+
     def test_validate_get_timeslot_input_empty_date(self):
         """Test when the date is empty for get_time_slots"""
         ret, error = validate_get_timeslot_input(None)
@@ -81,60 +179,113 @@ class TestServices(unittest.TestCase):
         self.assertEqual(error, {"error-msg": "Mock error"})
 
     @patch("app.services.validate_create_time_slot_input")
-    @patch.object(Database, "execute_query")
-    def test_create_time_slot_execute_query_error(self, mock_execute_query, mock_validator):
+    @patch.object(Database, "execute_transaction")
+    def test_create_time_slot_database_error(self, mock_execute_transaction, mock_validator):
         """Test when database error occurs for create_time_slot"""
         mock_validator.return_value = (VALIDATION_SUCCESS, "")
-        mock_execute_query.return_value = (DATABASE_ERROR, "Mock error", [])
+        mock_execute_transaction.return_value = (DATABASE_ERROR, "Mock error", None)
         result, error, status = create_time_slot("2025-02-14", "14:30", 30)
         self.assertIsNone(result)
         self.assertEqual(status, 500)
         self.assertEqual(
-            error, {"error-msg": "Error during database operation; error: Mock error"})
+            error, {"error-msg": "Error inserting data to the database; error: Mock error"})
 
     @patch("app.services.validate_create_time_slot_input")
-    @patch.object(Database, "execute_query")
-    @patch("app.services.check_for_overlaps")
-    def test_create_time_slot_overlap(self, mock_overlap, mock_execute_query, mock_validator):
+    @patch.object(Database, "execute_transaction")
+    def test_create_time_slot_overlap(self, mock_execute_transaction, mock_validator):
         """Test when overlapping booking is found for create_time_slot"""
         mock_validator.return_value = (VALIDATION_SUCCESS, "")
-        mock_execute_query.return_value = (
-            DATABASE_SUCCESS, "", [("14:30", 30)])
-        mock_overlap.return_value = True
+        mock_execute_transaction.return_value = (DATABASE_SUCCESS, "",
+                                                 (None, {"error-msg": "Overlapping booking found"}, 400))
         result, error, status = create_time_slot("2025-02-14", "14:30", 30)
         self.assertIsNone(result)
         self.assertEqual(status, 400)
         self.assertEqual(error, {"error-msg": "Overlapping booking found"})
 
     @patch("app.services.validate_create_time_slot_input")
-    @patch.object(Database, "execute_query")
-    @patch.object(Database, "execute_update")
-    def test_create_timeslot_execute_update_error(self, mock_execute_update, mock_execute_query, mock_validator):
-        """Test when execute_update fails for create_time_slot"""
-        mock_validator.return_value = (VALIDATION_SUCCESS, "")
-        mock_execute_query.return_value = (
-            DATABASE_SUCCESS, "", [])
-        mock_execute_update.return_value = (DATABASE_ERROR, "Mock error", [])
-        result, error, status = create_time_slot("2025-02-14", "14:30", 30)
-        self.assertIsNone(result)
-        self.assertEqual(status, 500)
-        self.assertEqual(
-            error, {"error-msg": "Error inserting data to the database; error: Mock error"})
-
-    @patch("app.services.validate_create_time_slot_input")
-    @patch.object(Database, "execute_query")
-    @patch.object(Database, "execute_update")
-    def test_create_time_slot_success(self, mock_execute_update, mock_execute_query, mock_validator):
+    @patch.object(Database, "execute_transaction")
+    def test_create_time_slot_success(self, mock_execute_transaction, mock_validator):
         """Test when create_time_slot is successful"""
         mock_validator.return_value = (VALIDATION_SUCCESS, "")
-        mock_execute_query.return_value = (
-            DATABASE_SUCCESS, "", [])
-        mock_execute_update.return_value = (DATABASE_SUCCESS, "", None)
+        mock_execute_transaction.return_value = (DATABASE_SUCCESS, "", ({"error-msg": ""}, None, 200))
         result, error, status = create_time_slot("2025-02-14", "14:30", 30)
         self.assertEqual(result, {"error-msg": ""})
         self.assertEqual(status, 200)
         self.assertIsNone(error)
 
+    def test_create_and_delete_time_slot_database(self):
+        """Test creating and deleting time slots keeps the occupancy index in sync"""
+        with tempfile.TemporaryDirectory() as directory, \
+                patch("app.services.db", Database(os.path.join(directory, "test.sqlite"))), \
+                patch("app.services.occupancy", OccupancyIndex()):
+            self.assertEqual(create_time_slot("2025-02-14", "14:30", 30)[2], 200)
+            self.assertEqual(create_time_slot("2025-02-14", "14:45", 30)[2], 400)
+            self.assertEqual(create_time_slot("2025-02-14", "15:00", 30)[2], 200)
+            self.assertEqual(delete_time_slot(1)[2], 200)
+            self.assertEqual(create_time_slot("2025-02-14", "14:45", 15)[2], 200)
+            self.assertEqual(delete_time_slot(1)[2], 400)
+
+    def test_get_time_slots_unpadded_dates(self):
+        """Test that dates without zero padding select the stored zero-padded dates"""
+        with tempfile.TemporaryDirectory() as directory, \
+                patch("app.services.db", Database(os.path.join(directory, "test.sqlite"))), \
+                patch("app.services.occupancy", OccupancyIndex()):
+            create_time_slot("2030-02-05", "10:00", 60)
+            create_time_slot("2030-02-05", "09:00", 60)
+            self.assertEqual(get_time_slots("2030-2-1", "2030-2-28")[0]["count"], 2)
+            self.assertEqual([slot["time"] for slot in get_time_slots("2030-2-5")[0]["slots"]], ["09:00", "10:00"])
+
+    def test_create_time_slot_across_midnight(self):
+        """Test that slots running past midnight or over several days overlap the slots of the next dates"""
+        with tempfile.TemporaryDirectory() as directory, \
+                patch("app.services.db", Database(os.path.join(directory, "test.sqlite"))), \
+                patch("app.services.occupancy", OccupancyIndex()):
+            self.assertEqual(create_time_slot("2025-02-14", "23:30", 90)[2], 200)
+            self.assertEqual(create_time_slot("2025-02-15", "00:30", 30)[2], 400)
+            self.assertEqual(create_time_slot("2025-02-15", "01:00", 30)[2], 200)
+            self.assertEqual(create_time_slot("2025-02-13", "12:00", 2 * 1440)[2], 400)
+            self.assertEqual(create_time_slot("2025-02-16", "12:00", 3 * 1440)[2], 200)
+            self.assertEqual(create_time_slot("2025-02-18", "23:00", 30)[2], 400)
+            self.assertEqual(delete_time_slot(1)[2], 200)
+            self.assertEqual(create_time_slot("2025-02-15", "00:30", 30)[2], 200)
+
+    def test_create_time_slot_unpadded_input(self):
+        """Test that slots created without zero padding are stored zero-padded and found by their instants"""
+        with tempfile.TemporaryDirectory() as directory, \
+                patch("app.services.db", Database(os.path.join(directory, "test.sqlite"))) as db, \
+                patch("app.services.occupancy", OccupancyIndex()):
+            self.assertEqual(create_time_slot("2030-3-1", "23:30", 90)[2], 200)
+            self.assertEqual(db.execute_query("SELECT date, time, start_at IS NOT NULL FROM bookings")[2],
+                             [("2030-03-01", "23:30", 1)])
+            self.assertEqual(create_time_slot("2030-03-02", "0:30", 30)[2], 400)
+            self.assertEqual(delete_time_slot(1)[2], 200)
+            self.assertEqual(create_time_slot("2030-3-2", "0:30", 30)[2], 200)
+            self.assertEqual(get_time_slots("2030-03-02")[0]["slots"][0]["time"], "00:30")
+
+    def test_upgrade_older_database(self):
+        """Test that the slots and bitmaps of a database without the absolute instants are upgraded"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "test.sqlite")
+            with sqlite3.connect(path) as connection:
+                connection.executescript("""
+                    CREATE TABLE bookings (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL,
+                        time TEXT NOT NULL, duration INTEGER NOT NULL, available INTEGER DEFAULT 1,
+                        capacity INTEGER NOT NULL DEFAULT 1);
+                    CREATE TABLE occupancy (date TEXT PRIMARY KEY, bitmap BLOB NOT NULL) WITHOUT ROWID;
+                    INSERT INTO bookings (date, time, duration) VALUES ('2030-3-1', '23:30', 90);
+                    INSERT INTO bookings (date, time, duration) VALUES ('2030-03-04', 'noon', 30);
+                    INSERT INTO occupancy (date, bitmap) VALUES ('2030-03-02', x'');
+                """)
+            connection.close()
+
+            with patch("app.services.db", Database(path)) as db, patch("app.services.occupancy", OccupancyIndex()), \
+                    patch("sys.stderr", new_callable=io.StringIO) as stderr:
+                self.assertEqual(create_time_slot("2030-03-02", "00:30", 30)[2], 400)
+                self.assertEqual(get_time_slots("2030-03-01")[0]["count"], 1)
+                self.assertEqual(db.execute_query("SELECT date, total FROM day_summary")[2],
+                                 [("2030-03-01", 1), ("2030-03-04", 1)])
+            self.assertIn("unreadable date or time, left as they are: 2", stderr.getvalue())
+
     def test_validate_create_time_slot_input_missing_date(self):
         """Test when date is missing for validate_create_time_slot_input"""
         ret, error = validate_create_time_slot_input(None, "14:30", 30)
@@ -173,6 +324,11 @@ class TestServices(unittest.TestCase):
         self.assertEqual(ret, VALIDATION_ERROR)
         self.assertEqual(error, "Invalid input to create a new time slot")
 
+        for duration in (0, -30, 7 * 1440 + 1):
+            ret, error = validate_create_time_slot_input("2025-02-14", "14:30", duration)
+            self.assertEqual(ret, VALIDATION_ERROR)
+            self.assertEqual(error, "Invalid duration; it must be between 1 and 10080 minutes")
+
     def test_validate_create_time_slot_success(self):
         """Test when input is valid for validate_create_time_slot_input"""
         ret, error = validate_create_time_slot_input(
@@ -180,18 +336,6 @@ class TestServices(unittest.TestCase):
         self.assertEqual(ret, VALIDATION_SUCCESS)
         self.assertEqual(error, "")
 
-    def test_check_for_overlaps_overlap(self):
-        """Test when overlapping booking is found"""
-        bookings = [("14:30", 30)]
-        ret = check_for_overlaps(bookings, "2025-02-14", "14:30", 30)
-        self.assertTrue(ret)
-
-    def test_check_for_overlaps_no_overlap(self):
-        """Test when no overlapping booking is found"""
-        bookings = [("15:00", 30)]
-        ret = check_for_overlaps(bookings, "2025-02-14", "14:30", 30)
-        self.assertFalse(ret)
-
     @patch("app.services.validate_delete_time_slot_input")
     def test_delete_time_slot_invalid_input(self, mock_validator):
         """Test when invalid input is provided for delete_time_slot"""
@@ -202,7 +346,7 @@ class TestServices(unittest.TestCase):
         self.assertEqual(error, {"error-msg": "Mock error"})
 
     @patch("app.services.validate_delete_time_slot_input")
-    @patch("app.services.time_slot_exists")
+    @patch("app.storage.time_slot_exists")
     def test_delete_time_slot_database_error(self, mock_exists, mock_validator):
         """Test when database error occurs for delete_time_slot"""
         mock_validator.return_value = (VALIDATION_SUCCESS, "")
@@ -214,7 +358,7 @@ class TestServices(unittest.TestCase):
             error, {"error-msg": "Error during database operation; error: Mock error"})
 
     @patch("app.services.validate_delete_time_slot_input")
-    @patch("app.services.time_slot_exists")
+    @patch("app.storage.time_slot_exists")
     def test_delete_time_slot_not_exists(self, mock_exists, mock_validator):
         """Test when time slot does not exist for delete_time_slot"""
         mock_validator.return_value = (VALIDATION_SUCCESS, "")
@@ -226,13 +370,13 @@ class TestServices(unittest.TestCase):
             error, {"error-msg": "Time slot not found; err: {err}"})
 
     @patch("app.services.validate_delete_time_slot_input")
-    @patch("app.services.time_slot_exists")
-    @patch.object(Database, "execute_update")
-    def test_delete_time_slot_execute_update_error(self, mock_execute_update, mock_exists, mock_validator):
+    @patch("app.storage.time_slot_exists")
+    @patch.object(Database, "execute_transaction")
+    def test_delete_time_slot_execute_transaction_error(self, mock_execute_transaction, mock_exists, mock_validator):
         """Test when database error occurs for delete_time_slot"""
         mock_validator.return_value = (VALIDATION_SUCCESS, "")
         mock_exists.return_value = (DATABASE_SUCCESS, "", True)
-        mock_execute_update.return_value = (DATABASE_ERROR, "Mock error", [])
+        mock_execute_transaction.return_value = (DATABASE_ERROR, "Mock error", None)
         result, error, status = delete_time_slot(1)
         self.assertIsNone(result)
         self.assertEqual(status, 500)
@@ -240,13 +384,13 @@ class TestServices(unittest.TestCase):
             error, {"error-msg": "Error during database operation; error: Mock error"})
 
     @patch("app.services.validate_delete_time_slot_input")
-    @patch("app.services.time_slot_exists")
-    @patch.object(Database, "execute_update")
-    def test_delete_time_slot_success(self, mock_execute_update, mock_exists, mock_validator):
+    @patch("app.storage.time_slot_exists")
+    @patch.object(Database, "execute_transaction")
+    def test_delete_time_slot_success(self, mock_execute_transaction, mock_exists, mock_validator):
         """Test when delete_time_slot is successful"""
         mock_validator.return_value = (VALIDATION_SUCCESS, "")
         mock_exists.return_value = (DATABASE_SUCCESS, "", True)
-        mock_execute_update.return_value = (DATABASE_SUCCESS, "", None)
+        mock_execute_transaction.return_value = (DATABASE_SUCCESS, "", "2025-02-14")
         result, error, status = delete_time_slot(1)
         self.assertEqual(result, {"error-msg": ""})
         self.assertEqual(status, 200)
@@ -280,7 +424,7 @@ class TestServices(unittest.TestCase):
         self.assertEqual(error, {"error-msg": "Mock error"})
 
     @patch("app.services.validate_book_time_slot_input")
-    @patch("app.services.time_slot_exists")
+    @patch("app.storage.time_slot_exists")
     def test_book_time_slot_database_error(self, mock_exists, mock_validator):
         """Test when database error occurs for book_time_slot"""
         mock_validator.return_value = (VALIDATION_SUCCESS, "")
@@ -292,7 +436,7 @@ class TestServices(unittest.TestCase):
             error, {"error-msg": "Error during database operation; error: Mock error"})
 
     @patch("app.services.validate_book_time_slot_input")
-    @patch("app.services.time_slot_exists")
+    @patch("app.storage.time_slot_exists")
     def test_book_time_slot_not_exists(self, mock_exists, mock_validator):
         """Test when time slot does not exist for book_time_slot"""
         mock_validator.return_value = (VALIDATION_SUCCESS, "")
@@ -304,13 +448,13 @@ class TestServices(unittest.TestCase):
             error, {"error-msg": "Time slot not found"})
 
     @patch("app.services.validate_book_time_slot_input")
-    @patch("app.services.time_slot_exists")
-    @patch.object(Database, "execute_update")
-    def test_book_time_slot_execute_update_error(self, mock_execute_update, mock_exists, mock_validator):
+    @patch("app.storage.time_slot_exists")
+    @patch.object(Database, "execute_transaction")
+    def test_book_time_slot_execute_transaction_error(self, mock_execute_transaction, mock_exists, mock_validator):
         """Test when database error occurs for book_time_slot"""
         mock_validator.return_value = (VALIDATION_SUCCESS, "")
         mock_exists.return_value = (DATABASE_SUCCESS, "", True)
-        mock_execute_update.return_value = (DATABASE_ERROR, "Mock error", [])
+        mock_execute_transaction.return_value = (DATABASE_ERROR, "Mock error", None)
         result, error, status = book_time_slot(1, 1)
         self.assertIsNone(result)
         self.assertEqual(status, 400)
@@ -318,13 +462,27 @@ class TestServices(unittest.TestCase):
             error, {"error-msg": "Error during database operation; error: Mock error"})
 
     @patch("app.services.validate_book_time_slot_input")
-    @patch("app.services.time_slot_exists")
-    @patch.object(Database, "execute_update")
-    def test_book_time_slot_success(self, mock_execute_update, mock_exists, mock_validator):
+    @patch("app.storage.time_slot_exists")
+    @patch.object(Database, "execute_transaction")
+    def test_book_time_slot_held(self, mock_execute_transaction, mock_exists, mock_validator):
+        """Test when another client holds the slot for book_time_slot"""
+        mock_validator.return_value = (VALIDATION_SUCCESS, "")
+        mock_exists.return_value = (DATABASE_SUCCESS, "", True)
+        mock_execute_transaction.return_value = (DATABASE_SUCCESS, "",
+                                                 (None, {"error-msg": "Time slot is held by another client"}, 409))
+        result, error, status = book_time_slot(1, 0)
+        self.assertIsNone(result)
+        self.assertEqual(status, 409)
+        self.assertEqual(error, {"error-msg": "Time slot is held by another client"})
+
+    @patch("app.services.validate_book_time_slot_input")
+    @patch("app.storage.time_slot_exists")
+    @patch.object(Database, "execute_transaction")
+    def test_book_time_slot_success(self, mock_execute_transaction, mock_exists, mock_validator):
         """Test when book_time_slot is successful"""
         mock_validator.return_value = (VALIDATION_SUCCESS, "")
         mock_exists.return_value = (DATABASE_SUCCESS, "", True)
-        mock_execute_update.return_value = (DATABASE_SUCCESS, "", None)
+        mock_execute_transaction.return_value = (DATABASE_SUCCESS, "", ({"error-msg": ""}, None, 200))
         result, error, status = book_time_slot(1, 1)
         self.assertEqual(result, {"error-msg": ""})
         self.assertEqual(status, 200)
@@ -0,0 +1,116 @@
+import threading
+import time
+import unittest
+from unittest.mock import patch
+
+from app.database import Database
+from app.services import get_time_slots
+from app.singleflight import SingleFlight
+from app.statuscodes import DATABASE_ERROR, DATABASE_SUCCESS
+
+
+class TestSingleFlight(unittest.TestCase):
+    """Test for SingleFlight class"""
+
+    def _run_concurrently(self, flight, function, count, **kwargs):
+        """Call flight.do from count threads while the first call is blocked"""
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(flight.do("key", function, **kwargs)))
+                   for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads, results
+
+    def test_concurrent_calls_share_one_call(self):
+        """Test that callers arriving during a call get its result"""
+        flight = SingleFlight()
+        release = threading.Event()
+        calls = []
+
+        def function():
+            calls.append(1)
+            release.wait(1)
+            return len(calls)
+
+        threads, results = self._run_concurrently(flight, function, 5, timeout=1)
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual(results, [1] * 5)
+        self.assertEqual(flight.in_flight(), 0)
+
+    def test_fall_through_after_failure(self):
+        """Test that waiters run their own call when the shared one raises"""
+        flight = SingleFlight()
+        release = threading.Event()
+        errors = []
+
+        def failing():
+            release.wait(1)
+            raise RuntimeError("failed")
+
+        def leader():
+            try:
+                flight.do("key", failing, timeout=1)
+            except RuntimeError as e:
+                errors.append(e)
+
+        leader_thread = threading.Thread(target=leader)
+        leader_thread.start()
+        while flight.in_flight() == 0:
+            pass
+        threads, results = self._run_concurrently(flight, lambda: "ok", 1, timeout=1)
+        release.set()
+        leader_thread.join()
+        threads[0].join()
+
+        self.assertEqual(len(errors), 1)
+        self.assertEqual(results, ["ok"])
+
+    def test_unsuccessful_result_and_timeout(self):
+        """Test that unsuccessful results are not shared and that waits are bounded"""
+        flight = SingleFlight()
+        self.assertEqual(flight.do("key", lambda: "error", 1, lambda result: result != "error"), "error")
+
+        release = threading.Event()
+        threads, results = self._run_concurrently(flight, lambda: release.wait(1) and "slow", 1, timeout=1)
+        while flight.in_flight() == 0:
+            pass
+        self.assertEqual(flight.do("key", lambda: "own", timeout=0.01), "own")
+        release.set()
+        threads[0].join()
+        self.assertEqual(results, ["slow"])
+
+    @patch.object(Database, "execute_query")
+    def test_get_time_slots_coalesced(self, mock_execute_query):
+        """Test that concurrent identical listings run one query and errors fall through"""
+        release = threading.Event()
+
+        def execute_query(query, params):
+            release.wait(1)
+            return DATABASE_SUCCESS, "", [(1, "2025-02-14", "09:00", 30, 1)]
+
+        mock_execute_query.side_effect = execute_query
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(get_time_slots("2025-02-14")))
+                   for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        time.sleep(0.1)
+        release.set()
+        for thread in threads:
+            thread.join()
+
+        self.assertEqual([status for _, _, status in results], [200] * 4)
+        self.assertEqual(mock_execute_query.call_count, 1)
+        self.assertEqual(results[0][0]["count"], 1)
+
+        mock_execute_query.side_effect = None
+        mock_execute_query.return_value = DATABASE_ERROR, "Mock error", None
+        self.assertEqual(get_time_slots("2025-02-14")[2], 500)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,152 @@
+import os
+import tempfile
+import time
+import unittest
+from unittest.mock import patch
+
+from app import services
+from app.database import Database
+from app.occupancy import OccupancyIndex
+from app.services import create_time_slot, get_time_slots
+from app.snapshot import SnapshotReader, SnapshotWriter, write_snapshot
+from app.statuscodes import SUCCESS
+
+
+class TestSnapshot(unittest.TestCase):
+    """Test for snapshot module"""
+
+    def setUp(self):
+        """Use a temporary database and snapshot file for every test"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db = Database(os.path.join(self.directory.name, "test.sqlite"))
+        self.path = os.path.join(self.directory.name, "slots.snapshot")
+        for patcher in (patch("app.services.db", self.db), patch("app.services.occupancy", OccupancyIndex())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_write_and_read(self):
+        """Test that the snapshot lists the slots of the days it covers like the database"""
+        create_time_slot("2025-02-14", "10:00", 30)
+        create_time_slot("2025-02-14", "09:00", 60, 3)
+        create_time_slot("2025-02-16", "08:00", 15)
+        create_time_slot("2025-02-20", "08:00", 15)
+
+        self.assertEqual(write_snapshot(self.db, self.path, 5, "2025-02-13"), (SUCCESS, "", 1))
+        reader = SnapshotReader(self.path)
+        self.assertEqual(reader.version, 1)
+        for booking_date, end_date in (("2025-02-14", None), ("2025-02-13", "2025-02-17"), ("2025-02-15", None)):
+            self.assertEqual(reader.list_slots(booking_date, end_date),
+                             services.slot_store().list_slots(booking_date, end_date)[2])
+        self.assertIsNone(reader.list_slots("2025-02-12"))
+        self.assertIsNone(reader.list_slots("2025-02-14", "2025-02-20"))
+
+    def test_unfit_row(self):
+        """Test that the days from a row which does not fit a record on are left to the database"""
+        create_time_slot("2025-02-14", "09:00", 30)
+        create_time_slot("2025-02-16", "09:00", 30)
+        self.db.execute_update("INSERT INTO bookings (date, time, duration, available) VALUES (?, ?, ?, ?)",
+                               ("2025-02-15", "10:00", -30, 1))
+
+        self.assertEqual(write_snapshot(self.db, self.path, 3, "2025-02-14"), (SUCCESS, "", 1))
+        reader = SnapshotReader(self.path)
+        self.assertEqual(len(reader.list_slots("2025-02-14")), 1)
+        self.assertIsNone(reader.list_slots("2025-02-15"))
+        self.assertIsNone(reader.list_slots("2025-02-16"))
+
+        self.db.execute_update("UPDATE bookings SET duration = 30, time = 'x' WHERE date = '2025-02-15'")
+        self.assertEqual(write_snapshot(self.db, self.path, 3, "2025-02-14")[0], SUCCESS)
+        self.assertIsNone(reader.list_slots("2025-02-14", "2025-02-15"))
+
+        self.db.execute_update("UPDATE bookings SET time = '10:00' WHERE date = '2025-02-15'")
+        self.assertEqual(write_snapshot(self.db, self.path, 3, "2025-02-14")[0], SUCCESS)
+        self.assertEqual(len(reader.list_slots("2025-02-14", "2025-02-16")), 3)
+
+    def test_swap(self):
+        """Test that a reader maps the new version once the file is replaced"""
+        create_time_slot("2025-02-14", "09:00", 30)
+        write_snapshot(self.db, self.path, 1, "2025-02-14")
+        reader = SnapshotReader(self.path)
+        self.assertEqual(len(reader.list_slots("2025-02-14")), 1)
+
+        create_time_slot("2025-02-14", "10:00", 30)
+        self.assertEqual(write_snapshot(self.db, self.path, 1, "2025-02-14")[2], 2)
+        self.assertEqual([slot.time for slot in reader.list_slots("2025-02-14")], ["09:00", "10:00"])
+        self.assertEqual(reader.version, 2)
+
+    def test_invalid_file(self):
+        """Test that missing and invalid files are left to the database"""
+        reader = SnapshotReader(self.path)
+        self.assertIsNone(reader.list_slots("2025-02-14"))
+        for content in (b"", b"not a snapshot" * 10):
+            with open(self.path, "wb") as file:
+                file.write(content)
+            self.assertIsNone(reader.list_slots("2025-02-14"))
+            self.assertEqual(reader.version, 0)
+
+    def test_get_time_slots(self):
+        """Test that the listings come from the snapshot when one is selected"""
+        create_time_slot("2025-02-14", "09:00", 30)
+        write_snapshot(self.db, self.path, 1, "2025-02-14")
+        # Written by another process, which this one only sees in the next snapshot
+        Database(self.db.db_path).execute_update(
+            "INSERT INTO bookings (date, time, duration) VALUES ('2025-02-14', '10:00', 30)")
+        services.select_snapshot(self.path)
+        self.addCleanup(services.select_snapshot, "")
+
+        self.assertEqual(get_time_slots("2025-02-14")[0]["count"], 1)
+        self.assertEqual(get_time_slots("2025-02-14", "2025-02-15")[0]["count"], 2)
+
+    def test_get_time_slots_after_write(self):
+        """Test that a process reads its own writes until the snapshot has them"""
+        write_snapshot(self.db, self.path, 1, "2025-02-14")
+        services.select_snapshot(self.path)
+        self.addCleanup(services.select_snapshot, "")
+
+        create_time_slot("2025-02-14", "09:00", 30)
+        self.assertEqual(get_time_slots("2025-02-14")[0]["count"], 1)
+        with patch.object(services.snapshot, "list_slots", wraps=services.snapshot.list_slots) as list_slots:
+            write_snapshot(self.db, self.path, 1, "2025-02-14")
+            self.assertEqual(get_time_slots("2025-02-14")[0]["count"], 1)
+            self.assertEqual(list_slots.call_count, 1)
+        self.assertEqual(len(services.snapshot.list_slots("2025-02-14", changed_at=self.db.last_commit)), 1)
+
+    def test_writer(self):
+        """Test that the writer rewrites the snapshot after a commit"""
+        with patch("app.snapshot.clock.time", return_value=1767268800):
+            writer = SnapshotWriter(self.db, self.path, 1, 0.01)
+            writer.start()
+            self.addCleanup(writer.join, 1)
+            self.addCleanup(writer.stop)
+            reader = SnapshotReader(self.path)
+            for _ in range(100):
+                if reader.version:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(reader.list_slots("2026-01-01"), [])
+
+            create_time_slot("2026-01-01", "09:00", 30)
+            for _ in range(100):
+                if reader.list_slots("2026-01-01"):
+                    break
+                time.sleep(0.01)
+            self.assertEqual(len(reader.list_slots("2026-01-01")), 1)
+
+    def test_writer_survives_error(self):
+        """Test that the writer keeps running after a failed write"""
+        with patch("app.snapshot.write_snapshot", side_effect=[RuntimeError("Mock error"), (SUCCESS, "", 1)]) \
+                as mock_write:
+            writer = SnapshotWriter(self.db, self.path, 1, 0.01)
+            writer.start()
+            self.addCleanup(writer.join, 1)
+            self.addCleanup(writer.stop)
+            for _ in range(100):
+                if mock_write.call_count == 2:
+                    break
+                time.sleep(0.01)
+            self.assertEqual(mock_write.call_count, 2)
+            self.assertTrue(writer.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,143 @@
+import unittest
+
+from app import create_app, services
+from app.idempotency import make_idempotency
+from app.services import book_time_slot, create_time_slot, delete_time_slot, find_free_windows, get_time_slots
+from app.storage import MemorySlotStore
+from app.statuscodes import SLOT_SEATS_EXCEEDED, SUCCESS
+
+
+class TestMemorySlotStore(unittest.TestCase):
+    """Test for MemorySlotStore class"""
+
+    def setUp(self):
+        """Start every test with an empty store"""
+        self.store = MemorySlotStore()
+
+    def _insert(self, date, start, duration):
+        return self.store.atomic(
+            lambda transaction: self.store.insert_slot(transaction, date, f"{start // 60:02d}:{start % 60:02d}",
+                                                       start, duration))[2]
+
+    def test_overlaps(self):
+        """Test that slots overlapping their neighbours are refused"""
+        self.assertTrue(self._insert("2025-02-14", 600, 60))
+        self.assertTrue(self._insert("2025-02-14", 540, 60))
+        self.assertTrue(self._insert("2025-02-14", 660, 30))
+        for start, duration in ((570, 60), (630, 10), (500, 300), (689, 5)):
+            self.assertFalse(self._insert("2025-02-14", start, duration), (start, duration))
+        self.assertTrue(self._insert("2025-02-15", 600, 60))
+
+    def test_overlaps_across_midnight(self):
+        """Test that slots running past midnight are checked against the slots of the next dates"""
+        self.assertTrue(self._insert("2025-02-14", 1410, 90))
+        self.assertFalse(self._insert("2025-02-15", 30, 30))
+        self.assertTrue(self._insert("2025-02-15", 60, 30))
+        self.assertFalse(self._insert("2025-02-13", 720, 2 * 1440))
+        self.assertTrue(self._insert("2025-02-13", 720, 1440))
+        self.assertEqual([slot.time for slot in self.store.list_slots("2025-02-15")[2]], ["01:00"])
+
+    def test_listing(self):
+        """Test listing a date and a range, ordered by date and time"""
+        self._insert("2025-02-16", 540, 30)
+        self._insert("2025-02-14", 600, 30)
+        self._insert("2025-02-14", 540, 30)
+
+        ret, _, slots = self.store.list_slots("2025-02-14")
+        self.assertEqual(ret, SUCCESS)
+        self.assertEqual([slot.time for slot in slots], ["09:00", "10:00"])
+        _, _, slots = self.store.list_slots("2025-02-13", "2025-02-15")
+        self.assertEqual(len(slots), 2)
+        _, _, slots = self.store.list_slots("2025-02-14", "2025-02-16")
+        self.assertEqual([(slot.date, slot.time) for slot in slots],
+                         [("2025-02-14", "09:00"), ("2025-02-14", "10:00"), ("2025-02-16", "09:00")])
+        self.assertEqual(self.store.list_slots("2025-02-15")[2], [])
+
+        _, _, batches = self.store.stream_slots(batch_size=2)
+        self.assertEqual([len(batch) for batch in batches], [2, 1])
+
+    def test_set_availability(self):
+        """Test that the availability stays between 0 and the capacity"""
+        self._insert("2025-02-14", 540, 30)
+        for available in (2, -1):
+            self.assertEqual(self.store.atomic(
+                lambda transaction: self.store.set_availability(transaction, 1, available, None, 0))[2][0],
+                SLOT_SEATS_EXCEEDED)
+        self.assertEqual(self.store.atomic(lambda transaction: self.store.set_availability(transaction, 1, 0, None, 0)),
+                         (SUCCESS, "", (SUCCESS, "")))
+
+    def test_rollback(self):
+        """Test that the changes of a failing transaction are undone"""
+        self._insert("2025-02-14", 540, 30)
+
+        def failing(transaction):
+            self.store.insert_slot(transaction, "2025-02-14", "10:00", 600, 30)
+            self.store.set_availability(transaction, 1, 0, None, 0)
+            self.store.remove_slot(transaction, 1)
+            raise RuntimeError("Mock error")
+
+        with self.assertRaises(RuntimeError):
+            self.store.atomic(failing)
+        _, _, slots = self.store.list_slots("2025-02-14")
+        self.assertEqual([(slot.id, slot.available) for slot in slots], [(1, 1)])
+        self.assertTrue(self._insert("2025-02-14", 600, 30))
+
+    def test_insert_slots(self):
+        """Test that the overlapping candidates of a bulk insert are returned"""
+        candidates = [("2025-02-14", 540, 30, "09:00", 1, 1), ("2025-02-14", 550, 30, "09:10", 1, 2),
+                      ("2025-02-14", 570, 30, "09:30", 0, 3)]
+        _, _, rejected = self.store.atomic(lambda transaction: self.store.insert_slots(transaction, candidates))
+        self.assertEqual(rejected, [candidates[1]])
+        self.assertEqual([slot.available for slot in self.store.list_slots("2025-02-14")[2]], [1, 0])
+
+
+class TestMemoryStorageServices(unittest.TestCase):
+    """Test for the services with the in-memory engine"""
+
+    def setUp(self):
+        """Select the in-memory engine for every test"""
+        services.select_storage("memory")
+        self.addCleanup(services.select_storage, "sqlite")
+
+    def test_lifecycle(self):
+        """Test creating, listing, booking and deleting slots"""
+        self.assertEqual(create_time_slot("2025-02-14", "09:00", 60)[2], 200)
+        self.assertEqual(create_time_slot("2025-02-14", "09:30", 30)[2], 400)
+        self.assertEqual(book_time_slot(1, 0)[2], 200)
+        self.assertEqual(get_time_slots("2025-02-14")[0]["slots"],
+                         [{"id": 1, "date": "2025-02-14", "time": "09:00", "duration": 60, "available": 0}])
+        windows = find_free_windows("2025-02-14", None, "08:00", "11:00", 60)[0]["windows"]
+        self.assertEqual([(window["start"], window["end"]) for window in windows],
+                         [("08:00", "09:00"), ("10:00", "11:00")])
+
+        self.assertEqual(delete_time_slot(1)[2], 200)
+        self.assertEqual(delete_time_slot(1)[2], 400)
+        self.assertEqual(book_time_slot(1, 0)[2], 400)
+
+    def test_idempotency(self):
+        """Test that retried writes return the stored response"""
+        idempotency = make_idempotency("key", "POST", "/bookings", [("time", "09:00")], 60)[1]
+        self.assertEqual(create_time_slot("2025-02-14", "09:00", 30, None, idempotency)[2], 200)
+        self.assertEqual(create_time_slot("2025-02-14", "09:00", 30, None, idempotency)[2], 200)
+        self.assertEqual(get_time_slots("2025-02-14")[0]["count"], 1)
+
+        other = make_idempotency("key", "POST", "/bookings", [("time", "10:00")], 60)[1]
+        self.assertEqual(create_time_slot("2025-02-14", "10:00", 30, None, other)[2], 422)
+
+    def test_select_storage(self):
+        """Test that unknown engines are refused and SQLite-only features are not supported"""
+        with self.assertRaises(ValueError):
+            services.select_storage("redis")
+
+        result, error, status = services.reserve_seat(1)
+        self.assertIsNone(result)
+        self.assertEqual(status, 501)
+
+        create_app({"STORAGE_ENGINE": "sqlite"})
+        self.assertTrue(services.sqlite_storage())
+        create_app({"STORAGE_ENGINE": "memory"})
+        self.assertFalse(services.sqlite_storage())
+
+
+if __name__ == '__main__':
+    unittest.main()
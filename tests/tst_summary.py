@@ -0,0 +1,97 @@
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app.batch import run_batch
+from app.bulk import import_time_slots
+from app.database import Database
+from app.models import TimeSlot
+from app.occupancy import OccupancyIndex
+from app.services import (book_time_slot, cancel_reservation, create_time_slot, delete_time_slot, get_day_summaries,
+                          rebuild_day_summaries, reserve_seat)
+from app.summary import DaySummary, summarize
+
+
+class TestDaySummaries(unittest.TestCase):
+    """Test for the day summaries kept by the writes"""
+
+    def setUp(self):
+        """Use a temporary database for every test"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.path = os.path.join(self.directory.name, "test.sqlite")
+        self.db = Database(self.path)
+        occupancy = OccupancyIndex()
+        for patcher in (patch("app.services.db", self.db), patch("app.batch.db", self.db),
+                        patch("app.services.occupancy", occupancy), patch("app.batch.occupancy", occupancy)):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def _days(self, month="2025-02"):
+        result, error, status = get_day_summaries(month=month)
+        self.assertEqual(status, 200, error)
+        return [(day["date"], day["total"], day["available"], day["minutes_free"]) for day in result["days"]]
+
+    def test_writes(self):
+        """Test that creating, booking and deleting slots update the summaries"""
+        create_time_slot("2025-02-14", "09:00", 30)
+        create_time_slot("2025-02-14", "10:00", 60)
+        create_time_slot("2025-02-28", "10:00", 60)
+        self.assertEqual(self._days(), [("2025-02-14", 2, 2, 90), ("2025-02-28", 1, 1, 60)])
+
+        book_time_slot(1, 0)
+        self.assertEqual(self._days()[0], ("2025-02-14", 2, 1, 60))
+        delete_time_slot(3)
+        self.assertEqual(self._days(), [("2025-02-14", 2, 1, 60)])
+        self.assertEqual(self._days("2025-03"), [])
+
+    def test_reservations_and_batches(self):
+        """Test that seat reservations, batches and imports update the summaries"""
+        create_time_slot("2025-02-14", "09:00", 30, 1)
+        reservation = reserve_seat(1)[0]["reservation-id"]
+        self.assertEqual(self._days(), [("2025-02-14", 1, 0, 0)])
+        cancel_reservation(reservation)
+        self.assertEqual(self._days(), [("2025-02-14", 1, 1, 30)])
+
+        run_batch([{"op": "create", "date": "2025-02-15", "time": "09:00", "duration": 30},
+                   {"op": "delete", "id": 1}])
+        self.assertEqual(self._days(), [("2025-02-15", 1, 1, 30)])
+
+        import_time_slots(iter(['{"date": "2025-02-15", "time": "10:00", "duration": 15, "available": 0}\n']),
+                          "ndjson")
+        self.assertEqual(self._days(), [("2025-02-15", 2, 1, 30)])
+
+    def test_backfill_and_rebuild(self):
+        """Test that older databases are backfilled and the summaries can be rebuilt"""
+        with sqlite3.connect(self.path) as connection:
+            connection.execute("CREATE TABLE bookings (id INTEGER PRIMARY KEY AUTOINCREMENT, date TEXT NOT NULL, "
+                               "time TEXT NOT NULL, duration INTEGER NOT NULL, available INTEGER DEFAULT 1)")
+            connection.execute("INSERT INTO bookings (date, time, duration) VALUES ('2025-02-14', '09:00', 30)")
+        connection.close()
+        self.assertEqual(self._days(), [("2025-02-14", 1, 1, 30)])
+
+        self.db.execute_update("UPDATE bookings SET available = 0")
+        self.assertEqual(rebuild_day_summaries(), ({"days": 1}, None, 200))
+        self.assertEqual(self._days(), [("2025-02-14", 1, 0, 0)])
+
+    def test_invalid_input(self):
+        """Test the validation of the month and the date range"""
+        for args in ((None, None, None), (None, None, "2025-13"), (None, None, "2025-2"),
+                     ("2025-02-01", None, "2025-02"), ("2025-01-01", "2026-01-02", None)):
+            result, error, status = get_day_summaries(*args)
+            self.assertIsNone(result)
+            self.assertEqual(status, 400, args)
+
+        self.assertEqual(get_day_summaries("2025-02-14")[0], {"count": 0, "days": []})
+
+    def test_summarize(self):
+        """Test computing the summaries from slots"""
+        slots = [TimeSlot(1, "2025-02-15", "09:00", 30, 0), TimeSlot(2, "2025-02-14", "09:00", 30, 2),
+                 TimeSlot(3, "2025-02-14", "10:00", 15, 1)]
+        self.assertEqual(summarize(slots), [DaySummary("2025-02-14", 2, 2, 45), DaySummary("2025-02-15", 1, 0, 0)])
+
+
+if __name__ == '__main__':
+    unittest.main()
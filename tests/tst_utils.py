@@ -33,6 +33,7 @@ class TestValidator(unittest.TestCase):
     def test_validate_integer_failure(self):
         """Test validate_integer function with invalid integer"""
         self.assertEqual(Validator.validate_integer('abc'), VALIDATION_ERROR)
+        self.assertEqual(Validator.validate_integer([1]), VALIDATION_ERROR)
 
     def test_check_overlap_overlapping(self):
         """Test check_overlap with overlapping time slots"""
@@ -56,6 +57,15 @@ class TestValidator(unittest.TestCase):
         TimeUtils.check_overlap(new_timeslot_start, new_timeslot_duration,
                                 existing_timeslot_start, existing_timeslot_duration)
 
+    def test_find_free_windows(self):
+        """Test find_free_windows with overlapping and touching slots"""
+        busy = [(600, 60), (540, 30), (630, 60), (780, 30)]
+        self.assertEqual(TimeUtils.find_free_windows(busy, 480, 840, 30),
+                         [(480, 540), (570, 600), (690, 780), (810, 840)])
+        self.assertEqual(TimeUtils.find_free_windows(busy, 480, 840, 60), [(480, 540), (690, 780)])
+        self.assertEqual(TimeUtils.find_free_windows([], 0, 1440, 45), [(0, 1440)])
+        self.assertEqual(TimeUtils.find_free_windows([(900, 30)], 480, 840, 30), [(480, 840)])
+
 
 if __name__ == '__main__':
     unittest.main()
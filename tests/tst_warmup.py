@@ -0,0 +1,67 @@
+import os
+import tempfile
+import unittest
+from unittest.mock import patch
+
+from app import create_app
+from app.database import Database
+from app.occupancy import OccupancyIndex
+from app.services import create_time_slot, query_time_slots
+from app.statuscodes import GENERIC_ERROR, SUCCESS
+from app.warmup import CacheWarmer, warm_up
+
+
+class TestWarmup(unittest.TestCase):
+    """Test for warmup module"""
+
+    def setUp(self):
+        """Use a temporary database for every test"""
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.db = Database(os.path.join(self.directory.name, "test.sqlite"))
+        for patcher in (patch("app.services.db", self.db), patch("app.services.occupancy", OccupancyIndex())):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def test_warm_up(self):
+        """Test that the upcoming days are listed like the requests list them"""
+        create_time_slot("2025-02-14", "09:00", 60)
+        create_time_slot("2025-02-15", "09:00", 60)
+        create_time_slot("2025-02-20", "09:00", 60)
+
+        with patch("app.warmup.query_time_slots", wraps=query_time_slots) as listing:
+            ret, err, result = warm_up(3, "2025-02-14")
+        self.assertEqual((ret, err), (SUCCESS, ""))
+        self.assertEqual(result, {"slots": 2, "summaries": 2})
+        listing.assert_called_once_with("2025-02-14", "2025-02-16")
+
+        self.assertEqual(warm_up(0)[2], {"slots": 0, "summaries": 0})
+        with patch("app.warmup.query_time_slots", return_value=(None, {"error-msg": "Mock error"}, 500)):
+            self.assertEqual(warm_up(3, "2025-02-14"), (GENERIC_ERROR, "Mock error", None))
+
+    def test_warm_up_today(self):
+        """Test that the window starts today by default"""
+        with patch("app.warmup.clock.time", return_value=1767268800):
+            create_time_slot("2026-01-01", "09:00", 60)
+            self.assertEqual(warm_up(1)[2]["slots"], 1)
+
+    @patch("app.warm_up")
+    def test_create_app(self, mock_warm_up):
+        """Test that create_app warms up only when enabled"""
+        create_app()
+        mock_warm_up.assert_not_called()
+        app = create_app({"WARMUP_DAYS": 7, "WARMUP_INTERVAL": 60})
+        self.assertEqual(mock_warm_up.call_args[0][0], 7)
+        app.extensions["cache_warmer"].stop()
+
+    def test_warmer_stop(self):
+        """Test starting and stopping the warmer"""
+        warmer = CacheWarmer(1, 0.01)
+        warmer.start()
+        warmer.stop()
+        warmer.join(1)
+        self.assertFalse(warmer.is_alive())
+
+
+if __name__ == '__main__':
+    unittest.main()